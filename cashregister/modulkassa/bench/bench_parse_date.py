@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of modulkassa.api.parse_date against the previous implementation.
+
+Example:
+    python3 bench/bench_parse_date.py --number 20000
+"""
+import argparse
+import datetime as dt
+import os
+import sys
+import timeit
+from typing import Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(1, os.path.dirname(BENCH_DIR))
+
+# pylint: disable=wrong-import-position
+from fake_billmgr import FakeBillmgr
+
+FakeBillmgr().install()
+
+from modulkassa.api import parse_date  # noqa: E402
+
+# fiscalInfo.date values in formats returned by Modulkassa
+CORPUS = [
+    "2025-05-03T07:29:34.123Z",
+    "2025-05-03T07:29:34Z",
+    "2025-05-03T07:29:34+03:00",
+    "2025-05-03T07:29:34+0300",
+    "2025-05-03T07:29:34",
+    "2025-05-03T07:29:34.123+03:00",
+    "2025-05-03T07:29:34.123456+0300",
+    "2025-05-03T23:59:59.999-05:00",
+    "2025-12-31T00:00:00+0000",
+    "2024-02-29T12:00:00.5Z",
+    "2025-05-03 07:29:34",
+    "2025-05-03T07:29",
+    "2025-05-03 07:29",
+    "2025-05-03T07:29+03:00",
+    "2025-05-03T07:29Z",
+    "2025-05-03",
+    "2025-02-30",
+    "invalid",
+    "",
+]
+
+
+def legacy_parse_date(date_str: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    parse_date before the single-pass parser
+
+    """
+    if not date_str:
+        return None, None
+
+    try:
+        if date_str.endswith('Z'):
+            if '.' in date_str:
+                dt_obj = dt.datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S.%fZ")
+            else:
+                dt_obj = dt.datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%SZ")
+            return dt_obj.strftime("%Y-%m-%d %H:%M:%S"), "+00:00"
+
+        if '+' in date_str or '-' in date_str:
+            if 'T' in date_str:
+                tz_index = max(date_str.rfind('+'), date_str.rfind('-'))
+                if tz_index > date_str.find('T'):
+                    dt_part = date_str[:tz_index]
+                    tz_part = date_str[tz_index:]
+
+                    if ':' in tz_part:
+                        tz_offset = tz_part
+                    else:
+                        tz_offset = f"{tz_part[:3]}:{tz_part[3:]}" if len(tz_part) > 3 else "+00:00"
+
+                    dt_obj = dt.datetime.fromisoformat(dt_part + tz_offset)
+                    return dt_obj.strftime("%Y-%m-%d %H:%M:%S"), tz_offset
+
+        dt_obj = dt.datetime.fromisoformat(date_str)
+        return dt_obj.strftime("%Y-%m-%d %H:%M:%S"), None
+
+    except ValueError:
+        try:
+            dt_obj = dt.datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S.%f%z")
+            tz_offset = dt_obj.strftime("%z")
+            tz_offset = f"{tz_offset[:3]}:{tz_offset[3:]}" if tz_offset else None
+            return dt_obj.strftime("%Y-%m-%d %H:%M:%S"), tz_offset
+        except ValueError:
+            return None, None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000, help="passes over the corpus")
+    args = parser.parse_args()
+
+    mismatches = [
+        (date_str, legacy_parse_date(date_str), parse_date(date_str))
+        for date_str in CORPUS
+        if legacy_parse_date(date_str) != parse_date(date_str)
+    ]
+    for date_str, legacy, current in mismatches:
+        print(f"MISMATCH {date_str!r}: legacy={legacy} current={current}")
+
+    uncached = parse_date.__wrapped__
+
+    def run(func) -> float:
+        calls = args.number * len(CORPUS)
+        seconds = timeit.timeit(lambda: [func(date_str) for date_str in CORPUS], number=args.number)
+        return calls / seconds
+
+    results = {
+        "legacy": run(legacy_parse_date),
+        "single-pass": run(uncached),
+        "single-pass+lru": run(parse_date),
+    }
+    for name, rate in results.items():
+        print(f"{name:<16} {rate:>12,.0f} calls/s  x{rate / results['legacy']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
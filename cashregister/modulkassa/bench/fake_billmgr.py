@@ -0,0 +1,311 @@
+"""In-memory replacement of billmgr library seeded with synthetic receipts"""
+import base64
+import datetime as dt
+import enum
+import logging
+import sys
+import threading
+import types
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+class Record(dict):
+    """
+    Row of query result, mimics billmgr.db.Record
+
+    """
+
+    def as_str(self, key: str) -> str:
+        value = self.get(key)
+        return "" if value is None else str(value)
+
+
+class ReceiptStatus(enum.Enum):
+    """
+    Receipt statuses of billmgr.modules.cashregister
+
+    """
+
+    New = 1  # pylint: disable=invalid-name
+    Wait = 2  # pylint: disable=invalid-name
+    Success = 3  # pylint: disable=invalid-name
+    Error = 4  # pylint: disable=invalid-name
+    Prepare = 5  # pylint: disable=invalid-name
+
+
+class Feature(enum.Enum):
+    """
+    Cash register features of billmgr.modules.cashregister
+
+    """
+
+    CHECK_CONNECTION = "check_connection"
+    SEND_RECEIPT = "send_receipt"
+    PREPARED_RECEIPT = "prepared_receipt"
+    CHECK_RECEIPT = "check_receipt"
+    EXPENSE_RECEIPT = "expense_receipt"
+    REFUND_RECEIPT = "refund_receipt"
+    MANUAL_MONTHLY_SEND = "manual_monthly_send"
+
+
+class CashregisterModule:
+    """
+    Minimal base class of cash register module
+
+    """
+
+    def __init__(self) -> None:
+        self.features: Dict[Feature, Any] = {}
+
+    def set_description(self, description: str) -> None:
+        self.description = description  # pylint: disable=attribute-defined-outside-init
+
+    def _add_callable_feature(self, feature: Feature, func) -> None:
+        self.features[feature] = func
+
+    def _add_feature(self, feature: Feature) -> None:
+        self.features[feature] = None
+
+
+class XmlException(Exception):
+    """
+    billmgr.exception.XmlException
+
+    """
+
+    def __init__(self, err_type: str = "", err_value: str = "") -> None:
+        super().__init__(err_type, err_value)
+        self.params: Dict[str, str] = {}
+
+    def add_param(self, name: str, value: str) -> None:
+        self.params[name] = value
+
+    def as_xml(self) -> str:
+        return f"<doc><error type='{self.args[0]}'/></doc>"
+
+
+class FileLock:
+    """
+    billmgr.misc.FileLock backed by a process-local lock
+
+    """
+
+    class LockMode(enum.Enum):
+        """
+        Lock modes
+
+        """
+
+        WAIT = 0
+        NOWAIT = 1
+
+    __locks: Dict[str, threading.Lock] = {}
+
+    def __init__(self, path: str, lock_mode: "FileLock.LockMode" = LockMode.WAIT) -> None:
+        self.lock = self.__locks.setdefault(path, threading.Lock())
+        self.lock_mode = lock_mode
+
+    def __enter__(self) -> "FileLock":
+        self.lock.acquire()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.lock.release()
+
+
+class FakeBillmgr:
+    """
+    Keeps receipts of one cash register and counts database and mgrctl calls
+
+    """
+
+    def __init__(self, cash_register: int = 1) -> None:
+        self.cash_register = cash_register
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self, cash_register_params: Optional[dict] = None) -> None:
+        """
+        Drops all receipts and counters
+
+        """
+
+        self.cash_register_params = cash_register_params or {}
+        self.receipts: Dict[int, Record] = {}
+        self.items: Dict[int, List[Record]] = {}
+        self.config: Dict[str, str] = {}
+        self.queries: Counter = Counter()
+        self.mgrctl: Counter = Counter()
+
+    def seed(self, count: int, status: ReceiptStatus, items_per_receipt: int = 2) -> None:
+        """
+        Adds `count` synthetic receipts with the status
+
+        """
+
+        now = dt.datetime.now().replace(microsecond=0)
+        first_id = max(self.receipts, default=0) + 1
+
+        for receipt_id in range(first_id, first_id + count):
+            self.receipts[receipt_id] = Record(
+                id=receipt_id,
+                payment=receipt_id,
+                payment_cash_register=self.cash_register,
+                createdate=now,
+                receipt_type=0,
+                status=status.value,
+                amount=100.0 * items_per_receipt,
+                email=f"client{receipt_id}@example.com",
+                internalid="",
+                externalid=str(receipt_id),
+                external_id=str(receipt_id),
+                is_expense="off",
+                subaccount=1,
+                last_notify_time=None,
+                payment_type=None,
+                billorder=receipt_id,
+                paymethod=1,
+                payment_id=receipt_id,
+                payment_description="bench",
+            )
+            self.items[receipt_id] = [
+                Record(
+                    payment_receipt=receipt_id,
+                    name=f" Service #{position} ",
+                    price=100.0,
+                    quantity=1,
+                    item_amount=100.0,
+                    taxrate=20,
+                    taxamount=16.67,
+                    payment_method=4,
+                    payment_object=4,
+                    expense="off",
+                )
+                for position in range(items_per_receipt)
+            ]
+
+    def count_status(self, status: ReceiptStatus) -> int:
+        """
+        Returns number of receipts with the status
+
+        """
+
+        return sum(1 for receipt in self.receipts.values() if receipt["status"] == status.value)
+
+    def db_query(self, query: str, *params: Any) -> List[Record]:
+        """
+        billmgr.db.db_query
+
+        """
+
+        with self.lock:
+            if "FROM payment_receipt_item" in query:
+                self.queries["payment_receipt_item"] += 1
+                result = []
+                for receipt_id in params:
+                    result.extend(self.items.get(int(receipt_id), []))
+                return result
+
+            if "FROM payment_receipt pr" in query:
+                self.queries["payment_receipt"] += 1
+                cash_register, status = int(params[0]), params[1]
+                min_id = int(params[3]) if len(params) > 3 else 0
+                return [
+                    receipt for receipt_id, receipt in sorted(self.receipts.items())
+                    if receipt["payment_cash_register"] == cash_register
+                    and receipt["status"] == status
+                    and receipt_id > min_id
+                ]
+
+            self.queries["other"] += 1
+            return []
+
+    def get_first_record(self, query: str, *params: Any) -> Optional[Record]:
+        """
+        billmgr.db.get_first_record
+
+        """
+
+        result = self.db_query(query, *params)
+        return result[0] if result else None
+
+    def mgrctl_call(self, func: str, **params: Any) -> dict:
+        """
+        billmgr.misc.Mgrctl
+
+        """
+
+        with self.lock:
+            self.mgrctl[func] += 1
+
+            if func == "payment_cash_register.edit":
+                model = {
+                    "username": "bench",
+                    "password": "bench",
+                    "url": "http://127.0.0.1",
+                    "retailpointid": "bench-point",
+                    "payment_receipt_description": "bench",
+                    "expense_receipt": "off",
+                    "convert_invalid_rate_to_none_rate": "off",
+                    "manual_monthly_send": "off",
+                }
+                model.update(self.cash_register_params)
+                return {"model": model}
+
+            new_status = {
+                "payment_receipt.wait": ReceiptStatus.Wait,
+                "payment_receipt.success": ReceiptStatus.Success,
+                "payment_receipt.error": ReceiptStatus.Error,
+            }.get(func)
+            if new_status is not None:
+                self.receipts[int(params["elid"])]["status"] = new_status.value
+
+            return {}
+
+    def install(self) -> None:
+        """
+        Registers fake billmgr package in sys.modules
+
+        """
+
+        def module(name: str, **attrs: Any) -> types.ModuleType:
+            mod = types.ModuleType(name)
+            mod.__dict__.update(attrs)
+            sys.modules[name] = mod
+            return mod
+
+        loggers = {}
+
+        def get_logger(name: str) -> logging.Logger:
+            if name not in loggers:
+                loggers[name] = logging.getLogger(f"bench.{name}")
+            return loggers[name]
+
+        billmgr = module("billmgr")
+        billmgr.db = module(
+            "billmgr.db",
+            Record=Record,
+            db_query=self.db_query,
+            get_first_record=self.get_first_record,
+        )
+        billmgr.misc = module("billmgr.misc", Mgrctl=self.mgrctl_call, FileLock=FileLock)
+        billmgr.session = module("billmgr.session", get_input_xml=lambda: None)
+        billmgr.logger = module(
+            "billmgr.logger", init_logging=lambda name: None, get_logger=get_logger
+        )
+        billmgr.exception = module(
+            "billmgr.exception", XmlException=XmlException, log_backtrace=lambda: None
+        )
+        billmgr.config = module("billmgr.config", get_param=lambda name: self.config.get(name))
+        billmgr.crypto = module(
+            "billmgr.crypto",
+            encrypt_value=lambda value: base64.b64encode(value.encode()).decode(),
+            decrypt_value=lambda value: base64.b64decode(value.encode()).decode(),
+        )
+        billmgr.modules = module("billmgr.modules")
+        billmgr.modules.cashregister = module(
+            "billmgr.modules.cashregister",
+            CashregisterModule=CashregisterModule,
+            Feature=Feature,
+            ReceiptStatus=ReceiptStatus,
+        )
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of crmodulkassa against the local ModulKassa stand-in.
+
+Example:
+    python3 bench/run.py --receipts 1000 --workers 1 8 --latency 0.05
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(1, os.path.dirname(BENCH_DIR))
+
+# pylint: disable=wrong-import-position
+from fake_billmgr import FakeBillmgr, ReceiptStatus
+from stand_in import StandInServer
+
+FAKE = FakeBillmgr()
+FAKE.install()
+
+import crmodulkassa  # noqa: E402
+import modulkassa.api as modulkassa_api  # noqa: E402
+
+SCENARIOS = {
+    "send": (ReceiptStatus.New, "send_receipts"),
+    "prepared": (ReceiptStatus.Prepare, "prepared_receipts"),
+    "check": (ReceiptStatus.Wait, "check_receipts"),
+}
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """
+    Nearest-rank percentile
+
+    """
+
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(percent / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+class LatencyRecorder:
+    """
+    Wraps ApiClient.request to record latency of every HTTP request
+
+    """
+
+    def __init__(self) -> None:
+        self.latencies: List[float] = []
+        self.__lock = threading.Lock()
+        self.__original = modulkassa_api.ApiClient.request
+        recorder = self
+
+        def request(client, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return recorder.__original(client, *args, **kwargs)
+            finally:
+                with recorder.__lock:
+                    recorder.latencies.append(time.perf_counter() - started)
+
+        modulkassa_api.ApiClient.request = request
+
+    def reset(self) -> None:
+        with self.__lock:
+            self.latencies = []
+
+
+def run_scenario(
+    scenario: str, receipts: int, workers: int, args: argparse.Namespace, recorder: LatencyRecorder
+) -> dict:
+    """
+    Runs one scenario on freshly seeded data and returns its measurements
+
+    """
+
+    status, method = SCENARIOS[scenario]
+
+    with StandInServer(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        completed_rate=args.completed_rate,
+        seed=args.seed,
+    ) as server, tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+
+        FAKE.reset(cash_register_params={
+            "url": server.url,
+            "dispatch_workers": str(workers),
+            "check_backoff": "on" if args.check_backoff else "off",
+        })
+        FAKE.seed(receipts, status, args.items)
+        recorder.reset()
+
+        register = crmodulkassa.ModulkassaRegister()
+        started = time.perf_counter()
+        getattr(register, method)(FAKE.cash_register)
+        elapsed = time.perf_counter() - started
+        register.api_client.close()
+
+        os.chdir(BENCH_DIR)
+
+        return {
+            "scenario": scenario,
+            "workers": workers,
+            "receipts": receipts,
+            "elapsed": elapsed,
+            "rate": receipts / elapsed if elapsed else 0.0,
+            "p50": percentile(recorder.latencies, 50),
+            "p95": percentile(recorder.latencies, 95),
+            "p99": percentile(recorder.latencies, 99),
+            "http": server.requests,
+            "connections": server.connections,
+            "db": sum(FAKE.queries.values()),
+            "mgrctl": sum(FAKE.mgrctl.values()),
+            "left": FAKE.count_status(status),
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--receipts", type=int, default=500, help="receipts per run")
+    parser.add_argument("--items", type=int, default=2, help="positions per receipt")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8], help="dispatch_workers values")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=["send", "prepared", "check"])
+    parser.add_argument("--latency", type=float, default=0.02, help="stand-in response delay, s")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 500 responses")
+    parser.add_argument("--completed-rate", type=float, default=0.5, help="share of COMPLETED statuses")
+    parser.add_argument("--check-backoff", action="store_true", help="enable check back-off")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true", help="show module logs")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+
+    recorder = LatencyRecorder()
+    header = (
+        f"{'scenario':<9} {'workers':>7} {'receipts':>8} {'time,s':>8} {'rcpt/s':>8} "
+        f"{'p50,ms':>7} {'p95,ms':>7} {'p99,ms':>7} {'http':>6} {'conns':>5} "
+        f"{'db':>4} {'mgrctl':>6} {'left':>5}"
+    )
+    print(header)
+    print("-" * len(header))
+
+    for scenario in args.scenarios:
+        for workers in args.workers:
+            result = run_scenario(scenario, args.receipts, workers, args, recorder)
+            print(
+                f"{result['scenario']:<9} {result['workers']:>7} {result['receipts']:>8} "
+                f"{result['elapsed']:>8.2f} {result['rate']:>8.1f} "
+                f"{result['p50'] * 1000:>7.1f} {result['p95'] * 1000:>7.1f} "
+                f"{result['p99'] * 1000:>7.1f} {result['http']:>6} {result['connections']:>5} "
+                f"{result['db']:>4} {result['mgrctl']:>6} {result['left']:>5}"
+            )
+
+
+if __name__ == "__main__":
+    main()
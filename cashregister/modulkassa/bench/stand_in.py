@@ -0,0 +1,196 @@
+"""Local stand-in for ModulKassa API with configurable latency and error rate"""
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+DOC_STATUS_RE = re.compile(r"^/v1/doc/(?P<id>[^/]+)/status$")
+ASSOCIATE_RE = re.compile(r"^/v1/associate/(?P<id>[^/]+)$")
+
+FISCAL_INFO = {
+    "shiftNumber": 12,
+    "checkNumber": 34,
+    "kktNumber": "0000000000012345",
+    "fnNumber": "9999078900012345",
+    "fnDocNumber": 5678,
+    "fnDocMark": 1234567890,
+    "date": "2025-05-03T07:29:34.123+0300",
+    "sum": "100.00",
+    "checkType": "SALE",
+    "qr": "t=20250503T0729&s=100.00&fn=9999078900012345&i=5678&fp=1234567890&n=1",
+}
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    HTTP server imitating ModulKassa fiscalization API.
+
+    latency: mean delay of every response in seconds (jitter is +-25%)
+    error_rate: share of requests answered with 500
+    completed_rate: share of status requests answered with COMPLETED, others get QUEUED
+
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int] = ("127.0.0.1", 0),
+        latency: float = 0.05,
+        error_rate: float = 0.0,
+        completed_rate: float = 0.5,
+        seed: Optional[int] = None,
+    ) -> None:
+        super().__init__(address, StandInHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.completed_rate = completed_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.__thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """
+        Returns base URL of the stand-in
+
+        """
+
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def roll(self) -> float:
+        """
+        Returns random number in [0, 1) shared by all handler threads
+
+        """
+
+        with self.lock:
+            return self.random.random()
+
+    def start(self) -> "StandInServer":
+        """
+        Serves requests in a background thread
+
+        """
+
+        self.__thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stops serving and closes the socket
+
+        """
+
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *_) -> None:
+        self.stop()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Request handler of StandInServer
+
+    """
+
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, Nagle would delay keep-alive responses
+    disable_nagle_algorithm = True
+    server: StandInServer
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *_) -> None:  # pylint: disable=arguments-differ
+        pass
+
+    def __reply(self, code: int, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def __prepare(self) -> bool:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+
+        with self.server.lock:
+            self.server.requests += 1
+
+        latency = self.server.latency
+        if latency > 0:
+            time.sleep(latency * (0.75 + self.server.roll() / 2))
+
+        if self.server.roll() < self.server.error_rate:
+            self.__reply(500, {"message": "stand-in failure"})
+            return False
+        return True
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        """
+        /v1/associate/{retailpointid} and /v2/doc
+
+        """
+
+        if not self.__prepare():
+            return
+
+        if ASSOCIATE_RE.match(self.path):
+            self.__reply(200, {"userName": "bench-user", "password": "bench-password"})
+        elif self.path == "/v2/doc":
+            self.__reply(200, {"status": "QUEUED"})
+        else:
+            self.__reply(404, {"message": "not found"})
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """
+        /v1/status and /v1/doc/{id}/status
+
+        """
+
+        if not self.__prepare():
+            return
+
+        if self.path == "/v1/status":
+            self.__reply(200, {"status": "READY", "dateTime": "2025-05-03T07:29:34+03:00"})
+        elif DOC_STATUS_RE.match(self.path):
+            if self.server.roll() < self.server.completed_rate:
+                self.__reply(200, {"status": "COMPLETED", "fiscalInfo": FISCAL_INFO})
+            else:
+                self.__reply(200, {"status": "QUEUED"})
+        else:
+            self.__reply(404, {"message": "not found"})
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--completed-rate", type=float, default=0.5)
+    args = parser.parse_args()
+
+    server = StandInServer(
+        ("127.0.0.1", args.port), args.latency, args.error_rate, args.completed_rate
+    )
+    print(f"ModulKassa stand-in is listening on {server.url}")
+    server.serve_forever()
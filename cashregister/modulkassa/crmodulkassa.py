@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
 
-from typing import Optional, List
+from typing import Optional, List, Dict, Iterable, Tuple
 import sys
 import datetime as dt
 import uuid
 import hashlib
 import time
+from http import HTTPStatus
+from logging import DEBUG
 import requests
 
 sys.path.insert(0, "/usr/local/mgr5/lib/python")
@@ -19,9 +21,17 @@ import billmgr.exception as exc
 import billmgr.config as conf
 
 import modulkassa.api as modulkassa_api
+import modulkassa.dispatch as dispatch
+import modulkassa.credentials as credentials
+import modulkassa.polling as polling
+import modulkassa.mapping as mapping
+from modulkassa.cursor import ReceiptCursor
 
 MODULE = "crmodulkassa"
 
+# Max number of receipt ids in one "IN (...)" query for receipt items
+RECEIPT_ITEM_CHUNK_SIZE = 500
+
 logging.init_logging(MODULE)
 logger = logging.get_logger(MODULE)
 
@@ -54,12 +64,17 @@ class ModulkassaRegister(CashregisterModule):
         self._expense_receipt: bool = False
         self._convert_invalid_rate_to_none_rate: bool = False
         self._manual_monthly_send: bool = False
+        self._dispatch_workers: int = dispatch.DEFAULT_WORKERS
+        self._check_backoff: bool = False
 
         # fields that got from associate to perform other http request
         self.api_username: str = ""
         self.api_password: str = ""
         self.api_auth: modulkassa_api.Auth = modulkassa_api.Auth("", "")
 
+        # keep-alive connections to Modulkassa reused by all requests of one run
+        self.api_client: modulkassa_api.ApiClient = modulkassa_api.ApiClient()
+
 
     def __init_cashregister(self, cash_register: int) -> None:
         logger.info(
@@ -79,6 +94,14 @@ class ModulkassaRegister(CashregisterModule):
             params['model']['convert_invalid_rate_to_none_rate'] == 'on'
         )
         self._manual_monthly_send = params['model']['manual_monthly_send'] == 'on'
+        self._dispatch_workers = dispatch.normalize_workers(
+            params['model'].get('dispatch_workers')
+        )
+        self._check_backoff = params['model'].get('check_backoff') == 'on'
+
+        # One connection per dispatch worker, so concurrent requests do not wait for the pool
+        self.api_client.close()
+        self.api_client = modulkassa_api.ApiClient(pool_size=self._dispatch_workers)
 
 
     def __mask_data(self, data: str) -> str:
@@ -140,7 +163,7 @@ class ModulkassaRegister(CashregisterModule):
         auth = modulkassa_api.create_auth_data(url, username, password)
 
         response_associate = modulkassa_api.request_associate(
-            auth=auth, retailpointid=retailpointid
+            auth=auth, retailpointid=retailpointid, client=self.api_client
         )
 
         if not response_associate.ok:
@@ -156,7 +179,9 @@ class ModulkassaRegister(CashregisterModule):
         self.api_password = json_associate["password"]
         self.api_auth = modulkassa_api.create_auth_data(url, self.api_username, self.api_password)
 
-        response_status = modulkassa_api.request_status_fn(auth=self.api_auth)
+        response_status = modulkassa_api.request_status_fn(
+            auth=self.api_auth, client=self.api_client
+        )
         if not response_status.ok:
             logger.warning(
                 f"__authorize_cashregister: "
@@ -168,23 +193,93 @@ class ModulkassaRegister(CashregisterModule):
         return response_status
 
 
-    def __check_service_status(self) -> bool:
+    def __request_service_status(self) -> Optional[str]:
         """
-        Check fiscalization service's status
+        Requests fiscalization service's status with cached associate credentials.
+        Returns None if credentials were rejected.
         
         """
 
-        response_status = self.__authorize_cashregister(
-            self._url,
-            self._username,
-            self._password,
-            self._retailpointid
+        response_status = modulkassa_api.request_status_fn(
+            auth=self.api_auth, client=self.api_client
         )
+        if response_status.status_code == HTTPStatus.UNAUTHORIZED:
+            logger.info("__request_service_status: cached credentials are rejected")
+            self.__invalidate_credentials()
+            return None
+
+        if not response_status.ok:
+            logger.warning(
+                f"__request_service_status: "
+                f"Fiscalization service is not ok: {response_status.status_code}"
+            )
+
+            raise modulkassa_api.ServiceUnavailable(response_status.reason)
+
+        return response_status.json()["status"]
+
+
+    def __invalidate_credentials(self) -> None:
+        """
+        Drops cached associate credentials of the cash register
+        
+        """
+
+        credentials.invalidate(self._url, self._username, self._retailpointid)
+
+
+    def __check_service_status(self) -> bool:
+        """
+        Check fiscalization service's status.
+        Associate credentials and service status are taken from the cache when possible.
+        
+        """
+
+        status_fn = None
+        cached = credentials.load(self._url, self._username, self._retailpointid)
+
+        if cached:
+            logger.info("__check_service_status: use cached associate credentials")
+            self.api_username = cached.username
+            self.api_password = cached.password
+            self.api_auth = modulkassa_api.create_auth_data(
+                self._url, self.api_username, self.api_password
+            )
 
-        json_status = response_status.json()
-        logger.info(f"Json_status={json_status}")
+            if cached.is_status_fresh():
+                status_fn = cached.status
+            else:
+                status_fn = self.__request_service_status()
+                if status_fn is not None:
+                    credentials.save(
+                        self._url, self._username, self._retailpointid,
+                        cached._replace(status=status_fn, status_checked=time.time())
+                    )
+
+        if status_fn is None:
+            response_status = self.__authorize_cashregister(
+                self._url,
+                self._username,
+                self._password,
+                self._retailpointid
+            )
+
+            json_status = response_status.json()
+            logger.info(f"Json_status={json_status}")
+
+            status_fn = json_status["status"]
+            now = time.time()
+            credentials.save(
+                self._url, self._username, self._retailpointid,
+                credentials.CachedCredentials(
+                    username=self.api_username,
+                    password=self.api_password,
+                    created=now,
+                    status=status_fn,
+                    status_checked=now,
+                )
+            )
 
-        status_fn = json_status["status"]
         logger.info(f"Fiscalization service's status={status_fn}")
 
         # ! On test mode with api: https://my.modulkassa.ru/api/fn
@@ -202,17 +297,24 @@ class ModulkassaRegister(CashregisterModule):
 
 
     def __get_receipt_from_billmgr(
-        self, cash_register: int, status: ReceiptStatus
+        self, cash_register: int, status: ReceiptStatus, min_id: Optional[int] = None
     ) -> Optional[db.Record]:
         """
-        Get receipts from database with exact status
+        Get receipts from database with exact status.
+        If min_id is set, only receipts with greater id are selected
         
         """
 
-        logger.info("__GET_RECEIPT_FROM_BILLMGR IS RUNNING")
+        logger.info(f"__GET_RECEIPT_FROM_BILLMGR IS RUNNING: min_id={min_id}")
 
         from_date = dt.datetime.today() - dt.timedelta(days=7)
 
+        id_condition = ""
+        id_params = []
+        if min_id is not None:
+            id_condition = " AND pr.id > %s"
+            id_params = [min_id]
+
         # Retrive neccessary data about reciept
         result = db.db_query(
             "SELECT pr.id"
@@ -255,140 +357,81 @@ class ModulkassaRegister(CashregisterModule):
             " LEFT JOIN project prj ON prj.id = sa.project"
             " WHERE pr.payment_cash_register = %s"
             " AND pr.status = %s"
-            " AND pr.createdate >= %s",
-            cash_register, status.value, from_date.strftime('%Y-%m-%d')
+            " AND pr.createdate >= %s"
+            f"{id_condition}",
+            cash_register, status.value, from_date.strftime('%Y-%m-%d'), *id_params
         )
 
-        logger.info(f"__get_receipt_from_billmgr: db_query result={result}")
+        logger.info(f"__get_receipt_from_billmgr: receipts={len(result or [])}")
+        if logger.isEnabledFor(DEBUG):
+            logger.debug(f"__get_receipt_from_billmgr: db_query result={result}")
         return result
 
 
-    def is_receipt_expense(self, receipt_id: int) -> bool:
+    def __get_receipt_items_from_billmgr(
+        self, payment_receipts: Iterable[int]
+    ) -> Dict[str, List[db.Record]]:
         """
-        Returns True if receipt's is_expense flag is 'on', otherwise False
+        Get positions of several receipts from billmgr database.
+        Items are queried by chunks of RECEIPT_ITEM_CHUNK_SIZE receipts
+        and grouped by receipt id
         
         """
 
-        result = db.get_first_record(
-            "SELECT is_expense FROM payment_receipt WHERE id = %s",
-            receipt_id
-        )
-
-        if not result or "is_expense" not in result:
-            raise RuntimeError(f"Не удалось получить флаг is_expense для чека id={receipt_id}")
-
-        return result["is_expense"] == 'on'
-
-
-    def __get_receipt_item_from_billmgr(
-        self, payment_receipt: int
-    ) -> Optional[db.Record]:
-        """
-        Get receipt's positions from billmgr database
-        
-        """
+        receipt_ids = list(dict.fromkeys(str(receipt_id) for receipt_id in payment_receipts))
 
         logger.info(
-            f"__GET_RECEIPT_ITEM_FROM_BILLMGR IS RUNNING: "
-            f"payment_receipt={payment_receipt}"
+            f"__GET_RECEIPT_ITEMS_FROM_BILLMGR IS RUNNING: receipts={len(receipt_ids)}"
         )
 
-        # Retrive neccessary data about reciept
-        result = db.db_query(
-            "SELECT pri.name"
-            ", pri.price"
-            ", pri.quantity"
-            ", pri.amount AS item_amount"
-            ", pri.taxrate"
-            ", pri.taxamount"
-            ", pri.payment_method"
-            ", pri.payment_object"
-            ", pri.expense"
-            " FROM payment_receipt_item pri"
-            " WHERE pri.payment_receipt = %s",
-            payment_receipt
-        )
-
-        logger.info(f"__get_receipt_item_from_billmgr: db_query result={result}")
-        return result
-
-
-    def __resolve_payment_method(self, receipt: db.Record, receipt_item: db.Record) -> str:
-        """
-        Determines the payment method.
-        
-        """
-
-        logger.info("__RESOLVE_PAYMENT_METHOD IS RUNNING")
-
-        payment_method = conf.get_param("ReceiptDefaultPaymentMethod")
+        items_by_receipt: Dict[str, List[db.Record]] = {
+            receipt_id: [] for receipt_id in receipt_ids
+        }
+
+        for start in range(0, len(receipt_ids), RECEIPT_ITEM_CHUNK_SIZE):
+            chunk = receipt_ids[start:start + RECEIPT_ITEM_CHUNK_SIZE]
+
+            # Retrive neccessary data about reciept
+            result = db.db_query(
+                "SELECT pri.payment_receipt"
+                ", pri.name"
+                ", pri.price"
+                ", pri.quantity"
+                ", pri.amount AS item_amount"
+                ", pri.taxrate"
+                ", pri.taxamount"
+                ", pri.payment_method"
+                ", pri.payment_object"
+                ", pri.expense"
+                " FROM payment_receipt_item pri"
+                f" WHERE pri.payment_receipt IN ({', '.join(['%s'] * len(chunk))})"
+                " ORDER BY pri.payment_receipt, pri.id",
+                *chunk
+            )
 
-        if not payment_method:
-            payment_method_id = int(receipt_item["payment_method"])
-            if payment_method_id in [e.value for e in modulkassa_api.PaymentMethod]:
-                payment_method_enum = modulkassa_api.PaymentMethod(payment_method_id)
-                payment_method = payment_method_enum.name.lower()
-            else:
-                payment_method = (
-                    "advance" if receipt["billorder"] is None else "full_payment"
+            for receipt_item in result or []:
+                items_by_receipt.setdefault(str(receipt_item["payment_receipt"]), []).append(
+                    receipt_item
                 )
-        else:
-            try:
-                payment_method_value = int(payment_method)
-                payment_method_enum = modulkassa_api.PaymentMethod(payment_method_value)
-                payment_method = payment_method_enum.name.lower()
-            except (ValueError, TypeError):
-                logger.info("Unknown payment_method in config, fallback to 'full_payment'")
-                payment_method = "full_payment"
-
-        logger.info(f"Resolved payment_method: {payment_method}")
-        return payment_method
-
-
-    def __resolve_payment_object(self, receipt: db.Record, receipt_item: db.Record) -> str:
-        """
-        Determines the payment object.
-        
-        """
-
-        logger.info("__RESOLVE_PAYMENT_OBJECT IS RUNNING")
-
-        payment_object = conf.get_param("ReceiptDefaultPaymentObject")
-
-        payment_object_id = None
-
-        if payment_object:
-            try:
-                payment_object_value = int(payment_object)
-                payment_object_enum = modulkassa_api.PaymentObject(payment_object_value)
-                payment_object_id = payment_object_enum.value
-            except (ValueError, TypeError):
-                logger.info("Unknown payment_object in config")
-
-        if payment_object_id is None:
-            payment_object_candidate = int(receipt_item["payment_object"])
-            if payment_object_candidate in [e.value for e in modulkassa_api.PaymentObject]:
-                payment_object_id = payment_object_candidate
-            elif receipt["billorder"] is None:
-                payment_object_id = modulkassa_api.PaymentObject.PAYMENT.value
-            else:
-                payment_object_id = modulkassa_api.PaymentObject.SERVICE.value
 
-        payment_object = modulkassa_api.PaymentObject(payment_object_id).name.lower()
-        logger.info(f"Resolved payment_object: {payment_object}")
-        return payment_object
+        logger.info(
+            f"__get_receipt_items_from_billmgr: "
+            f"items={sum(len(items) for items in items_by_receipt.values())}"
+        )
+        return items_by_receipt
 
 
     def __form_invent_positions(
-        self, receipt: db.Record, receipt_items: db.Record
-    ) -> modulkassa_api.InventPosition:
+        self,
+        receipt: db.Record,
+        receipt_items: List[db.Record],
+        defaults: mapping.ReceiptDefaults,
+    ) -> List[modulkassa_api.InventPosition]:
         """
         Constructs details from the provided receipt_items and serializes them into InventPosition.
         
         """
 
-        logger.info("__FORM_INVENT_POSITIONS IS RUNNING")
-
         invent_positions = []
 
         for receipt_item in receipt_items:
@@ -396,37 +439,32 @@ class ModulkassaRegister(CashregisterModule):
             quantity = int(receipt_item["quantity"])
             price = float(receipt_item["price"])
 
-            payment_method = self.__resolve_payment_method(receipt, receipt_item)
-            payment_object = self.__resolve_payment_object(receipt, receipt_item)
+            payment_method = mapping.resolve_payment_method(
+                defaults, receipt_item["payment_method"], receipt["billorder"]
+            )
+            payment_object = mapping.resolve_payment_object(
+                defaults, receipt_item["payment_object"], receipt["billorder"]
+            )
 
-            VAT_TAG_BILLMGR_TO_VAT_TAG_ENUM = { # pylint: disable=invalid-name
-                20: modulkassa_api.VatTag.PERCENT_20.value,
-                10: modulkassa_api.VatTag.PERCENT_10.value,
-                0: modulkassa_api.VatTag.NO_NDS.value,
-                120: modulkassa_api.VatTag.PERCENT_20_120.value,
-                110: modulkassa_api.VatTag.PERCENT_10_110.value
-            }
             try:
                 taxrate = receipt_item["taxrate"]
                 if taxrate is None:
                     logger.warning(f"receipt_{receipt['id']} has taxrate NULL")
 
-                taxrate = int(taxrate)
+                vat_tag = mapping.resolve_vat_tag(taxrate)
 
-                if taxrate not in VAT_TAG_BILLMGR_TO_VAT_TAG_ENUM:
+                if vat_tag is None:
                     if self._convert_invalid_rate_to_none_rate:
                         logger.info(
                             f"receipt_{receipt['id']}: Unsupported taxrate {taxrate}. "
                             "Falling back to NO_NDS due to convert_invalid_rate_to_none_rate=True"
                         )
-                        vat_tag = VAT_TAG_BILLMGR_TO_VAT_TAG_ENUM[0]
+                        vat_tag = mapping.NO_NDS_VAT_TAG
                     else:
                         raise ValueError(
                             f"Invalid taxrate value: {taxrate}. "
-                            f"Supported values are: {list(VAT_TAG_BILLMGR_TO_VAT_TAG_ENUM.keys())}"
+                            f"Supported values are: {list(mapping.VAT_TAG_BY_TAXRATE.keys())}"
                         )
-                else:
-                    vat_tag = VAT_TAG_BILLMGR_TO_VAT_TAG_ENUM[taxrate]
 
             except (ValueError, TypeError) as e:
                 error_message = (
@@ -469,11 +507,9 @@ class ModulkassaRegister(CashregisterModule):
         
         """
 
-        logger.info("__FORM_DOCUMENT IS RUNNING")
-
         # Create receipt details
         external_id = receipt["external_id"]
-        doc_type = modulkassa_api.DocType(receipt["receipt_type"]).name
+        doc_type = mapping.resolve_doc_type(receipt["receipt_type"])
         checkout_date_time = receipt["createdate"]
         email = receipt["email"]
 
@@ -488,17 +524,10 @@ class ModulkassaRegister(CashregisterModule):
         checkout_datetime_iso = checkout_date_time.isoformat()
 
         # Form money positions
-        if receipt["payment_type"] is None:
-            if self.is_receipt_expense(receipt["id"]):
-                payment_type = modulkassa_api.PaymentType.PREPAID.name.upper()
-            else:
-                payment_type = modulkassa_api.PaymentType.CARD.name.upper()
-        else:
-            payment_type_enum = modulkassa_api.PaymentType(receipt["payment_type"])
-            payment_type = payment_type_enum.name.upper()
-
         money_position = modulkassa_api.MoneyPosition(
-        paymentType=payment_type,
+        paymentType=mapping.resolve_payment_type(
+            receipt["payment_type"], receipt["is_expense"] == 'on'
+        ),
         sum=float(receipt["amount"]),
         )
 
@@ -513,6 +542,38 @@ class ModulkassaRegister(CashregisterModule):
         )
 
 
+    def form_documents(
+        self, receipts: db.Record, items_by_receipt: Dict[str, List[db.Record]]
+    ) -> Dict[str, modulkassa_api.Document]:
+        """
+        Builds Documents for a batch of receipts in one pass, keyed by receipt id.
+        Receipts that could not be formed are logged and left out.
+        
+        """
+
+        logger.info("FORM_DOCUMENTS IS RUNNING")
+
+        defaults = mapping.receipt_defaults(
+            conf.get_param("ReceiptDefaultPaymentMethod"),
+            conf.get_param("ReceiptDefaultPaymentObject"),
+        )
+        logger.info(f"form_documents: defaults={defaults}")
+
+        documents = {}
+        for receipt in receipts:
+            receipt_id = str(receipt["id"])
+            try:
+                invent_positions = self.__form_invent_positions(
+                    receipt, items_by_receipt.get(receipt_id, []), defaults
+                )
+                documents[receipt_id] = self.__form_document(receipt, invent_positions)
+            except Exception as err: # pylint: disable=broad-except
+                logger.warning(f"form_documents: receipt_{receipt_id} is not formed - {err}")
+
+        logger.info(f"form_documents: formed {len(documents)} of {len(receipts)} documents")
+        return documents
+
+
     def check_connection(self) -> None:
         """
         Connect cashregister to Modulkassa
@@ -621,35 +682,121 @@ class ModulkassaRegister(CashregisterModule):
             )
 
 
-    def send_one_receipt(self, receipt: db.Record) -> None:
+    def __form_receipt_document(self, receipt: db.Record) -> modulkassa_api.Document:
         """
-        Setting receipts' status according to responses of send request from Modulkassa.
+        Builds Document for a single receipt
         
         """
 
-        logger.info(f"send_receipt: receipt={receipt}")
-        external_id = receipt["external_id"]
-        logger.info(f"send_receipt: external_id={external_id}")
+        items_by_receipt = self.__get_receipt_items_from_billmgr([receipt["id"]])
+        documents = self.form_documents([receipt], items_by_receipt)
+        if str(receipt["id"]) not in documents:
+            raise ValueError(f"receipt_{receipt['id']} is not formed")
+
+        return documents[str(receipt["id"])]
 
 
-        # 1. Send document to extenal system
-        receipt_items = self.__get_receipt_item_from_billmgr(payment_receipt=receipt["id"])
-        invent_positions = self.__form_invent_positions(receipt, receipt_items)
-        document = self.__form_document(receipt, invent_positions)
-        response = modulkassa_api.send_receipt_to_external_system(
-            auth=self.api_auth, document=document
+    def __post_document(self, document: modulkassa_api.Document) -> requests.Response:
+        """
+        Sends Document to Modulkassa. Safe to call from dispatch worker threads.
+        
+        """
+
+        return modulkassa_api.send_receipt_to_external_system(
+            auth=self.api_auth, document=document, client=self.api_client
         )
+
+
+    def __apply_send_response(
+        self, receipt: db.Record, response: requests.Response, operation: str
+    ) -> bool:
+        """
+        Setting receipt's status according to response of send request from Modulkassa.
+        Returns False if Modulkassa did not accept the receipt.
+        
+        """
+
         if not response.ok:
             logger.warning(
-                f"send_receipt: sending receipt is fail {response.status_code}"
+                f"{operation}: sending receipt is fail {response.status_code}"
             )
-            return
+            if response.status_code == HTTPStatus.UNAUTHORIZED:
+                self.__invalidate_credentials()
+            return False
 
-        # 2. Set status and external id in BILLmanager
+        # Set status and external id in BILLmanager
         document_details = modulkassa_api.parse_document_details(response)
-        logger.info(f"send_receipt: receipt's data={document_details}")
+        if logger.isEnabledFor(DEBUG):
+            logger.debug(f"{operation}: receipt's data={document_details}")
 
         self.__set_status_in_billmgr_after_send(receipt, document_details)
+        return True
+
+
+    def __iter_receipt_documents(self, receipts: db.Record, operation: str):
+        """
+        Yields (receipt, document) pairs, skipping receipts that could not be formed
+        
+        """
+
+        items_by_receipt = self.__get_receipt_items_from_billmgr(
+            receipt["id"] for receipt in receipts
+        )
+        documents = self.form_documents(receipts, items_by_receipt)
+
+        for receipt in receipts:
+            if logger.isEnabledFor(DEBUG):
+                logger.debug(f"{operation}: receipt={receipt}")
+            document = documents.get(str(receipt["id"]))
+            if document is None:
+                logger.warning(f"Smth went wrong during {operation.upper()} - document is not formed")
+                continue
+            yield receipt, document
+
+
+    def __load_receipt_cursor(self, cash_register: int, status: ReceiptStatus) -> ReceiptCursor:
+        """
+        Loads incremental cursor of the cash register for receipts with the status
+        
+        """
+
+        cursor = ReceiptCursor.load(
+            f"tmp/.crmodulkassa/{MODULE}_cursor_{cash_register}_{status.value}.json"
+        )
+        logger.info(
+            f"Receipt cursor: last_id={cursor.last_id} full_sweep={cursor.full_sweep}"
+        )
+        return cursor
+
+
+    def __dispatch_receipts(self, receipts: db.Record, operation: str) -> List[int]:
+        """
+        Sends receipts to Modulkassa with up to dispatch_workers requests in flight.
+        Documents are formed and statuses are saved in the calling thread,
+        only HTTP requests are executed by the workers.
+        Returns ids of receipts that were not sent, to be retried on the next run.
+        
+        """
+
+        stats = dispatch.DispatchStats(operation)
+        failed_ids = {int(receipt["id"]) for receipt in receipts}
+
+        for (receipt, _), response, error in dispatch.dispatch(
+            self.__iter_receipt_documents(receipts, operation),
+            lambda task: self.__post_document(task[1]),
+            self._dispatch_workers,
+            stats,
+        ):
+            try:
+                if error is not None:
+                    raise error
+                if self.__apply_send_response(receipt, response, operation):
+                    failed_ids.discard(int(receipt["id"]))
+            except Exception as err: # pylint: disable=broad-except
+                logger.warning(f"Smth went wrong during {operation.upper()} - {err}")
+
+        logger.info(f"Dispatch stats: workers={self._dispatch_workers} {stats.report()}")
+        return sorted(failed_ids)
 
 
     def send_receipts(self, cash_register: int) -> None:
@@ -682,49 +829,21 @@ class ModulkassaRegister(CashregisterModule):
         if status_fn is False:
             return
 
-        # 2. Get info about new reciepts from DB
+        # 2. Get info about new reciepts from DB, newer than the cursor
+        # (periodic full sweep picks up receipts left unsent by previous runs)
+        cursor = self.__load_receipt_cursor(cash_register, ReceiptStatus.New)
         receipts = self.__get_receipt_from_billmgr(
-            cash_register, ReceiptStatus.New
-        )
-        if not receipts:
-            return
-
-        for receipt in receipts:
-            try:
-                self.send_one_receipt(receipt)
-            except Exception as err: # pylint: disable=broad-except
-                logger.warning(f"Smth went wrong during SEND_RECEIPT - {err}")
-
-
-    def prepared_one_receipt(self, receipt: db.Record) -> None:
-        """
-        Setting manually sent receipts' status according to responses
-        of send request from Modulkassa.
-        
-        """
-
-        logger.info(f"prepared_receipt: receipt={receipt}")
-        external_id = receipt["external_id"]
-        logger.info(f"prepared_receipt: external_id={external_id}")
-
-        # 1. Send document to extenal system
-        receipt_items = self.__get_receipt_item_from_billmgr(payment_receipt=receipt["id"])
-        invent_positions = self.__form_invent_positions(receipt, receipt_items)
-        document = self.__form_document(receipt, invent_positions)
-        response = modulkassa_api.send_receipt_to_external_system(
-            auth=self.api_auth, document=document
+            cash_register, ReceiptStatus.New, min_id=cursor.min_id
         )
-        if not response.ok:
-            logger.warning(
-                f"prepared_receipt: sending receipt is fail {response.status_code}"
-            )
-            return
 
-        # 2. Set status and external id in BILLmanager
-        document_details = modulkassa_api.parse_document_details(response)
-        logger.info(f"prepared_receipt: receipt's data={document_details}")
+        # 3. Send receipts, overlapping HTTP round trips when dispatch_workers > 1
+        failed_ids = []
+        if receipts:
+            failed_ids = self.__dispatch_receipts(receipts, "send_receipt")
 
-        self.__set_status_in_billmgr_after_send(receipt, document_details)
+        # 4. Keep the cursor below failed receipts, so they are retried on the next run
+        cursor.advance((receipt["id"] for receipt in receipts or []), failed_ids)
+        cursor.save()
 
 
     def prepared_receipts(self, cash_register: int) -> None:
@@ -756,43 +875,48 @@ class ModulkassaRegister(CashregisterModule):
         if status_fn is False:
             return
 
-        # 2. Get info about new reciepts from DB
-        receipts = self.__get_receipt_from_billmgr(
-            cash_register, ReceiptStatus.Prepare
-        )
-        if not receipts:
-            return
+        # 2. Get info about prepared reciepts from DB. Receipts are moved to Prepare
+        # manually and may have any id, so they are always selected without a cursor
+        receipts = self.__get_receipt_from_billmgr(cash_register, ReceiptStatus.Prepare)
 
-        for receipt in receipts:
-            try:
-                self.prepared_one_receipt(receipt)
-            except Exception as err: # pylint: disable=broad-except
-                logger.warning(f"Smth went wrong during PREPARED_RECEIPT - {err}")
+        # 3. Send receipts, overlapping HTTP round trips when dispatch_workers > 1
+        if receipts:
+            self.__dispatch_receipts(receipts, "prepared_receipt")
+
+
+    def __request_receipt_status(self, receipt: db.Record) -> requests.Response:
+        """
+        Requests receipt's status from Modulkassa. Safe to call from dispatch worker threads.
+        
+        """
+
+        return modulkassa_api.get_receipt_from_external_system(
+            auth=self.api_auth, external_id=receipt.as_str("external_id"), client=self.api_client
+        )
 
 
-    def check_one_receipt(self, receipt: db.Record) -> None:
+    def __get_check_transition(
+        self, receipt: db.Record, response: requests.Response
+    ) -> Optional[Tuple[str, dict]]:
         """
-        Setting receipts' status according to responses of check request from Modulkassa.
+        Returns (mgrctl function, params) to change receipt's status according to
+        response of check request from Modulkassa, None if status is not changed.
         
         """
 
-        logger.info(f"check_receipt: receipt={receipt}")
         external_id = receipt["external_id"]
-        logger.info(f"check_receipt: external_id={external_id}")
 
-        # 1. Get receipt from extenal system
-        response = modulkassa_api.get_receipt_from_external_system(
-            auth=self.api_auth, external_id=receipt.as_str("external_id")
-        )
         if not response.ok:
             logger.warning(
                 f"check_receipt: getting receipt is fail {response.status_code}"
             )
-            return
+            if response.status_code == HTTPStatus.UNAUTHORIZED:
+                self.__invalidate_credentials()
+            return None
 
-        # 2. Set status and external id in BILLmanager
         document_details = modulkassa_api.parse_document_details(response)
-        logger.info(f"check_receipt: receipt's data={document_details}")
+        if logger.isEnabledFor(DEBUG):
+            logger.debug(f"check_receipt: receipt's data={document_details}")
 
         status = document_details.status
         logger.info(f"check_receipt: receipt's status={status}")
@@ -808,44 +932,47 @@ class ModulkassaRegister(CashregisterModule):
                 f"check_receipt: payment_receipt get wait elid={receipt.as_str('id')}, "
                 f"externalid={external_id}"
             )
+            return None
 
-        elif status in (
+        if status in (
             modulkassa_api.DocumentStatus.COMPLETED.name,
             modulkassa_api.DocumentStatus.PRINTED.name,
         ):
-            misc.Mgrctl(
-                "payment_receipt.success",
-                elid=receipt.as_str("id"),
-                externalid=external_id,
-                fn_number=document_details.fiscalInfo.fnNumber,
-                fiscal_document_number=document_details.fiscalInfo.fnDocNumber,
-                fiscal_document_attribute=document_details.fiscalInfo.fnDocMark,
-                receiptdate=document_details.fiscalInfo.receiptdate,
-                receiptdate_tz=document_details.fiscalInfo.receiptdate_tz
-            )
-            logger.info(
-                f"check_receipt: payment_receipt get success elid={receipt.as_str('id')}, "
-                f"externalid={external_id}"
-            )
+            return "payment_receipt.success", {
+                "elid": receipt.as_str("id"),
+                "externalid": external_id,
+                "fn_number": document_details.fiscalInfo.fnNumber,
+                "fiscal_document_number": document_details.fiscalInfo.fnDocNumber,
+                "fiscal_document_attribute": document_details.fiscalInfo.fnDocMark,
+                "receiptdate": document_details.fiscalInfo.receiptdate,
+                "receiptdate_tz": document_details.fiscalInfo.receiptdate_tz,
+            }
 
-        elif status in (modulkassa_api.DocumentStatus.FAILED.name):
-            misc.Mgrctl(
-                "payment_receipt.error",
-                elid=receipt.as_str("id"),
-                externalid=external_id,
-                error_message=document_details.failureInfo.message,
-            )
-            logger.info(
-                f"check_receipt: payment_receipt get error elid={receipt.as_str('id')}, "
-                f"externalid={external_id}"
-            )
+        if status == modulkassa_api.DocumentStatus.FAILED.name:
+            return "payment_receipt.error", {
+                "elid": receipt.as_str("id"),
+                "externalid": external_id,
+                "error_message": document_details.failureInfo.message,
+            }
 
-        else:
-            logger.info(
-                f"check_receipt: payment_receipt got unknown status "
-                f"elid={receipt.as_str('id')}, "
-                f"externalid={external_id}"
-            )
+        logger.info(
+            f"check_receipt: payment_receipt got unknown status "
+            f"elid={receipt.as_str('id')}, "
+            f"externalid={external_id}"
+        )
+        return None
+
+
+    def __apply_check_transition(self, func: str, params: dict) -> None:
+        """
+        Saves receipt's status change in BILLmanager
+        
+        """
+
+        misc.Mgrctl(func, **params)
+        logger.info(
+            f"check_receipt: {func} elid={params['elid']}, externalid={params['externalid']}"
+        )
 
 
     def check_receipts(self, cash_register: int) -> None:
@@ -885,11 +1012,59 @@ class ModulkassaRegister(CashregisterModule):
         if not receipts:
             return
 
-        for receipt in receipts:
+        # 3. Skip receipts checked recently (exponential back-off)
+        poll_state = None
+        if self._check_backoff:
+            poll_state = polling.PollState.load(
+                f"tmp/.crmodulkassa/{MODULE}_check_{cash_register}.state"
+            )
+            due_receipts = [
+                receipt for receipt in receipts
+                if poll_state.is_due(receipt["id"], receipt["last_notify_time"])
+            ]
+            logger.info(
+                f"check_receipts: {len(due_receipts)} of {len(receipts)} receipts are due"
+            )
+        else:
+            due_receipts = receipts
+
+        # 4. Poll statuses, overlapping HTTP round trips when dispatch_workers > 1.
+        # Each status change is saved as soon as its response arrives
+        stats = dispatch.DispatchStats("check_receipt")
+        changed = set()
+
+        for receipt, response, error in dispatch.dispatch(
+            due_receipts, self.__request_receipt_status, self._dispatch_workers, stats
+        ):
             try:
-                self.check_one_receipt(receipt)
+                if error is not None:
+                    raise error
+                transition = self.__get_check_transition(receipt, response)
             except Exception as err: # pylint: disable=broad-except
                 logger.warning(f"Smth went wrong during CHECK_RECEIPT - {err}")
+                continue
+
+            if transition:
+                changed.add(transition[1]["elid"])
+                try:
+                    self.__apply_check_transition(*transition)
+                except Exception as err: # pylint: disable=broad-except
+                    logger.warning(f"Smth went wrong during CHECK_RECEIPT - {err}")
+            elif poll_state is not None and response.ok:
+                # Back off only when Modulkassa returned unchanged status,
+                # failed requests are retried on the next run
+                poll_state.register_check(receipt["id"])
+
+        logger.info(f"Dispatch stats: workers={self._dispatch_workers} {stats.report()}")
+
+        if poll_state is not None:
+            poll_state.keep_only(
+                receipt.as_str("id") for receipt in receipts
+                if receipt.as_str("id") not in changed
+            )
+            poll_state.save()
+
+        logger.info(f"check_receipts: {len(changed)} receipts changed status")
 
 
 if __name__ == "__main__":
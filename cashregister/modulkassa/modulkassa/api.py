@@ -1,16 +1,31 @@
 """Interaction with ModulKassa API"""
 import decimal
 import datetime as dt
+import functools
+import json
+import logging
+import re
 from enum import Enum
-from typing import NamedTuple, List, Optional, Tuple
+from typing import NamedTuple, List, Optional, Tuple, Union
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
 
 from billmgr.logger import get_logger
 from billmgr.exception import XmlException
 
 MODULE = "modulkassa_api"
 
+DEFAULT_POOL_SIZE = 4
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 10
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+Timeout = Union[float, Tuple[float, float]]
+
 
 # _____________________BASIC_REQUESTS________________________
 
@@ -34,21 +49,124 @@ def create_auth_data(url: str, username: str, password: str) -> Auth:
     return Auth(url, HTTPBasicAuth(username, password))
 
 
+class ApiClient:
+    """
+    Keep-alive HTTP client shared by all requests of one run.
+
+    Connections to ModulKassa are kept in a pool of pool_size connections,
+    so concurrent dispatch workers reuse TCP and TLS sessions.
+    Connection errors are retried for every method, 429 and 5xx responses
+    are retried with exponential backoff only for idempotent methods,
+    so a document is never posted twice because of a slow response.
+
+    """
+
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        retries: int = DEFAULT_RETRIES,
+        backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+    ) -> None:
+        self.timeout: Timeout = (connect_timeout, read_timeout)
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=max(1, pool_size), max_retries=retry
+        )
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(
+        self,
+        auth: Auth,
+        url: str,
+        http_method: str,
+        data: dict = None,
+        timeout: Optional[Timeout] = None,
+    ) -> requests.Response:
+        """
+        Executes an HTTP request on the pooled session.
+        timeout overrides the client's (connect, read) timeouts for this call.
+
+        """
+
+        return self.session.request(
+            method=http_method,
+            url=url,
+            json=data,
+            auth=auth.basic,
+            timeout=timeout if timeout is not None else self.timeout,
+        )
+
+    def close(self) -> None:
+        """
+        Closes all pooled connections
+
+        """
+
+        self.session.close()
+
+    def __enter__(self) -> "ApiClient":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+_default_client: Optional[ApiClient] = None
+
+
+def default_client() -> ApiClient:
+    """
+    Returns process-wide client used when the caller does not pass its own
+
+    """
+
+    global _default_client  # pylint: disable=global-statement
+    if _default_client is None:
+        _default_client = ApiClient()
+    return _default_client
+
+
 def __request(
-    auth: Auth, url: str, http_method: str, data: dict = None
+    auth: Auth,
+    url: str,
+    http_method: str,
+    data: dict = None,
+    client: Optional[ApiClient] = None,
+    timeout: Optional[Timeout] = None,
 ) -> requests.Response:
     """
     Executes an HTTP request using the provided authentication, URL, and method
     
     """
 
-    get_logger(MODULE).debug(f"request: url={url} http_method={http_method} data={data}")
+    logger = get_logger(MODULE)
+    debug = logger.isEnabledFor(logging.DEBUG)
+
+    # Payloads are formatted only for debug log, it's costly for thousands of receipts
+    if debug:
+        logger.debug(f"request: url={url} http_method={http_method} data={data}")
 
-    response = requests.request(
-        method=http_method, url=url, json=data, auth=auth.basic, timeout=10
+    response = (client or default_client()).request(
+        auth, url, http_method, data=data, timeout=timeout
     )
 
-    get_logger(MODULE).debug(f"response: status_code={response.status_code} text={response.text}")
+    if debug:
+        logger.debug(f"response: status_code={response.status_code} text={response.text}")
 
     if not response.ok:
         get_logger(MODULE).error(f"Error with request: {response.text}")
@@ -297,7 +415,12 @@ class DocumentDetails(NamedTuple):
 # ______________________ASSOCIATE__________________________
 
 
-def request_associate(auth: Auth, retailpointid) -> requests.Response:
+def request_associate(
+    auth: Auth,
+    retailpointid,
+    client: Optional[ApiClient] = None,
+    timeout: Optional[Timeout] = None,
+) -> requests.Response:
     """
     Creates authorization data for sending receipts for fiscalization via POST request.
     
@@ -308,13 +431,15 @@ def request_associate(auth: Auth, retailpointid) -> requests.Response:
 
     url = f"{auth.url}/v1/associate/{retailpointid}"
 
-    return __request(auth, url, "POST")
+    return __request(auth, url, "POST", client=client, timeout=timeout)
 
 
 # ______________________STATUS_FN__________________________
 
 
-def request_status_fn(auth: Auth) -> requests.Response:
+def request_status_fn(
+    auth: Auth, client: Optional[ApiClient] = None, timeout: Optional[Timeout] = None
+) -> requests.Response:
     """
     Requests the fiscalization service status to check its readiness.
     
@@ -324,14 +449,17 @@ def request_status_fn(auth: Auth) -> requests.Response:
 
     url = f"{auth.url}/v1/status"
 
-    return __request(auth, url, "GET")
+    return __request(auth, url, "GET", client=client, timeout=timeout)
 
 
 # ______________________SEND_RECEIPT_TO_EXTERNAL_SYSTEM__________________________
 
 
 def send_receipt_to_external_system(
-    auth: Auth, document: Document
+    auth: Auth,
+    document: Document,
+    client: Optional[ApiClient] = None,
+    timeout: Optional[Timeout] = None,
 ) -> requests.Response:
     """
     Gets Document from cashregister and serializes to JSON.
@@ -339,20 +467,27 @@ def send_receipt_to_external_system(
     
     """
 
-    get_logger(MODULE).info("send_receipt_to_external_system: run")
-    get_logger(MODULE).info(f"send_receipt_to_external_system input: document = {document}")
+    logger = get_logger(MODULE)
+    logger.info(f"send_receipt_to_external_system: run id={document.id}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"send_receipt_to_external_system input: document = {document}")
 
     data = document._asdict()
 
     url = f"{auth.url}/v2/doc"
 
-    return __request(auth, url, "POST", data)
+    return __request(auth, url, "POST", data, client=client, timeout=timeout)
 
 
 # ______________________GET_RECEIPT_FROM_EXTERNAL_SYSTEM__________________________
 
 
-def get_receipt_from_external_system(auth: Auth, external_id: str) -> requests.Response:
+def get_receipt_from_external_system(
+    auth: Auth,
+    external_id: str,
+    client: Optional[ApiClient] = None,
+    timeout: Optional[Timeout] = None,
+) -> requests.Response:
     """
     Retrieves the status of a receipt from an external system.
     
@@ -363,123 +498,123 @@ def get_receipt_from_external_system(auth: Auth, external_id: str) -> requests.R
 
     url = f"{auth.url}/v1/doc/{external_id}/status"
 
-    return __request(auth, url, "GET")
+    return __request(auth, url, "GET", client=client, timeout=timeout)
+
+
+# date and optional time: HH:MM with optional seconds and fraction, then optional "Z" or ±HH[:MM] offset
+ISO_DATE_RE = re.compile(
+    r"(?P<date>\d{4}-\d{2}-\d{2})"
+    r"(?:[T ](?P<hour>\d{2}):(?P<minute>\d{2})(?::(?P<second>\d{2})(?:[.,]\d{1,6})?)?"
+    r"(?:(?P<utc>Z)|(?P<sign>[+-])(?P<tz_hour>\d{2})(?::?(?P<tz_minute>\d{2}))?)?)?"
+)
 
 
-def parse_date(date_str: str) -> Tuple[Optional[dt.datetime], Optional[str]]:
+@functools.lru_cache(maxsize=1024)
+def parse_date(date_str: str) -> Tuple[Optional[str], Optional[str]]:
     """
-    Parses ISO 8601 date string into datetime object and timezone offset.
+    Parses ISO 8601 date string into "YYYY-MM-DD HH:MM:SS" string and timezone offset.
     
     Supports multiple formats:
     - With milliseconds and 'Z' (UTC): "2025-05-03T07:29:34.123Z" → (datetime, "+00:00")
     - With ±HH:MM offset:             "2025-05-03T07:29:34+03:00" → (datetime, "+03:00")
     - With ±HHMM offset:              "2025-05-03T07:29:34+0300" → (datetime, "+03:00")
     - Without timezone:               "2025-05-03T07:29:34" → (datetime, None)
+    - Without seconds:                "2025-05-03T07:29" → ("2025-05-03 07:29:00", None)
+    - Date only:                      "2025-05-03" → ("2025-05-03 00:00:00", None)
     - Invalid format:                 "invalid" → (None, None)
+
+    Fractional seconds are accepted and dropped in every format. "Z" requires seconds.
+    Results are memoized, Modulkassa returns the same timestamps for many documents.
     """
     if not date_str:
         return None, None
 
-    try:
-        # Handle UTC 'Z' format
-        if date_str.endswith('Z'):
-            if '.' in date_str:  # With milliseconds
-                dt_obj = dt.datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S.%fZ")
-            else:  # Without milliseconds
-                dt_obj = dt.datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%SZ")
-            return dt_obj.strftime("%Y-%m-%d %H:%M:%S"), "+00:00"
-
-        # Handle offset formats
-        if '+' in date_str or '-' in date_str:
-            if 'T' in date_str:
-                tz_index = max(date_str.rfind('+'), date_str.rfind('-'))
-                if tz_index > date_str.find('T'):
-                    dt_part = date_str[:tz_index]
-                    tz_part = date_str[tz_index:]
-
-                    # Normalize timezone
-                    if ':' in tz_part:
-                        tz_offset = tz_part
-                    else:
-                        tz_offset = f"{tz_part[:3]}:{tz_part[3:]}" if len(tz_part) > 3 else "+00:00"
-
-                    dt_obj = dt.datetime.fromisoformat(dt_part + tz_offset)
-                    return dt_obj.strftime("%Y-%m-%d %H:%M:%S"), tz_offset
-
-        # Handle basic ISO format without timezone
-        dt_obj = dt.datetime.fromisoformat(date_str)
-        return dt_obj.strftime("%Y-%m-%d %H:%M:%S"), None
+    match = ISO_DATE_RE.fullmatch(date_str)
+    if match is None:
+        return None, None
 
+    date_part = match.group("date")
+    hour, minute, second = match.group("hour", "minute", "second")
+    if match.group("utc") and second is None:
+        return None, None
+    hour, minute, second = hour or "00", minute or "00", second or "00"
+
+    # Validates ranges of day, month, hour, etc.
+    try:
+        dt.datetime(
+            int(date_part[0:4]), int(date_part[5:7]), int(date_part[8:10]),
+            int(hour), int(minute), int(second),
+        )
     except ValueError:
-        try:
-            # Fallback for non-standard formats
-            dt_obj = dt.datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S.%f%z")
-            tz_offset = dt_obj.strftime("%z")
-            tz_offset = f"{tz_offset[:3]}:{tz_offset[3:]}" if tz_offset else None
-            return dt_obj.strftime("%Y-%m-%d %H:%M:%S"), tz_offset
-        except ValueError:
+        return None, None
+
+    if match.group("utc"):
+        tz_offset = "+00:00"
+    elif match.group("sign"):
+        tz_hour = match.group("tz_hour")
+        tz_minute = match.group("tz_minute") or "00"
+        if int(tz_hour) > 23 or int(tz_minute) > 59:
             return None, None
+        tz_offset = f"{match.group('sign')}{tz_hour}:{tz_minute}"
+    else:
+        tz_offset = None
+
+    return f"{date_part} {hour}:{minute}:{second}", tz_offset
+
+
+def parse_fiscal_info(fiscal_data: Optional[dict]) -> FiscalInfo:
+    """
+    Builds FiscalInfo straight from "fiscalInfo" object of the response
+    
+    """
+
+    if not fiscal_data:
+        return FiscalInfo()
+
+    get = fiscal_data.get
+    try:
+        receiptdate, receiptdate_tz = parse_date(get("date"))
+        sum_doc = get("sum")
+        return FiscalInfo(
+            get("shiftNumber"),
+            get("checkNumber"),
+            get("kktNumber"),
+            get("fnNumber"),
+            get("fnDocNumber"),
+            get("fnDocMark"),
+            receiptdate,
+            receiptdate_tz,
+            decimal.Decimal(sum_doc) if sum_doc else None,
+            get("checkType"),
+            get("qr"),
+        )
+    except (ValueError, KeyError, TypeError, decimal.InvalidOperation) as e:
+        get_logger(MODULE).error(f"Error parsing fiscalInfo: {e}")
+        return FiscalInfo()
+
 
 def parse_document_details(response: requests.Response) -> DocumentDetails:
     """
     Parses the response from an external system to extract and structure document details.
+    Body is decoded from raw bytes once and only the fields of DocumentDetails are read.
     
     """
 
-    get_logger(MODULE).info("api.DocumentDetails run")
-
-    json_data = response.json()
-
-    status = json_data.get("status")
-    get_logger(MODULE).info(f"status = {status}")
-
-    message = json_data.get("message")
-    get_logger(MODULE).info(f"message = {message}")
-
-    fnstate = json_data.get("fnState")
-
-    # Parsing fiscalInfo if it exists
-    fiscal_info = FiscalInfo()
-    if "fiscalInfo" in json_data and json_data["fiscalInfo"] is not None:
-        fiscal_data = json_data["fiscalInfo"]
-        try:
-            date_str = fiscal_data.get("date")
-            get_logger(MODULE).warning("beep1")
-            receiptdate, receiptdate_tz = parse_date(date_str)
-            get_logger(MODULE).warning("beep2")
-            fiscal_info = FiscalInfo(
-                shiftNumber=fiscal_data.get("shiftNumber"),
-                checkNumber=fiscal_data.get("checkNumber"),
-                kktNumber=fiscal_data.get("kktNumber"),
-                fnNumber=fiscal_data.get("fnNumber"),
-                fnDocNumber=fiscal_data.get("fnDocNumber"),
-                fnDocMark=fiscal_data.get("fnDocMark"),
-                receiptdate=receiptdate,
-                receiptdate_tz=receiptdate_tz,
-                sumDoc=decimal.Decimal(fiscal_data.get("sum")) if fiscal_data.get("sum") else None,
-                checkType=fiscal_data.get("checkType"),
-                qr=fiscal_data.get("qr"),
-            )
-            get_logger(MODULE).warning("beep3")
-        except (ValueError, KeyError) as e:
-            get_logger.error(f"Error parsing fiscalInfo: {e}")
-            fiscal_info = FiscalInfo()
-
-    # Parsing failureInfo if it exists
-    failure_info = FailureInfo()
-    if "failureInfo" in json_data and json_data["failureInfo"] is not None:
-        fail_data = json_data["failureInfo"]
-        failure_info = FailureInfo(
-            failure_type=fail_data.get("type"),
-            message=fail_data.get("message"),
-        )
-    get_logger(MODULE).warning("beep4")
+    json_data = json.loads(response.content)
+    get = json_data.get
+
+    fail_data = get("failureInfo")
+    failure_info = (
+        FailureInfo(fail_data.get("type"), fail_data.get("message"))
+        if fail_data else FailureInfo()
+    )
+
     return DocumentDetails(
-        status=status,
-        fnState=fnstate,
-        fiscalInfo=fiscal_info,
-        failureInfo=failure_info,
-        message=message,
+        get("status"),
+        get("fnState"),
+        parse_fiscal_info(get("fiscalInfo")),
+        failure_info,
+        get("message"),
     )
 
 
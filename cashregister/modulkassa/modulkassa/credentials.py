@@ -0,0 +1,110 @@
+"""On-disk cache of credentials issued by ModulKassa associate request"""
+import hashlib
+import json
+import os
+import time
+from typing import NamedTuple, Optional
+
+import billmgr.crypto as crypto
+from billmgr.logger import get_logger
+
+MODULE = "modulkassa_api"
+
+CACHE_DIR = "tmp/.crmodulkassa"
+
+# Associate credentials are reissued rarely, status of the fiscal drive may change any time
+CREDENTIALS_TTL = 24 * 60 * 60
+STATUS_TTL = 60
+
+
+class CachedCredentials(NamedTuple):
+    """
+    Represents credentials of the retail point and the last known service status
+
+    """
+
+    username: str
+    password: str
+    created: float
+    status: Optional[str] = None
+    status_checked: float = 0.0
+
+    def is_status_fresh(self, ttl: float = STATUS_TTL) -> bool:
+        """
+        Returns True if cached service status may be used without a request
+
+        """
+
+        return self.status is not None and time.time() - self.status_checked < ttl
+
+
+def cache_path(url: str, username: str, retailpointid: str) -> str:
+    """
+    Returns cache file path for url+username+retailpointid
+
+    """
+
+    key = hashlib.sha256(f"{url}\n{username}\n{retailpointid}".encode()).hexdigest()
+    return os.path.join(CACHE_DIR, f"associate_{key}.cache")
+
+
+def load(
+    url: str, username: str, retailpointid: str, ttl: float = CREDENTIALS_TTL
+) -> Optional[CachedCredentials]:
+    """
+    Returns cached credentials or None if there are no valid ones
+
+    """
+
+    path = cache_path(url, username, retailpointid)
+
+    try:
+        with open(path, "r", encoding="utf-8") as cache_file:
+            data = json.loads(crypto.decrypt_value(cache_file.read()))
+        cached = CachedCredentials(**data)
+    except FileNotFoundError:
+        return None
+    except Exception as err:  # pylint: disable=broad-except
+        get_logger(MODULE).warning(f"credentials cache is broken, ignore it: {err}")
+        invalidate(url, username, retailpointid)
+        return None
+
+    if time.time() - cached.created >= ttl:
+        get_logger(MODULE).info("credentials cache is expired")
+        return None
+
+    return cached
+
+
+def save(url: str, username: str, retailpointid: str, credentials: CachedCredentials) -> None:
+    """
+    Encrypts credentials and atomically writes them to the cache file
+
+    """
+
+    path = cache_path(url, username, retailpointid)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        descriptor = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, "w", encoding="utf-8") as cache_file:
+            cache_file.write(crypto.encrypt_value(json.dumps(credentials._asdict())))
+        os.replace(tmp_path, path)
+    except OSError as err:
+        get_logger(MODULE).warning(f"failed to save credentials cache: {err}")
+
+
+def invalidate(url: str, username: str, retailpointid: str) -> None:
+    """
+    Removes cached credentials, next run will request associate again
+
+    """
+
+    try:
+        os.remove(cache_path(url, username, retailpointid))
+        get_logger(MODULE).info("credentials cache is invalidated")
+    except FileNotFoundError:
+        pass
+    except OSError as err:
+        get_logger(MODULE).warning(f"failed to invalidate credentials cache: {err}")
@@ -0,0 +1,91 @@
+"""Incremental cursor over payment_receipt ids of one cash register"""
+import json
+import os
+import time
+from typing import Any, Iterable, Optional
+
+from billmgr.logger import get_logger
+
+MODULE = "modulkassa_api"
+
+# How often the whole receipt window is rescanned to pick up skipped receipts
+FULL_SWEEP_INTERVAL = 60 * 60
+
+
+class ReceiptCursor:
+    """
+    Remembers the greatest receipt id already processed and
+    the time of the last full scan of the receipt window
+
+    """
+
+    def __init__(self, path: str, last_id: int = 0, last_full_sweep: float = 0.0) -> None:
+        self.path = path
+        self.last_id = last_id
+        self.last_full_sweep = last_full_sweep
+        self.full_sweep = False
+
+    @classmethod
+    def load(cls, path: str, sweep_interval: float = FULL_SWEEP_INTERVAL) -> "ReceiptCursor":
+        """
+        Reads cursor from file and decides if this run has to be a full sweep
+
+        """
+
+        cursor = cls(path)
+
+        try:
+            with open(path, "r", encoding="utf-8") as cursor_file:
+                data = json.load(cursor_file)
+            cursor.last_id = int(data["last_id"])
+            cursor.last_full_sweep = float(data["last_full_sweep"])
+        except FileNotFoundError:
+            pass
+        except (ValueError, TypeError, KeyError, OSError) as err:
+            get_logger(MODULE).warning(f"receipt cursor {path} is broken, ignore it: {err}")
+
+        cursor.full_sweep = time.time() - cursor.last_full_sweep >= sweep_interval
+        return cursor
+
+    @property
+    def min_id(self) -> Optional[int]:
+        """
+        Returns id that receipts must be greater than, None for a full sweep
+
+        """
+
+        return None if self.full_sweep else self.last_id
+
+    def advance(self, receipt_ids: Iterable[Any], failed_ids: Iterable[Any] = ()) -> None:
+        """
+        Moves cursor to the greatest of processed receipt ids,
+        but keeps it below the smallest failed one
+
+        """
+
+        last_id = max([self.last_id, *(int(receipt_id) for receipt_id in receipt_ids)])
+        failed = [int(receipt_id) for receipt_id in failed_ids]
+        if failed:
+            last_id = min(last_id, min(failed) - 1)
+        self.last_id = last_id
+        if self.full_sweep:
+            self.last_full_sweep = time.time()
+
+    def save(self) -> None:
+        """
+        Atomically writes cursor to file
+
+        """
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as cursor_file:
+                json.dump(
+                    {"last_id": self.last_id, "last_full_sweep": self.last_full_sweep},
+                    cursor_file,
+                )
+            os.replace(tmp_path, self.path)
+        except OSError as err:
+            get_logger(MODULE).warning(f"failed to save receipt cursor {self.path}: {err}")
@@ -0,0 +1,124 @@
+"""Bounded-concurrency dispatch of receipts to ModulKassa API"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List, Tuple
+
+DEFAULT_WORKERS = 1
+MAX_WORKERS = 32
+
+
+def normalize_workers(value: Any) -> int:
+    """
+    Converts worker count from cash register form into a safe pool size
+
+    """
+
+    try:
+        workers = int(value)
+    except (ValueError, TypeError):
+        return DEFAULT_WORKERS
+
+    return max(DEFAULT_WORKERS, min(workers, MAX_WORKERS))
+
+
+class DispatchStats:
+    """
+    Collects throughput and latency statistics of one dispatch run
+
+    """
+
+    def __init__(self, operation: str) -> None:
+        self.operation = operation
+        self.succeeded = 0
+        self.failed = 0
+        self.latencies: List[float] = []
+        self.__started = time.monotonic()
+
+    def add(self, latency: float, ok: bool) -> None:
+        """
+        Registers one finished request
+
+        """
+
+        self.latencies.append(latency)
+        if ok:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+    def percentile(self, percent: float) -> float:
+        """
+        Returns latency percentile in seconds (nearest-rank method)
+
+        """
+
+        if not self.latencies:
+            return 0.0
+
+        ordered = sorted(self.latencies)
+        rank = max(0, min(len(ordered) - 1, int(round(percent / 100 * len(ordered))) - 1))
+        return ordered[rank]
+
+    def report(self) -> str:
+        """
+        Returns one-line summary suitable for the module log
+
+        """
+
+        elapsed = time.monotonic() - self.__started
+        total = self.succeeded + self.failed
+        rate = total / elapsed if elapsed > 0 else 0.0
+
+        return (
+            f"{self.operation}: total={total} succeeded={self.succeeded} failed={self.failed} "
+            f"elapsed={elapsed:.3f}s rate={rate:.2f}/s "
+            f"latency p50={self.percentile(50):.3f}s p95={self.percentile(95):.3f}s "
+            f"max={max(self.latencies, default=0.0):.3f}s"
+        )
+
+
+def dispatch(
+    tasks: Iterable[Any], call: Callable[[Any], Any], workers: int, stats: DispatchStats
+) -> Iterator[Tuple[Any, Any, Exception]]:
+    """
+    Runs call(task) for every task with at most `workers` requests in flight.
+
+    Yields (task, result, error) in completion order, so the caller can apply
+    results to BILLmanager from its own thread. With one worker the tasks are
+    processed serially without a thread pool.
+
+    """
+
+    def timed_call(task: Any) -> Tuple[Any, Exception, float]:
+        started = time.monotonic()
+        try:
+            result = call(task)
+        except Exception as err:  # pylint: disable=broad-except
+            return None, err, time.monotonic() - started
+        return result, None, time.monotonic() - started
+
+    def finish(task: Any, result: Any, error: Exception, latency: float) -> Tuple[Any, Any, Exception]:
+        stats.add(latency, error is None and getattr(result, "ok", True))
+        return task, result, error
+
+    if workers <= 1:
+        for task in tasks:
+            yield finish(task, *timed_call(task))
+        return
+
+    # Keep at most `workers` futures outstanding, so a large backlog is not
+    # queued in the pool and results are applied while requests are in flight
+    pending_tasks = iter(tasks)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="modulkassa") as pool:
+        futures = {}
+        for task in islice(pending_tasks, workers):
+            futures[pool.submit(timed_call, task)] = task
+
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = futures.pop(future)
+                for next_task in islice(pending_tasks, 1):
+                    futures[pool.submit(timed_call, next_task)] = next_task
+                yield finish(task, *future.result())
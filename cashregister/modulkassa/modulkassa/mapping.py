@@ -0,0 +1,127 @@
+"""Receipt mapping from BILLmanager values to ModulKassa API values, built once at import"""
+from typing import Any, NamedTuple, Optional
+
+from modulkassa.api import DocType, PaymentMethod, PaymentObject, PaymentType, VatTag
+
+VAT_TAG_BY_TAXRATE = {
+    20: VatTag.PERCENT_20.value,
+    10: VatTag.PERCENT_10.value,
+    0: VatTag.NO_NDS.value,
+    120: VatTag.PERCENT_20_120.value,
+    110: VatTag.PERCENT_10_110.value,
+}
+NO_NDS_VAT_TAG = VAT_TAG_BY_TAXRATE[0]
+
+PAYMENT_METHOD_NAMES = {item.value: item.name.lower() for item in PaymentMethod}
+PAYMENT_OBJECT_NAMES = {item.value: item.name.lower() for item in PaymentObject}
+PAYMENT_TYPE_NAMES = {item.value: item.name.upper() for item in PaymentType}
+DOC_TYPE_NAMES = {item.value: item.name for item in DocType}
+
+FALLBACK_PAYMENT_METHOD = PaymentMethod.FULL_PAYMENT.name.lower()
+ADVANCE_PAYMENT_METHOD = PaymentMethod.ADVANCE.name.lower()
+ADVANCE_PAYMENT_OBJECT = PaymentObject.PAYMENT.name.lower()
+ORDER_PAYMENT_OBJECT = PaymentObject.SERVICE.name.lower()
+EXPENSE_PAYMENT_TYPE = PaymentType.PREPAID.name.upper()
+DEFAULT_PAYMENT_TYPE = PaymentType.CARD.name.upper()
+
+
+class ReceiptDefaults(NamedTuple):
+    """
+    Payment method and object forced by BILLmanager config for every position
+
+    """
+
+    payment_method: Optional[str] = None
+    payment_object: Optional[str] = None
+
+
+def _to_int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def receipt_defaults(payment_method: Any, payment_object: Any) -> ReceiptDefaults:
+    """
+    Resolves ReceiptDefaultPaymentMethod and ReceiptDefaultPaymentObject config params.
+    Unknown payment method falls back to full_payment, unknown payment object is ignored.
+
+    """
+
+    return ReceiptDefaults(
+        payment_method=(
+            PAYMENT_METHOD_NAMES.get(_to_int(payment_method), FALLBACK_PAYMENT_METHOD)
+            if payment_method else None
+        ),
+        payment_object=(
+            PAYMENT_OBJECT_NAMES.get(_to_int(payment_object)) if payment_object else None
+        ),
+    )
+
+
+def resolve_payment_method(defaults: ReceiptDefaults, payment_method: Any, billorder: Any) -> str:
+    """
+    Returns ModulKassa payment method of the position
+
+    """
+
+    if defaults.payment_method:
+        return defaults.payment_method
+
+    name = PAYMENT_METHOD_NAMES.get(int(payment_method))
+    if name is None:
+        name = ADVANCE_PAYMENT_METHOD if billorder is None else FALLBACK_PAYMENT_METHOD
+    return name
+
+
+def resolve_payment_object(defaults: ReceiptDefaults, payment_object: Any, billorder: Any) -> str:
+    """
+    Returns ModulKassa payment object of the position
+
+    """
+
+    if defaults.payment_object:
+        return defaults.payment_object
+
+    name = PAYMENT_OBJECT_NAMES.get(int(payment_object))
+    if name is None:
+        name = ADVANCE_PAYMENT_OBJECT if billorder is None else ORDER_PAYMENT_OBJECT
+    return name
+
+
+def resolve_vat_tag(taxrate: Any) -> Optional[int]:
+    """
+    Returns ModulKassa VAT tag for BILLmanager tax rate, None if rate is not supported.
+    Raises ValueError or TypeError if taxrate is not a number.
+
+    """
+
+    return VAT_TAG_BY_TAXRATE.get(int(taxrate))
+
+
+def resolve_payment_type(payment_type: Any, is_expense: bool) -> str:
+    """
+    Returns ModulKassa payment type of the receipt
+
+    """
+
+    if payment_type is None:
+        return EXPENSE_PAYMENT_TYPE if is_expense else DEFAULT_PAYMENT_TYPE
+
+    name = PAYMENT_TYPE_NAMES.get(payment_type)
+    if name is None:
+        raise ValueError(f"{payment_type} is not a valid PaymentType")
+    return name
+
+
+def resolve_doc_type(receipt_type: Any) -> str:
+    """
+    Returns ModulKassa document type of the receipt
+
+    """
+
+    name = DOC_TYPE_NAMES.get(receipt_type)
+    if name is None:
+        raise ValueError(f"{receipt_type} is not a valid DocType")
+    return name
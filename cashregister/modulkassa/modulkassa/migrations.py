@@ -0,0 +1,59 @@
+"""Database helpers recommended for ModulKassa cash register"""
+import sys
+
+if "/usr/local/mgr5/lib/python" not in sys.path:
+    sys.path.insert(0, "/usr/local/mgr5/lib/python")
+
+# pylint: disable=wrong-import-position
+from billmgr import db
+from billmgr.logger import get_logger
+
+MODULE = "modulkassa_api"
+
+RECEIPT_LOOKUP_INDEX = "payment_receipt_cash_register_status_createdate"
+RECEIPT_LOOKUP_INDEX_SQL = (
+    f"CREATE INDEX {RECEIPT_LOOKUP_INDEX}"
+    " ON payment_receipt (payment_cash_register, status, createdate)"
+)
+
+
+def has_receipt_lookup_index() -> bool:
+    """
+    Returns True if payment_receipt has the receipt lookup index
+
+    """
+
+    result = db.get_first_record(
+        "SELECT index_name FROM information_schema.statistics"
+        " WHERE table_schema = DATABASE()"
+        " AND table_name = 'payment_receipt'"
+        " AND index_name = %s",
+        RECEIPT_LOOKUP_INDEX
+    )
+
+    return bool(result)
+
+
+def ensure_receipt_lookup_index() -> bool:
+    """
+    Creates (payment_cash_register, status, createdate) index on payment_receipt
+    used by the receipt selection of every run. Returns True if index was created.
+
+    """
+
+    if has_receipt_lookup_index():
+        get_logger(MODULE).info(f"index {RECEIPT_LOOKUP_INDEX} already exists")
+        return False
+
+    get_logger(MODULE).info(f"creating index: {RECEIPT_LOOKUP_INDEX_SQL}")
+    db.db_query(RECEIPT_LOOKUP_INDEX_SQL)
+    return True
+
+
+if __name__ == "__main__":
+    if "--print" in sys.argv:
+        print(f"{RECEIPT_LOOKUP_INDEX_SQL};")
+    elif ensure_receipt_lookup_index():
+        print(f"index {RECEIPT_LOOKUP_INDEX} created")
+    else:
+        print(f"index {RECEIPT_LOOKUP_INDEX} already exists")
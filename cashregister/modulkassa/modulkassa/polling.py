@@ -0,0 +1,130 @@
+"""Exponential back-off of receipt status checks"""
+import datetime as dt
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from billmgr.logger import get_logger
+
+MODULE = "modulkassa_api"
+
+# Delay before the n-th repeated check is BASE * 2^(n-1), but not more than MAX
+CHECK_BACKOFF_BASE = 60
+CHECK_BACKOFF_MAX = 60 * 60
+
+
+def check_delay(attempts: int) -> float:
+    """
+    Returns minimal delay in seconds after `attempts` unsuccessful checks
+
+    """
+
+    if attempts <= 0:
+        return 0.0
+
+    return float(min(CHECK_BACKOFF_BASE * 2 ** min(attempts - 1, 16), CHECK_BACKOFF_MAX))
+
+
+def _timestamp(value: Any) -> float:
+    """
+    Converts database datetime value into unix timestamp, 0 if it is empty
+
+    """
+
+    if not value:
+        return 0.0
+
+    if isinstance(value, str):
+        try:
+            value = dt.datetime.fromisoformat(value)
+        except ValueError:
+            return 0.0
+
+    if isinstance(value, dt.datetime):
+        return value.timestamp()
+
+    return 0.0
+
+
+class PollState:
+    """
+    Stores number of checks and time of the last check for every waiting receipt
+
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.__receipts: Dict[str, List[float]] = {}
+
+    @classmethod
+    def load(cls, path: str) -> "PollState":
+        """
+        Reads state from file, empty state is returned if file is missing or broken
+
+        """
+
+        state = cls(path)
+
+        try:
+            with open(path, "r", encoding="utf-8") as state_file:
+                state.__receipts = {
+                    str(receipt_id): [int(attempts), float(last_check)]
+                    for receipt_id, (attempts, last_check) in json.load(state_file).items()
+                }
+        except FileNotFoundError:
+            pass
+        except (ValueError, TypeError, OSError) as err:
+            get_logger(MODULE).warning(f"poll state {path} is broken, ignore it: {err}")
+
+        return state
+
+    def save(self) -> None:
+        """
+        Atomically writes state to file
+
+        """
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as state_file:
+                json.dump(self.__receipts, state_file)
+            os.replace(tmp_path, self.path)
+        except OSError as err:
+            get_logger(MODULE).warning(f"failed to save poll state {self.path}: {err}")
+
+    def is_due(self, receipt_id: Any, last_notify_time: Any = None, now: Optional[float] = None) -> bool:
+        """
+        Returns True if the receipt's back-off delay since its last check
+        (or since pr.last_notify_time, whichever is later) has passed
+
+        """
+
+        attempts, last_check = self.__receipts.get(str(receipt_id), (0, 0.0))
+        last_check = max(last_check, _timestamp(last_notify_time))
+        now = time.time() if now is None else now
+
+        return now - last_check >= check_delay(attempts)
+
+    def register_check(self, receipt_id: Any, now: Optional[float] = None) -> None:
+        """
+        Registers one more check that returned unchanged receipt's status.
+        Failed requests must not be registered, so they do not grow the delay
+
+        """
+
+        attempts, _ = self.__receipts.get(str(receipt_id), (0, 0.0))
+        self.__receipts[str(receipt_id)] = [attempts + 1, time.time() if now is None else now]
+
+    def keep_only(self, receipt_ids: Iterable[Any]) -> None:
+        """
+        Forgets receipts that are not waiting anymore
+
+        """
+
+        keep = {str(receipt_id) for receipt_id in receipt_ids}
+        self.__receipts = {
+            receipt_id: value for receipt_id, value in self.__receipts.items() if receipt_id in keep
+        }
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark of SOAP envelope building: ElementTree builders against pre-rendered templates.
+Measures envelopes per second for bulk sync (GetOrderByOrderID) and bulk reissue (ReIssue).
+
+Example:
+    python3 bench/bench_envelopes.py --items 20000
+"""
+import argparse
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(1, os.path.join(os.path.dirname(BENCH_DIR), "processing"))
+
+# pylint: disable=wrong-import-position
+from check_envelopes import CSR, FAKE  # noqa: E402
+
+import pmglobalsign  # noqa: E402
+from pmglobalsign import (  # noqa: E402
+    GS_NAMESPACE, GS_QUERY_NAMESPACE, SOAP_ENW, order_status_template, register_namespace, reissue_template,
+)
+
+
+def legacy_header(params: dict, type: str = "Order") -> ET.Element:
+    request_header = ET.Element(type + "RequestHeader")
+    auth_token = ET.SubElement(request_header, "AuthToken")
+    username = ET.SubElement(auth_token, "UserName")
+    username.text = params["username"]
+    password = ET.SubElement(auth_token, "Password")
+    password.text = params["password"]
+    return request_header
+
+
+def legacy_order_status(params: dict, order_id: str) -> bytes:
+    """
+    GlobalSign.get_order_status envelope before templates
+
+    """
+
+    order = ET.Element("SOAP-ENV:Envelope")
+    register_namespace(order, "SOAP-ENV", SOAP_ENW)
+    register_namespace(order, "ns1", GS_QUERY_NAMESPACE)
+    body = ET.SubElement(order, "SOAP-ENV:Body")
+    order_by_order_id = ET.SubElement(body, "ns1:GetOrderByOrderID")
+    request = ET.SubElement(order_by_order_id, "Request")
+    request.append(legacy_header(params, "Query"))
+    order_id_node = ET.SubElement(request, "OrderID")
+    order_id_node.text = order_id
+    options = ET.SubElement(request, "OrderQueryOption")
+    status = ET.SubElement(options, "OrderStatus")
+    status.text = "1"
+    return_certificate_info = ET.SubElement(options, "ReturnCertificateInfo")
+    return_certificate_info.text = "true"
+    return_fullfillment = ET.SubElement(options, "ReturnFulfillment")
+    return_fullfillment.text = "true"
+    return ET.tostring(order)
+
+
+def legacy_reissue(params: dict, order_id: str, csr: str) -> bytes:
+    """
+    GlobalSign.reopen envelope before templates
+
+    """
+
+    reopen_order = ET.Element("SOAP-ENV:Envelope")
+    register_namespace(reopen_order, "SOAP-ENV", SOAP_ENW)
+    register_namespace(reopen_order, "ns1", GS_NAMESPACE)
+    body = ET.SubElement(reopen_order, "SOAP-ENV:Body")
+    reissue = ET.SubElement(body, "ReIssue")
+    request = ET.SubElement(reissue, "Request")
+    request.append(legacy_header(params))
+    order_parameter = ET.SubElement(request, "OrderParameter")
+    csr_node = ET.SubElement(order_parameter, "CSR")
+    csr_node.text = csr
+    ET.SubElement(order_parameter, "DNSNames")
+    order_id_node = ET.SubElement(request, "TargetOrderID")
+    order_id_node.text = order_id
+    ET.SubElement(request, "HashAlgorithm")
+    return ET.tostring(reopen_order)
+
+
+def template_order_status(api: pmglobalsign.Api, order_id: str) -> bytes:
+    return order_status_template().render(header=api.set_request_header("Query"), order_id=order_id)
+
+
+def template_reissue(api: pmglobalsign.Api, order_id: str, csr: str) -> bytes:
+    return reissue_template().render(header=api.set_request_header(), csr=csr, order_id=order_id)
+
+
+def rate(func, order_ids, *args) -> float:
+    started = time.perf_counter()
+    for order_id in order_ids:
+        func(*args, order_id)
+    return len(order_ids) / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--items", type=int, default=20000, help="envelopes per run")
+    args = parser.parse_args()
+
+    params = FAKE.module_params
+    api = pmglobalsign.Api(1, params)
+    order_ids = [f"CE2011{number:08d}" for number in range(args.items)]
+
+    if legacy_order_status(params, order_ids[0]) != template_order_status(api, order_ids[0]):
+        print("MISMATCH in GetOrderByOrderID")
+    if legacy_reissue(params, order_ids[0], CSR) != template_reissue(api, order_ids[0], CSR):
+        print("MISMATCH in ReIssue")
+
+    runs = {
+        "sync": (
+            rate(legacy_order_status, order_ids, params),
+            rate(lambda order_id: template_order_status(api, order_id), order_ids),
+        ),
+        "reissue": (
+            rate(lambda order_id: legacy_reissue(params, order_id, CSR), order_ids),
+            rate(lambda order_id: template_reissue(api, order_id, CSR), order_ids),
+        ),
+    }
+    print(f"{'run':<8} {'legacy env/s':>13} {'template env/s':>15} {'speedup':>8}")
+    for name, (legacy, template) in runs.items():
+        print(f"{name:<8} {legacy:>13,.0f} {template:>15,.0f} {template / legacy:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
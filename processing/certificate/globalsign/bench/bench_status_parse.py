@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark of GetOrderByOrderID response parsing: full tree with .// lookups against
+the single-pass field extraction of parse_order_status.
+
+Example:
+    python3 bench/bench_status_parse.py --number 2000
+"""
+import argparse
+import os
+import sys
+import timeit
+import xml.etree.ElementTree as ET
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(1, os.path.join(os.path.dirname(BENCH_DIR), "processing"))
+
+# pylint: disable=wrong-import-position
+from fake_billmgr import FakeBillmgr
+
+FakeBillmgr().install()
+
+import responses  # noqa: E402
+from certs import make_chain  # noqa: E402
+from pmglobalsign import OrderStatusInfo, parse_order_status  # noqa: E402
+
+
+def legacy_parse(content: bytes) -> OrderStatusInfo:
+    """
+    Api.request tree and validate_status/close_cert lookups before parse_order_status
+
+    """
+
+    response = ET.fromstring(content)
+    success_code = response.find(".//SuccessCode")
+    if success_code != None and success_code.text not in ("0", "1"):
+        err_msg = response.find(".//ErrorMessage")
+        if err_msg != None and response.find(".//ErrorCode").text != "-4001":
+            raise ValueError(err_msg.text)
+
+    def text(tag: str):
+        node = response.find(".//" + tag)
+        return node.text if node != None else None
+
+    return OrderStatusInfo(
+        order_status=int(text("OrderStatus")),
+        certificate_status=int(text("CertificateStatus")),
+        order_date=text("OrderDate"),
+        start_date=text("StartDate"),
+        end_date=text("EndDate"),
+        x509_cert=text("X509Cert"),
+        pkcs7_cert=text("PKCS7Cert"),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--number", type=int, default=2000, help="parses per response")
+    args = parser.parse_args()
+
+    corpus = {
+        "requested": responses.order_status(order_status_code=1, certificate_status_code=1),
+        "phishing": responses.order_status(order_status_code=2, certificate_status_code=1),
+        "cancelled": responses.order_status(order_status_code=3, certificate_status_code=3),
+        "issued-2": responses.order_status(order_status_code=4, certificate_status_code=4, chain=make_chain(2)),
+        "issued-4": responses.order_status(order_status_code=4, certificate_status_code=4, chain=make_chain(4)),
+    }
+
+    print(f"{'response':<10} {'size,KB':>8} {'legacy,us':>10} {'single,us':>10} {'speedup':>8}")
+    for name, content in corpus.items():
+        if legacy_parse(content) != parse_order_status(content):
+            print(f"MISMATCH in {name}")
+        legacy = timeit.timeit(lambda: legacy_parse(content), number=args.number)
+        current = timeit.timeit(lambda: parse_order_status(content), number=args.number)
+        print(
+            f"{name:<10} {len(content) / 1024:>8.1f} {legacy / args.number * 1e6:>10.1f} "
+            f"{current / args.number * 1e6:>10.1f} {legacy / current:>7.1f}x"
+        )
+
+    error = responses.order_status_error()
+    for parse in (legacy_parse, parse_order_status):
+        try:
+            parse(error)
+            print(f"{parse.__name__}: error response is not detected")
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+
+if __name__ == "__main__":
+    main()
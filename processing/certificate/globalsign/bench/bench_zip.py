@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark of issued certificate archive: in-memory zipfile against zip binary in a temp dir.
+
+Example:
+    python3 bench/bench_zip.py --chains 1 3 5 10 --number 200
+"""
+import argparse
+import base64
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import timeit
+import zipfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(1, os.path.join(os.path.dirname(BENCH_DIR), "processing"))
+
+# pylint: disable=wrong-import-position
+from fake_billmgr import FakeBillmgr
+
+FakeBillmgr().install()
+
+import billmgr.crypto as crypto  # noqa: E402
+from certs import make_chain, pem_chain, pkcs7_chain  # noqa: E402
+from pmglobalsign import build_zip  # noqa: E402
+
+
+def legacy_zip(files: dict, tmp_dir: str) -> str:
+    """
+    Archive building before the in-memory zip
+
+    """
+
+    zip_dir = tempfile.TemporaryDirectory(prefix="zip_", dir=tmp_dir)
+    archive_file_name = "bench_example_com.zip"
+    cmd = ["zip", archive_file_name]
+    for file in files:
+        with open(os.path.join(zip_dir.name, file), "w") as my_file:
+            my_file.write(files[file])
+        cmd.append(file)
+    process = subprocess.run(cmd, cwd=zip_dir.name, stdout=subprocess.DEVNULL)
+    if process.returncode != 0:
+        raise RuntimeError("zip failed")
+    with open(os.path.join(zip_dir.name, archive_file_name), "rb") as my_file:
+        result = crypto.base64encode(my_file.read())
+    zip_dir.cleanup()
+    return result
+
+
+def unpack(archive: str) -> dict:
+    """
+    Returns {file name: content} of base64 encoded zip archive
+
+    """
+
+    with zipfile.ZipFile(io.BytesIO(base64.b64decode(archive))) as zip_file:
+        return {name: zip_file.read(name) for name in zip_file.namelist()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--chains", type=int, nargs="+", default=[1, 3, 5, 10], help="certificates per chain")
+    parser.add_argument("--number", type=int, default=200, help="archives per measurement")
+    parser.add_argument("--tmp-dir", default=tempfile.gettempdir(), help="dir for legacy temp files")
+    args = parser.parse_args()
+
+    print(f"{'chain':>5} {'files':>5} {'legacy,ms':>10} {'zipfile,ms':>11} {'speedup':>8}")
+    for length in args.chains:
+        chain = make_chain(length)
+        files = {"bench_example_com.p7b": pkcs7_chain(chain)}
+        for level, pem in enumerate(pem_chain(chain)):
+            files[f"cert_{level}.crt"] = pem
+
+        if unpack(legacy_zip(files, args.tmp_dir)) != unpack(crypto.base64encode(build_zip(files))):
+            print(f"MISMATCH of archive contents for chain of {length}")
+
+        legacy = timeit.timeit(lambda: legacy_zip(files, args.tmp_dir), number=args.number)
+        current = timeit.timeit(lambda: crypto.base64encode(build_zip(files)), number=args.number)
+        print(
+            f"{length:>5} {len(files):>5} {legacy / args.number * 1000:>10.3f} "
+            f"{current / args.number * 1000:>11.3f} {legacy / current:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
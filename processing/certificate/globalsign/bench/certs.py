@@ -0,0 +1,82 @@
+"""Synthetic certificate chains for pmglobalsign benchmarks"""
+import datetime as dt
+from typing import List
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.serialization import pkcs7
+from cryptography.x509.oid import NameOID
+
+
+def make_chain(length: int, common_name: str = "bench.example.com") -> List[x509.Certificate]:
+    """
+    Returns [leaf, intermediates..., root] of `length` certificates
+
+    """
+
+    now = dt.datetime.now(dt.timezone.utc)
+    keys = [rsa.generate_private_key(public_exponent=65537, key_size=2048) for _ in range(length)]
+    names = [
+        x509.Name([
+            x509.NameAttribute(NameOID.COUNTRY_NAME, "BE"),
+            x509.NameAttribute(NameOID.ORGANIZATION_NAME, "Bench Trust"),
+            x509.NameAttribute(NameOID.COMMON_NAME, f"Bench CA {level}"),
+        ])
+        for level in range(length)
+    ]
+    names[0] = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, common_name)])
+
+    chain = []
+    for level in range(length):
+        issuer = min(level + 1, length - 1)
+        chain.append(
+            x509.CertificateBuilder()
+            .subject_name(names[level])
+            .issuer_name(names[issuer])
+            .public_key(keys[level].public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now)
+            .not_valid_after(now + dt.timedelta(days=365))
+            .sign(keys[issuer], hashes.SHA256())
+        )
+    return chain
+
+
+def pem_chain(chain: List[x509.Certificate]) -> List[str]:
+    """
+    Returns PEM of every certificate in the chain
+
+    """
+
+    return [cert.public_bytes(serialization.Encoding.PEM).decode() for cert in chain]
+
+
+def pkcs7_chain(chain: List[x509.Certificate]) -> str:
+    """
+    Returns PEM PKCS#7 bundle of the chain as GlobalSign sends it in PKCS7Cert
+
+    """
+
+    return pkcs7.serialize_certificates(chain, serialization.Encoding.PEM).decode()
+
+
+def make_csr(common_name: str = "bench.example.com") -> str:
+    """
+    Returns PEM certificate request as BILLmanager keeps it in certificate.csr
+
+    """
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return (
+        x509.CertificateSigningRequestBuilder()
+        .subject_name(x509.Name([
+            x509.NameAttribute(NameOID.COUNTRY_NAME, "RU"),
+            x509.NameAttribute(NameOID.LOCALITY_NAME, "Moscow"),
+            x509.NameAttribute(NameOID.ORGANIZATION_NAME, "Bench LLC"),
+            x509.NameAttribute(NameOID.COMMON_NAME, common_name),
+        ]))
+        .sign(key, hashes.SHA256())
+        .public_bytes(serialization.Encoding.PEM)
+        .decode()
+    )
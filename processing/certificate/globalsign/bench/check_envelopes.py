@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Golden-file check of SOAP envelopes sent by pmglobalsign.
+
+Every case runs a pmglobalsign operation with Api.request replaced by a recorder
+and compares sent envelopes with golden/<case>.xml byte by byte.
+
+Example:
+    python3 bench/check_envelopes.py            # compare
+    python3 bench/check_envelopes.py --update   # rewrite golden files
+"""
+import argparse
+import os
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+from typing import Callable, Dict, List, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+GOLDEN_DIR = os.path.join(BENCH_DIR, "golden")
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(1, os.path.join(os.path.dirname(BENCH_DIR), "processing"))
+
+# pylint: disable=wrong-import-position
+from fake_billmgr import FakeBillmgr
+
+FAKE = FakeBillmgr()
+FAKE.install()
+
+import pmglobalsign  # noqa: E402
+
+CSR = (
+    "-----BEGIN CERTIFICATE REQUEST-----\n"
+    "MIICvDCCAaQCAQAwdzELMAkGA1UEBhMCVVMxDTALBgNVBAgMBFV0YWgxDzANBgNV\n"
+    "BAcMBkxpbmRvbjEWMBQGA1UECgwNRGlnaUNlcnQgSW5jLjERMA8GA1UECwwIRGln\n"
+    "-----END CERTIFICATE REQUEST-----\n"
+)
+
+RESPONSE = (
+    '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>'
+    "<Response><OrderResponseHeader><SuccessCode>0</SuccessCode></OrderResponseHeader>"
+    "<OrderID>CE201100000001</OrderID><DNSTXT>globalsign-domain-verification=abc</DNSTXT>"
+    "<VerificationFQDNList><VerificationFQDN>example.com</VerificationFQDN>"
+    "<VerificationFQDN>www.example.com</VerificationFQDN></VerificationFQDNList>"
+    "<Approvers><ApproverEmail>admin@example.com</ApproverEmail>"
+    "<ApproverEmail>hostmaster@example.com</ApproverEmail></Approvers>"
+    "<OrderInfo><OrderStatus>1</OrderStatus><OrderDate>2025-05-03T07:29:34.000+00:00</OrderDate></OrderInfo>"
+    "<CertificateInfo><CertificateStatus>1</CertificateStatus><StartDate></StartDate></CertificateInfo>"
+    "</Response></soap:Body></soap:Envelope>"
+)
+
+ITEM_PARAMS = {
+    "CN": "example.com",
+    "C": "RU",
+    "L": "Moscow",
+    "csr": CSR,
+    "altname": "",
+    "approver_method": "auth_email",
+    "approver_email": "admin@example.com,hostmaster@example.com",
+    "adm_email": "admin@example.com",
+    "adm_fname": "Ivan",
+    "adm_lname": "Petrov",
+    "adm_jtitle": "CTO",
+    "adm_phone": "+7 (495) 000-00-00",
+    "org_name": "Example LLC",
+    "org_address": "Tverskaya 1",
+    "org_city": "Moscow",
+    "org_state": "Moscow",
+    "org_postcode": "101000",
+    "org_phone": "+7 (495) 000-00-00",
+    pmglobalsign.SERVICE_ORDER_ID: "CE201100000001",
+}
+
+# values that need escaping or produce empty elements
+TRICKY_PARAMS = dict(
+    ITEM_PARAMS,
+    org_name='R&D "Example" <Ltd>',
+    org_address="Улица Тверская, 1 & 2",
+    adm_fname="Jörg",
+    adm_jtitle="",
+    org_duns=None,
+    OU="Dev & Ops",
+    altname="www.example.com mail.example.com 10.0.0.1 *.example.com other.org",
+)
+
+
+class Recorder:
+    """
+    Replaces Api.request_content and keeps (method, header, request) of every call
+
+    """
+
+    def __init__(self) -> None:
+        self.calls: List[Tuple[str, dict, bytes]] = []
+        recorder = self
+
+        def request_content(api, method, header=None, request=b"", r_method=None):
+            recorder.calls.append((method, header, request))
+            return RESPONSE.encode()
+
+        pmglobalsign.Api.request_content = request_content
+
+
+def make_globalsign(
+        intname: str, item_params: dict, renew: bool = False, **module_params: str
+) -> pmglobalsign.GlobalSign:
+    """
+    Builds GlobalSign without database access
+
+    """
+
+    params = dict(FAKE.module_params, **module_params)
+    gs = pmglobalsign.GlobalSign.__new__(pmglobalsign.GlobalSign)
+    gs.iid = 1
+    gs.processingmodule = 1
+    gs.renew = renew
+    # pylint: disable=protected-access
+    gs._GlobalSign__iteminfo = {"processingmodule": 1, "pricelist_intname": intname, "period": 12}
+    gs._GlobalSign__item_params = dict(item_params)
+    gs._GlobalSign__module_params = params
+    gs._GlobalSign__service_status = None
+    FAKE.module_params = params
+    return gs
+
+
+def check_connection_case() -> None:
+    pmglobalsign.check_connection(ET.fromstring(
+        "<doc><processingmodule><id>1</id><usedemo>off</usedemo>"
+        "<username>user&amp;1</username><password>p&lt;ss</password></processingmodule></doc>"
+    ))
+
+
+CASES: Dict[str, Callable[[], None]] = {
+    "dv_email_order": lambda: make_globalsign("DV", ITEM_PARAMS).process_order(),
+    "dv_dns_order": lambda: make_globalsign(
+        "DV_LOW_wild", dict(ITEM_PARAMS, approver_method="auth_dnstxt")
+    ).process_order(),
+    "ov_order": lambda: make_globalsign("OV", TRICKY_PARAMS).process_order(),
+    "ov_renew_order": lambda: make_globalsign("OV_wild", ITEM_PARAMS, renew=True).process_order(),
+    "ev_order": lambda: make_globalsign("EV", TRICKY_PARAMS, usedemo="on").process_order(),
+    "ev_default_ou": lambda: make_globalsign("EV", ITEM_PARAMS).process_order(),
+    "validate_order": lambda: make_globalsign("DV_wild", TRICKY_PARAMS).validate_order_parametrs(),
+    "order_status": lambda: make_globalsign("DV", ITEM_PARAMS).get_order_status(),
+    "close": lambda: make_globalsign("DV", ITEM_PARAMS).close_cert(),
+    "reissue": lambda: make_globalsign("OV", TRICKY_PARAMS).reopen(),
+    "dns_verification": lambda: make_globalsign("DV", ITEM_PARAMS).validate_domain_by_DNS("example.com"),
+    "change_approver": lambda: make_globalsign("DV", TRICKY_PARAMS).validate_domain_by_email(
+        [" admin@example.com", "x&y@example.com"]
+    ),
+    "approver_list": lambda: pmglobalsign.approver(1, "example.com,sub.example.com"),
+    "check_connection": check_connection_case,
+}
+
+
+def render(case: str, recorder: Recorder) -> bytes:
+    """
+    Runs the case and returns all sent envelopes, one call per block
+
+    """
+
+    recorder.calls = []
+    FAKE.reset()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        pmglobalsign.CACHE_DIR = cache_dir
+        CASES[case]()
+    return b"".join(
+        f"== {method} {header}\n".encode() + request + b"\n"
+        for method, header, request in recorder.calls
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--update", action="store_true", help="rewrite golden files")
+    parser.add_argument("cases", nargs="*", default=sorted(CASES))
+    args = parser.parse_args()
+
+    recorder = Recorder()
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    failed = 0
+    for case in args.cases:
+        output = render(case, recorder)
+        golden_path = os.path.join(GOLDEN_DIR, case + ".xml")
+        if args.update:
+            with open(golden_path, "wb") as golden_file:
+                golden_file.write(output)
+            print(f"{case:<20} updated")
+            continue
+
+        with open(golden_path, "rb") as golden_file:
+            golden = golden_file.read()
+        if output == golden:
+            print(f"{case:<20} ok")
+        else:
+            failed += 1
+            print(f"{case:<20} MISMATCH")
+            for expected, actual in zip(golden.splitlines(), output.splitlines()):
+                if expected != actual:
+                    print(f"  expected: {expected!r}\n  actual:   {actual!r}")
+                    break
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
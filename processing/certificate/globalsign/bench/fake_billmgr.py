@@ -0,0 +1,258 @@
+"""In-memory replacement of billmgr library for pmglobalsign benchmarks"""
+import base64
+import logging
+import sys
+import threading
+import types
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from cryptography import x509
+
+
+class XmlException(Exception):
+    """
+    billmgr.exception.XmlException
+
+    """
+
+    def __init__(self, err_type: str = "", err_object: str = "", err_value: str = "") -> None:
+        super().__init__(err_type, err_object, err_value)
+
+    def as_xml(self) -> str:
+        return f"<doc><error type='{self.args[0]}'/></doc>"
+
+    def as_module_error(self) -> str:
+        return self.as_xml()
+
+
+ITEM_STATUS_ACTIVE = 2
+ITEM_STATUS_DELETED = 4
+
+
+class FakeBillmgr:
+    """
+    Keeps module params and certificate services, counts database and mgrctl calls
+
+    """
+
+    def __init__(self, module: int = 1) -> None:
+        self.module = module
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self, module_params: Optional[dict] = None) -> None:
+        """
+        Drops counters and sets params of processing module
+
+        """
+
+        self.module_params: Dict[str, str] = {
+            "username": "bench",
+            "password": "bench",
+            "usedemo": "off",
+            "sourceip": "",
+            "default_OU": "IT",
+        }
+        self.module_params.update(module_params or {})
+        self.queries: Counter = Counter()
+        self.mgrctl: Counter = Counter()
+        self.items: Dict[int, dict] = {}
+        self.item_params: Dict[int, Dict[str, str]] = {}
+        self.csrs: Dict[int, str] = {}
+
+    def seed(
+        self, count: int, intname: str, params: Dict[str, str], csr: str,
+        status: int = ITEM_STATUS_ACTIVE,
+    ) -> List[int]:
+        """
+        Adds `count` certificate services of the module, returns their ids
+
+        """
+
+        first_id = max(self.items, default=0) + 1
+        ids = list(range(first_id, first_id + count))
+        for iid in ids:
+            self.items[iid] = {
+                "id": iid,
+                "processingmodule": self.module,
+                "period": 12,
+                "pricelist_intname": intname,
+                "status": status,
+            }
+            self.item_params[iid] = dict(params)
+            self.csrs[iid] = csr
+        return ids
+
+    def __item_row(self, iid: int) -> dict:
+        row = {key: value for key, value in self.items[iid].items() if key != "status"}
+        row["csr"] = self.csrs.get(iid)
+        return row
+
+    def db_query(self, query: str, *params: Any) -> List[dict]:
+        """
+        billmgr.db.db_query, answers queries of pmglobalsign by their tables
+
+        """
+
+        with self.lock:
+            if "FROM itemparam WHERE item IN" in query:
+                self.queries["itemparam"] += 1
+                return [
+                    {"item": int(iid), "intname": name, "value": value}
+                    for iid in params if int(iid) in self.item_params
+                    for name, value in self.item_params[int(iid)].items()
+                ]
+
+            if "FROM item i" in query and "i.id IN" in query:
+                self.queries["item"] += 1
+                return [self.__item_row(int(iid)) for iid in params if int(iid) in self.items]
+
+            if "FROM item i" in query:
+                self.queries["item"] += 1
+                order_id_param, module = params[0], int(params[-4 if "ss.value" in query else -2])
+                statuses = {str(status) for status in params[-2:]}
+                result = []
+                for iid, item in sorted(self.items.items()):
+                    item_params = self.item_params[iid]
+                    if item["processingmodule"] != module or not item_params.get(order_id_param):
+                        continue
+                    if "ss.value" in query:
+                        matches = (
+                            item["status"] != ITEM_STATUS_DELETED
+                            and item_params.get("service_status") in statuses
+                        )
+                    else:
+                        matches = (
+                            item["status"] == ITEM_STATUS_DELETED
+                            and item_params.get(params[1]) != item_params[order_id_param]
+                        )
+                    if matches:
+                        result.append({"id": iid})
+                return result
+
+            if "FROM certificate" in query:
+                self.queries["certificate"] += 1
+                iid = int(params[0])
+                return [{"csr": self.csrs[iid]}] if iid in self.csrs else []
+
+            self.queries["other"] += 1
+            return []
+
+    def get_first_record(self, query: str, *params: Any) -> Optional[dict]:
+        """
+        billmgr.db.get_first_record
+
+        """
+
+        result = self.db_query(query, *params)
+        return result[0] if result else None
+
+    def get_module_params(self, module: int) -> dict:
+        """
+        billmgr.misc.get_module_params
+
+        """
+
+        with self.lock:
+            self.queries["processingmodule"] += 1
+            return dict(self.module_params)
+
+    def iteminfo(self, iid: int) -> dict:
+        """
+        billmgr.misc.iteminfo
+
+        """
+
+        with self.lock:
+            self.queries["item"] += 1
+            return self.__item_row(int(iid))
+
+    def itemparams(self, iid: int) -> dict:
+        """
+        billmgr.misc.itemparams
+
+        """
+
+        with self.lock:
+            self.queries["itemparam"] += 1
+            return dict(self.item_params.get(int(iid), {}))
+
+    def mgrctl_call(self, func: str, **params: Any) -> dict:
+        """
+        billmgr.misc.Mgrctl
+
+        """
+
+        with self.lock:
+            self.mgrctl[func] += 1
+        return {}
+
+    def misc_call(self, func: str, update=None):
+        """
+        Returns billmgr.misc helper that is counted as mgrctl call `func`.
+        update(item_params, *args) applies the call to params of the item.
+
+        """
+
+        def call(iid: Any = None, *args: Any, **kwargs: Any) -> dict:
+            if update is not None:
+                with self.lock:
+                    update(self.item_params.setdefault(int(iid), {}), *args)
+            return self.mgrctl_call(func)
+
+        return call
+
+    def install(self) -> None:
+        """
+        Registers fake billmgr package in sys.modules
+
+        """
+
+        def module(name: str, **attrs: Any) -> types.ModuleType:
+            mod = types.ModuleType(name)
+            mod.__dict__.update(attrs)
+            sys.modules[name] = mod
+            return mod
+
+        def get_logger(name: str) -> logging.Logger:
+            log = logging.getLogger(f"bench.{name}")
+            log.extinfo = log.debug
+            return log
+
+        billmgr = module("billmgr")
+        billmgr.db = module(
+            "billmgr.db", db_query=self.db_query, get_first_record=self.get_first_record
+        )
+        billmgr.misc = module(
+            "billmgr.misc",
+            Mgrctl=self.mgrctl_call,
+            get_module_params=self.get_module_params,
+            iteminfo=self.iteminfo,
+            itemparams=self.itemparams,
+            save_param=self.misc_call("service.saveparam", dict.__setitem__),
+            drop_param=self.misc_call(
+                "service.saveparam", lambda item_params, name: item_params.pop(name, None)
+            ),
+            set_service_status=self.misc_call(
+                "service.setstatus",
+                lambda item_params, status: item_params.__setitem__("service_status", str(int(status))),
+            ),
+            set_service_expiredate=self.misc_call("service.setexpiredate"),
+            postopen=self.misc_call("service.postopen"),
+            postclose=self.misc_call("service.postclose"),
+            postreopen=self.misc_call("service.postreopen"),
+            postprolong=self.misc_call("service.postprolong"),
+        )
+        billmgr.logger = module(
+            "billmgr.logger", init_logging=lambda name: None, get_logger=get_logger
+        )
+        billmgr.exception = module(
+            "billmgr.exception", XmlException=XmlException, log_backtrace=lambda: None
+        )
+        billmgr.crypto = module(
+            "billmgr.crypto",
+            x509=x509,
+            x509decode=lambda pem: x509.load_pem_x509_csr(pem.encode()),
+            base64encode=lambda value: base64.b64encode(value).decode(),
+        )
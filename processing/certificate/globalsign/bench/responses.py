@@ -0,0 +1,144 @@
+"""Synthetic GlobalSign SOAP responses in the format of the production API"""
+from typing import List, Optional
+
+from cryptography import x509
+
+from certs import pem_chain, pkcs7_chain
+
+ENVELOPE = (
+    '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>'
+    '<ns2:{operation}Response xmlns:ns2="{namespace}"><Response>'
+    "<{header}ResponseHeader><SuccessCode>{success_code}</SuccessCode>{errors}"
+    "<Timestamp>2025-05-03T10:29:34.123+03:00</Timestamp></{header}ResponseHeader>"
+    "{body}</Response></ns2:{operation}Response></soap:Body></soap:Envelope>"
+)
+QUERY_NAMESPACE = "http://stub.query.gasapiserver.esp.globalsign.com"
+ORDER_NAMESPACE = "https://system.globalsign.com/kb/ws/v1/"
+
+
+def envelope(
+    operation: str, body: str = "", header: str = "Order", namespace: str = ORDER_NAMESPACE,
+    error: Optional[str] = None,
+) -> bytes:
+    """
+    Wraps response body into SOAP envelope, error is (code, message) of a failed call
+
+    """
+
+    errors = "<Errors />"
+    if error:
+        errors = (
+            "<Errors><Error><ErrorCode>-{}</ErrorCode><ErrorField>OrderID</ErrorField>"
+            "<ErrorMessage>{}</ErrorMessage></Error></Errors>".format(*error)
+        )
+    return ENVELOPE.format(
+        operation=operation, namespace=namespace, header=header, body=body, errors=errors,
+        success_code="-1" if error else "0",
+    ).encode()
+
+
+def order_status(
+    order_id: str = "CE202505030001",
+    order_status_code: int = 1,
+    certificate_status_code: int = 1,
+    chain: Optional[List[x509.Certificate]] = None,
+    order_date: str = "2025-05-03",
+    start_date: str = "2025-05-03",
+) -> bytes:
+    """
+    GetOrderByOrderID response, issued certificate fulfillment is added when chain is given
+
+    """
+
+    fulfillment = ""
+    dates = "<StartDate /><EndDate />"
+    if chain:
+        pems = pem_chain(chain)
+        ca_certificates = "".join(
+            f"<CACertificate><CACertType>{'Root' if level == len(pems) - 1 else 'Inter'}</CACertType>"
+            f"<CACert>{pem}</CACert></CACertificate>"
+            for level, pem in enumerate(pems[1:], start=1)
+        )
+        fulfillment = (
+            f"<Fulfillment><CACertificates>{ca_certificates}</CACertificates>"
+            f"<ServerCertificate><X509Cert>{pems[0]}</X509Cert>"
+            f"<PKCS7Cert>{pkcs7_chain(chain)}</PKCS7Cert></ServerCertificate></Fulfillment>"
+        )
+        dates = (
+            f"<StartDate>{start_date}T00:00:00.000+00:00</StartDate>"
+            "<EndDate>2026-05-03T23:59:59.000+00:00</EndDate>"
+        )
+
+    body = (
+        f"<OrderID>{order_id}</OrderID><OrderDetail><OrderInfo><ProductCode>DV_LOW_SHA2</ProductCode>"
+        "<DomainName>example.com</DomainName>"
+        f"<OrderDate>{order_date}T07:29:34.000+00:00</OrderDate>"
+        f"<OrderCompleteDate /><OrderDeactivatedDate /><OrderStatus>{order_status_code}</OrderStatus>"
+        "<OrderCanceledDate /><Licenses>1</Licenses><OrderKind>new</OrderKind><Months>12</Months>"
+        f"</OrderInfo><CertificateInfo><CertificateStatus>{certificate_status_code}</CertificateStatus>"
+        f"{dates}<CommonName>example.com</CommonName><SubjectName>CN=example.com</SubjectName>"
+        f"</CertificateInfo>{fulfillment}</OrderDetail>"
+    )
+    return envelope("GetOrderByOrderID", body, "Query", QUERY_NAMESPACE)
+
+
+def order_status_error(message: str = "Order ID not found.") -> bytes:
+    """
+    GetOrderByOrderID response for unknown order
+
+    """
+
+    return envelope("GetOrderByOrderID", header="Query", namespace=QUERY_NAMESPACE, error=("4201", message))
+
+
+def approver_list(order_id: str, domain: str) -> bytes:
+    """
+    GetDVApproverList response with the usual administrative mailboxes of the domain
+
+    """
+
+    approvers = "".join(
+        f"<Approver><ApproverType>Domain</ApproverType><ApproverEmail>{box}@{domain}</ApproverEmail></Approver>"
+        for box in ("admin", "administrator", "hostmaster", "postmaster", "webmaster")
+    )
+    return envelope(
+        "GetDVApproverList", f"<Approvers>{approvers}</Approvers><OrderID>{order_id}</OrderID>", "Query"
+    )
+
+
+def order(operation: str, order_id: str) -> bytes:
+    """
+    DVOrder, DVDNSOrder, OVOrder, EVOrder or ReIssue response, DNS order gets TXT record and FQDN list
+
+    """
+
+    body = f"<OrderID>{order_id}</OrderID>"
+    if operation == "DVDNSOrder":
+        body += (
+            f"<DNSTXT>globalsign-domain-verification={order_id}</DNSTXT>"
+            "<VerificationFQDNList><VerificationFQDN>example.com</VerificationFQDN>"
+            "<VerificationFQDN>www.example.com</VerificationFQDN></VerificationFQDNList>"
+        )
+    return envelope(operation, body)
+
+
+def decode_csr(common_name: str = "bench.example.com") -> bytes:
+    """
+    DecodeCSR response
+
+    """
+
+    return envelope(
+        "DecodeCSR",
+        f"<CSRData><CommonName>{common_name}</CommonName><Country>RU</Country></CSRData>",
+        "Query",
+    )
+
+
+def success(operation: str, body: str = "") -> bytes:
+    """
+    Response of an operation which only reports success: ModifyOrder and others
+
+    """
+
+    return envelope(operation, body)
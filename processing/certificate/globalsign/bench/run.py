@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of pmglobalsign commands against the local GlobalSign stand-in.
+
+Per-item commands (open, sync_item, close, reopen) run as BILLmanager starts them:
+process caches (HTTP sessions, module params) are dropped before every item.
+Bulk commands (sync_all, close_all, approver) run once for all items.
+
+Example:
+    python3 bench/run.py --items 200 --latency 0.05
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(1, os.path.join(os.path.dirname(BENCH_DIR), "processing"))
+
+# pylint: disable=wrong-import-position
+from certs import make_csr
+from fake_billmgr import ITEM_STATUS_DELETED, FakeBillmgr
+from stand_in import StandInServer
+
+FAKE = FakeBillmgr()
+FAKE.install()
+
+import pmglobalsign  # noqa: E402
+
+CSR = make_csr()
+
+OPEN_PARAMS = {
+    "altname": "www.bench.example.com",
+    "approver_method": "auth_email",
+    "approver_email": "admin@bench.example.com",
+    "adm_email": "admin@bench.example.com",
+    "adm_fname": "Ivan",
+    "adm_lname": "Petrov",
+    "adm_jtitle": "CTO",
+    "adm_phone": "+7 (495) 000-00-00",
+    "org_name": "Bench LLC",
+    "org_address": "Tverskaya 1",
+    "org_city": "Moscow",
+    "org_state": "Moscow",
+    "org_postcode": "101000",
+    "org_phone": "+7 (495) 000-00-00",
+}
+ORDERED_PARAMS = dict(
+    OPEN_PARAMS,
+    **{
+        pmglobalsign.SERVICE_ORDER_ID: "CE202505030000001",
+        pmglobalsign.SERVICE_STATUS: str(int(pmglobalsign.CertificateStatus.IS_REQUESTED)),
+    }
+)
+
+
+def new_process() -> None:
+    """
+    Drops process-wide caches of pmglobalsign, as if the next command ran in a new process
+
+    """
+
+    # pylint: disable=protected-access
+    with pmglobalsign._sessions_lock:
+        for session in pmglobalsign._sessions.values():
+            session.close()
+        pmglobalsign._sessions.clear()
+    with pmglobalsign._module_params_lock:
+        pmglobalsign._module_params.clear()
+
+
+def per_item(command: Callable[[int], None]) -> Callable[[List[int]], int]:
+    """
+    Runs the command for every item in a fresh "process", returns number of failures
+
+    """
+
+    def run(items: List[int]) -> int:
+        failed = 0
+        for iid in items:
+            new_process()
+            try:
+                command(iid)
+            except Exception:  # pylint: disable=broad-except
+                failed += 1
+        return failed
+
+    return run
+
+
+def bulk(command: Callable[[List[int]], None]) -> Callable[[List[int]], int]:
+    """
+    Runs the command once for all items in a fresh "process"
+
+    """
+
+    def run(items: List[int]) -> int:
+        new_process()
+        command(items)
+        return 0
+
+    return run
+
+
+# scenario: (params of seeded items, item status, runner)
+SCENARIOS: Dict[str, Tuple[dict, int, Callable[[List[int]], int]]] = {
+    "open": (OPEN_PARAMS, 2, per_item(pmglobalsign.open_item)),
+    "sync_item": (ORDERED_PARAMS, 2, per_item(pmglobalsign.sync_item)),
+    "sync_all": (ORDERED_PARAMS, 2, bulk(lambda items: pmglobalsign.sync_all(FAKE.module))),
+    "close": (ORDERED_PARAMS, ITEM_STATUS_DELETED, per_item(pmglobalsign.close_item)),
+    "close_all": (
+        ORDERED_PARAMS, ITEM_STATUS_DELETED, bulk(lambda items: pmglobalsign.close_all(FAKE.module))
+    ),
+    "reopen": (ORDERED_PARAMS, 2, per_item(pmglobalsign.reopen)),
+    "approver": (
+        OPEN_PARAMS,
+        2,
+        bulk(lambda items: pmglobalsign.approver(
+            FAKE.module, ",".join(f"d{iid}.bench.example.com" for iid in items)
+        )),
+    ),
+}
+
+
+def run_scenario(scenario: str, items: int, args: argparse.Namespace) -> dict:
+    """
+    Runs one scenario on freshly seeded data and returns its measurements
+
+    """
+
+    params, status, runner = SCENARIOS[scenario]
+
+    with StandInServer(
+        latency=args.latency, issued_rate=args.issued_rate, seed=args.seed
+    ) as server, tempfile.TemporaryDirectory() as cache_dir:
+        pmglobalsign.TEST_URL = server.url
+        pmglobalsign.CACHE_DIR = cache_dir
+        FAKE.reset(module_params={"usedemo": "on"})
+        ids = FAKE.seed(items, args.product, params, CSR, status)
+
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            failed = runner(ids)
+        elapsed = time.perf_counter() - started
+        new_process()
+
+        return {
+            "scenario": scenario,
+            "items": items,
+            "elapsed": elapsed,
+            "rate": items / elapsed if elapsed else 0.0,
+            "http": server.requests,
+            "connections": server.connections,
+            "db": sum(FAKE.queries.values()),
+            "mgrctl": sum(FAKE.mgrctl.values()),
+            "failed": failed,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--items", type=int, default=100, help="services (domains for approver) per run")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--product", default="DV", help="pricelist intname of seeded services")
+    parser.add_argument("--latency", type=float, default=0.02, help="stand-in response delay, s")
+    parser.add_argument("--issued-rate", type=float, default=0.5, help="share of issued order statuses")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true", help="show module logs")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+
+    header = (
+        f"{'scenario':<10} {'items':>6} {'time,s':>8} {'items/s':>8} {'http':>6} {'conns':>5} "
+        f"{'db':>5} {'mgrctl':>6} {'failed':>6}"
+    )
+    print(header)
+    print("-" * len(header))
+
+    for scenario in args.scenarios:
+        result = run_scenario(scenario, args.items, args)
+        print(
+            f"{result['scenario']:<10} {result['items']:>6} {result['elapsed']:>8.2f} "
+            f"{result['rate']:>8.1f} {result['http']:>6} {result['connections']:>5} "
+            f"{result['db']:>5} {result['mgrctl']:>6} {result['failed']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
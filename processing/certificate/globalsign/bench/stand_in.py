@@ -0,0 +1,186 @@
+"""Local stand-in for GlobalSign SOAP API with configurable latency"""
+import datetime as dt
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+import responses
+from certs import make_chain
+
+OPERATION_RE = re.compile(rb"<SOAP-ENV:Body><(?:[\w-]+:)?(?P<operation>\w+)")
+FQDN_RE = re.compile(rb"<FQDN>(?P<fqdn>[^<]*)</FQDN>")
+ORDER_ID_RE = re.compile(rb"<OrderID>(?P<order_id>[^<]*)</OrderID>")
+ORDER_OPERATIONS = {"DVOrder", "DVDNSOrder", "OVOrder", "EVOrder", "ReIssue"}
+SERVICES = {"ServerSSLService", "GASService", "GasOrder"}
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    HTTP server imitating GlobalSign ServerSSLService and GASService.
+
+    latency: mean delay of every response in seconds (jitter is +-25%)
+    issued_rate: share of GetOrderByOrderID answered with issued certificate, others are pending
+    chain_length: certificates in the chain of issued orders
+
+    Issued orders are dated today, so close cancels them.
+
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int] = ("127.0.0.1", 0),
+        latency: float = 0.05,
+        issued_rate: float = 0.5,
+        chain_length: int = 3,
+        seed: Optional[int] = None,
+    ) -> None:
+        super().__init__(address, StandInHandler)
+        self.latency = latency
+        self.issued_rate = issued_rate
+        self.chain = make_chain(chain_length)
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.orders = 0
+        self.operations: dict = {}
+        self.__thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """
+        Returns base URL of the stand-in, pmglobalsign.TEST_URL for usedemo=on
+
+        """
+
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/kb/ws/v1/"
+
+    def roll(self) -> float:
+        """
+        Returns random number in [0, 1) shared by all handler threads
+
+        """
+
+        with self.lock:
+            return self.random.random()
+
+    def next_order_id(self) -> str:
+        """
+        Returns new GlobalSign order id
+
+        """
+
+        with self.lock:
+            self.orders += 1
+            return f"CE2025050{self.orders:07d}"
+
+    def start(self) -> "StandInServer":
+        """
+        Serves requests in a background thread
+
+        """
+
+        self.__thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stops serving and closes the socket
+
+        """
+
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *_) -> None:
+        self.stop()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Request handler of StandInServer
+
+    """
+
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, Nagle would delay keep-alive responses
+    disable_nagle_algorithm = True
+    server: StandInServer
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *_) -> None:  # pylint: disable=arguments-differ
+        pass
+
+    def __reply(self, code: int, body: bytes) -> None:
+        self.send_response(code)
+        self.send_header("Content-Type", "text/xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def __respond(self, operation: str, request: bytes) -> bytes:
+        if operation == "GetOrderByOrderID":
+            order_id = ORDER_ID_RE.search(request).group("order_id").decode()
+            today = dt.date.today().isoformat()
+            if self.server.roll() < self.server.issued_rate:
+                return responses.order_status(order_id, 4, 4, self.server.chain, today, today)
+            return responses.order_status(order_id, 1, 1, order_date=today)
+        if operation == "GetDVApproverList":
+            domain = FQDN_RE.search(request).group("fqdn").decode()
+            return responses.approver_list(self.server.next_order_id(), domain)
+        if operation in ORDER_OPERATIONS:
+            return responses.order(operation, self.server.next_order_id())
+        if operation == "DecodeCSR":
+            return responses.decode_csr()
+        return responses.success(operation)
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        """
+        /kb/ws/v1/{ServerSSLService,GASService,GasOrder}, operation is taken from SOAP body
+
+        """
+
+        request = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        match = OPERATION_RE.search(request)
+        operation = match.group("operation").decode() if match else ""
+
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.operations[operation] = self.server.operations.get(operation, 0) + 1
+
+        latency = self.server.latency
+        if latency > 0:
+            time.sleep(latency * (0.75 + self.server.roll() / 2))
+
+        if self.path.rsplit("/", 1)[-1] not in SERVICES or not match:
+            self.__reply(404, b"")
+        else:
+            self.__reply(200, self.__respond(operation, request))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--issued-rate", type=float, default=0.5)
+    args = parser.parse_args()
+
+    server = StandInServer(("127.0.0.1", args.port), args.latency, args.issued_rate)
+    print(f"GlobalSign stand-in is listening on {server.url}")
+    server.serve_forever()
@@ -7,18 +7,29 @@ import warnings
 warnings.filterwarnings(action='ignore',message='Python 3.6 is no longer supported')
 
 import argparse
+import collections
+import concurrent.futures
+import itertools
 import xml.etree.ElementTree as ET
 import datetime
+import functools
+import hashlib
+import io
+import json
+import zipfile
 from enum import IntEnum
-from typing import List
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
 import socket
+import threading
 import requests
+import requests.adapters
 import ipaddress
 import os.path
-import OpenSSL.crypto
+import re
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.serialization import pkcs7 as pkcs7_serialization
 import random
-import subprocess
-import tempfile
+import time
 
 sys.path.insert(0, "/usr/local/mgr5/lib/python")
 
@@ -31,6 +42,9 @@ import billmgr.exception as exc
 
 SOAP_ENW = "http://schemas.xmlsoap.org/soap/envelope/"
 GS_NAMESPACE = "https://system.globalsign.com/kb/ws/v1/"
+GS_ORDER_NAMESPACE = "http://stub.order.gasapiserver.esp.globalsign.com"
+GS_QUERY_NAMESPACE = "http://stub.query.gasapiserver.esp.globalsign.com"
+BB_NAMESPACE = "https://system.globalsign.com/bb/ws/"
 
 TEST_URL = "https://test-gcc.globalsign.com/kb/ws/v1/"
 WORKING_URL = "https://system.globalsign.com/kb/ws/v1/"
@@ -41,7 +55,24 @@ DAYS_AUTODELETE_AFTER_ISSUED = 6
 DAYS_AUTODELETE_AFTER_ORDER = 30
 
 SERVICE_ORDER_ID = "custom_order_id"
+# Order id which close has already been processed for, such items are skipped by close_all
+SERVICE_CLOSED_ORDER_ID = "closed_order_id"
 SERVICE_STATUS_ADDITION = "service_status_addition"
+SERVICE_STATUS = "service_status"
+
+ITEM_STATUS_DELETED = 4
+SYNC_ALL_WORKERS = 8
+ITEM_CONTEXT_CHUNK = 500
+
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 60
+CONNECT_RETRIES = 3
+RETRY_BACKOFF_FACTOR = 0.5
+
+CACHE_DIR = "/usr/local/mgr5/tmp/.pmglobalsign"
+# approver emails of a domain change rarely, the order form is opened many times
+APPROVER_CACHE_TTL = 6 * 60 * 60
+APPROVER_WORKERS = 8
 
 
 class CertificateStatus(IntEnum):
@@ -73,18 +104,77 @@ def check_ip(ip):
         return True
 
 
-def session_for_src_addr(addr) -> requests.Session:
+class SourceAddressAdapter(requests.adapters.HTTPAdapter):
+    def __init__(self, source_address: str = None, **kwargs):
+        # HTTPAdapter.__init__ calls init_poolmanager, so set address first
+        self.source_address = source_address
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.source_address:
+            kwargs["source_address"] = (self.source_address, 0)
+        super().init_poolmanager(*args, **kwargs)
+
+
+def session_for_src_addr(addr: str = None) -> requests.Session:
+    """
+    Creates session bound to the source address (any address if None).
+    Connection errors are retried with backoff, requests that reached GlobalSign are not.
+
+    """
+    retry = requests.adapters.Retry(
+        total=CONNECT_RETRIES,
+        connect=CONNECT_RETRIES,
+        read=0,
+        redirect=0,
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+    )
+    adapter = SourceAddressAdapter(
+        addr,
+        pool_connections=requests.adapters.DEFAULT_POOLSIZE,
+        pool_maxsize=max(requests.adapters.DEFAULT_POOLSIZE, SYNC_ALL_WORKERS),
+        max_retries=retry,
+    )
     session = requests.Session()
     for prefix in ("http://", "https://"):
-        session.get_adapter(prefix).init_poolmanager(
-            connections=requests.adapters.DEFAULT_POOLSIZE,
-            maxsize=requests.adapters.DEFAULT_POOLSIZE,
-            source_address=(addr, 0),
-        )
+        session.mount(prefix, adapter)
 
     return session
 
 
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(addr: str = None) -> requests.Session:
+    """
+    Returns session shared by all API calls of the process, one per source address
+
+    """
+    with _sessions_lock:
+        session = _sessions.get(addr)
+        if session is None:
+            session = _sessions[addr] = session_for_src_addr(addr)
+        return session
+
+
+_module_params = {}
+_module_params_lock = threading.Lock()
+
+
+def get_module_params(module) -> dict:
+    """
+    Returns saved params of processing module, loaded once per process
+
+    """
+    module = int(module)
+    with _module_params_lock:
+        params = _module_params.get(module)
+        if params is None:
+            params = _module_params[module] = misc.get_module_params(module)
+        return params
+
+
 def register_namespace(node: ET.Element, prefix: str, url: str):
     node.attrib["xmlns:" + prefix] = url
 
@@ -108,24 +198,43 @@ def get_subjects(cert):
     return subjects
 
 
-def get_certificates(self) -> List[crypto.x509.Certificate]:
-    from OpenSSL.crypto import _lib, _ffi, X509
+@functools.lru_cache(maxsize=64)
+def get_certificate_subjects(cert) -> dict:
+    """
+    get_subjects of a chain certificate, CA certificates repeat in every issued order.
+    Returned dict is shared, do not modify it.
 
-    certs = _ffi.NULL
-    if self.type_is_signed():
-        certs = self._pkcs7.d.sign.cert
-    elif self.type_is_signedAndEnveloped():
-        certs = self._pkcs7.d.signed_and_enveloped.cert
+    """
+    return get_subjects(cert)
 
-    pycerts = []
-    for i in range(_lib.sk_X509_num(certs)):
-        pycert = X509.__new__(X509)
-        pycert._x509 = _lib.X509_dup(_lib.sk_X509_value(certs, i))
-        pycerts.append(pycert.to_cryptography())
 
-    if not pycerts:
-        return None
-    return pycerts
+def iter_pkcs7_certificates(pkcs7: str) -> Iterator[Tuple[str, str]]:
+    """
+    Yields (name, PEM) of every certificate in PEM PKCS#7 bundle.
+    Name is CN of the certificate, O if there is no CN, random otherwise.
+
+    """
+    for cert in pkcs7_serialization.load_pem_pkcs7_certificates(pkcs7.encode()):
+        subjects = get_certificate_subjects(cert)
+        if "CN" in subjects:
+            name = subjects["CN"]
+        elif "O" in subjects:
+            name = subjects["O"]
+        else:
+            name = bytes(random.randrange(0, 255) for i in range(8)).hex()
+        yield name, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+def build_zip(files: dict) -> bytes:
+    """
+    Packs {file name: text content} into zip archive in memory
+
+    """
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        for name, content in files.items():
+            zip_file.writestr(name, content)
+    return archive.getvalue()
 
 
 def get_SAN_option_type(cn: str, alt_name: str):
@@ -151,6 +260,510 @@ def get_SAN_option_type(cn: str, alt_name: str):
     return "7"
 
 
+# Slots are marked by processing instructions, "<?" never appears in serialized element text
+TEXT_SLOT = "text"
+CONTENT_SLOT = "content"
+RAW_SLOT = "raw"
+SLOT_RE = re.compile(rb"<([^\s/>?]+)><\?(text|content) (\w+)\?></\1>|<\?raw (\w+)\?>")
+
+
+def text_slot(element: ET.Element, name: str):
+    element.append(ET.ProcessingInstruction(TEXT_SLOT, name))
+
+
+def content_slot(element: ET.Element, name: str):
+    element.append(ET.ProcessingInstruction(CONTENT_SLOT, name))
+
+
+def raw_slot(parent: ET.Element, name: str):
+    parent.append(ET.ProcessingInstruction(RAW_SLOT, name))
+
+
+def xml_text(value: str) -> bytes:
+    return (
+        value.replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace(">", "&gt;")
+        .encode("ascii", "xmlcharrefreplace")
+    )
+
+
+class SoapTemplate:
+    """
+    XML serialized once from an ElementTree skeleton with named slots:
+    text_slot(element, name) - escaped text;
+    content_slot(element, name) - rendered children;
+    both are self-closed when the value is empty or None, as ET does it;
+    raw_slot(parent, name) - rendered fragment inserted as is, nothing when missing.
+    render() output is byte-identical to ET.tostring of the same tree built element by element.
+
+    """
+
+    def __init__(self, skeleton: ET.Element):
+        data = ET.tostring(skeleton)
+        self.__parts = []
+        pos = 0
+        for match in SLOT_RE.finditer(data):
+            tag, kind, name, raw_name = match.groups()
+            self.__parts.append(data[pos:match.start()])
+            if raw_name:
+                self.__parts.append((raw_name.decode(), None))
+            else:
+                self.__parts.append((
+                    name.decode(),
+                    (
+                        kind == TEXT_SLOT.encode(),
+                        b"<" + tag + b">",
+                        b"</" + tag + b">",
+                        b"<" + tag + b" />",
+                    ),
+                ))
+            pos = match.end()
+        self.__parts.append(data[pos:])
+        if any(isinstance(part, bytes) and b"<?" in part for part in self.__parts):
+            raise ValueError("slot element must not have text, attributes or other children")
+
+    def render(self, **values) -> bytes:
+        result = []
+        for part in self.__parts:
+            if isinstance(part, bytes):
+                result.append(part)
+                continue
+
+            name, element = part
+            if element is None:
+                result.append(values.get(name, b""))
+                continue
+
+            escape, open_tag, close_tag, empty_tag = element
+            value = values[name]
+            if not value:
+                result.append(empty_tag)
+            elif escape:
+                result += (open_tag, xml_text(value), close_tag)
+            else:
+                result += (open_tag, value, close_tag)
+        return b"".join(result)
+
+
+def soap_envelope(namespace: str = "", prefix: str = "ns1"):
+    envelope = ET.Element("SOAP-ENV:Envelope")
+    register_namespace(envelope, "SOAP-ENV", SOAP_ENW)
+    if namespace:
+        register_namespace(envelope, prefix, namespace)
+    return envelope, ET.SubElement(envelope, "SOAP-ENV:Body")
+
+
+def soap_request(namespace: str, operation: str, prefix: str = "ns1", request_tag: str = "Request"):
+    envelope, body = soap_envelope(namespace, prefix)
+    request = ET.SubElement(ET.SubElement(body, operation), request_tag)
+    return envelope, request
+
+
+@functools.lru_cache(maxsize=None)
+def element_template(tag: str) -> SoapTemplate:
+    element = ET.Element(tag)
+    text_slot(element, "text")
+    return SoapTemplate(element)
+
+
+@functools.lru_cache(maxsize=None)
+def request_header_template(type: str, ns: str) -> SoapTemplate:
+    request_header = ET.Element(ns + type + "RequestHeader")
+    auth_token = ET.SubElement(request_header, ns + "AuthToken")
+    text_slot(ET.SubElement(auth_token, ns + "UserName"), "username")
+    text_slot(ET.SubElement(auth_token, ns + "Password"), "password")
+    return SoapTemplate(request_header)
+
+
+@functools.lru_cache(maxsize=None)
+def order_request_parameter_template(ns: str) -> SoapTemplate:
+    order_request_param = ET.Element(ns + "OrderRequestParameter")
+    text_slot(ET.SubElement(order_request_param, ns + "ProductCode"), "product_code")
+    raw_slot(order_request_param, "base_option")
+    text_slot(ET.SubElement(order_request_param, ns + "OrderKind"), "order_kind")
+    ET.SubElement(order_request_param, ns + "Licenses").text = "1"
+    raw_slot(order_request_param, "options")
+    validity_period = ET.SubElement(order_request_param, ns + "ValidityPeriod")
+    text_slot(ET.SubElement(validity_period, ns + "Months"), "months")
+    text_slot(ET.SubElement(order_request_param, ns + "CSR"), "csr")
+    raw_slot(order_request_param, "renewal")
+    return SoapTemplate(order_request_param)
+
+
+@functools.lru_cache(maxsize=None)
+def base_option_template(ns: str) -> SoapTemplate:
+    base_option = ET.Element(ns + "BaseOption")
+    base_option.text = "wildcard"
+    return SoapTemplate(base_option)
+
+
+@functools.lru_cache(maxsize=None)
+def san_option_template() -> SoapTemplate:
+    options = ET.Element("Options")
+    option = ET.SubElement(options, "Option")
+    ET.SubElement(option, "OptionName").text = "SAN"
+    ET.SubElement(option, "OptionValue").text = "true"
+    return SoapTemplate(options)
+
+
+@functools.lru_cache(maxsize=None)
+def org_info_template() -> SoapTemplate:
+    org_info = ET.Element("OrganizationInfo")
+    text_slot(ET.SubElement(org_info, "OrganizationName"), "name")
+    text_slot(ET.SubElement(org_info, "OrganizationCode"), "duns")
+    address = ET.SubElement(org_info, "OrganizationAddress")
+    text_slot(ET.SubElement(address, "AddressLine1"), "address")
+    ET.SubElement(address, "AddressLine2")
+    ET.SubElement(address, "AddressLine3")
+    text_slot(ET.SubElement(address, "City"), "city")
+    text_slot(ET.SubElement(address, "Region"), "region")
+    text_slot(ET.SubElement(address, "PostalCode"), "postalcode")
+    text_slot(ET.SubElement(address, "Country"), "country")
+    text_slot(ET.SubElement(address, "Phone"), "phone")
+    return SoapTemplate(org_info)
+
+
+@functools.lru_cache(maxsize=None)
+def org_info_ev_template() -> SoapTemplate:
+    org_info_ev = ET.Element("OrganizationInfoEV")
+    text_slot(ET.SubElement(org_info_ev, "BusinessAssumedName"), "name")
+    text_slot(ET.SubElement(org_info_ev, "OrganizationCode"), "duns")
+    ET.SubElement(org_info_ev, "BusinessCategoryCode").text = "BE"
+    address = ET.SubElement(org_info_ev, "OrganizationAddress")
+    text_slot(ET.SubElement(address, "AddressLine1"), "address")
+    ET.SubElement(address, "AddressLine2")
+    ET.SubElement(address, "AddressLine3")
+    text_slot(ET.SubElement(address, "City"), "city")
+    text_slot(ET.SubElement(address, "Region"), "region")
+    text_slot(ET.SubElement(address, "PostalCode"), "postalcode")
+    text_slot(ET.SubElement(address, "Country"), "country")
+    text_slot(ET.SubElement(address, "Phone"), "phone")
+    text_slot(ET.SubElement(address, "Fax"), "fax")
+    return SoapTemplate(org_info_ev)
+
+
+@functools.lru_cache(maxsize=None)
+def authorized_signer_info_template() -> SoapTemplate:
+    auth_signer_info = ET.Element("AuthorizedSignerInfo")
+    text_slot(ET.SubElement(auth_signer_info, "OrganizationName"), "org_name")
+    text_slot(ET.SubElement(auth_signer_info, "FirstName"), "first_name")
+    text_slot(ET.SubElement(auth_signer_info, "LastName"), "last_name")
+    text_slot(ET.SubElement(auth_signer_info, "Function"), "function")
+    text_slot(ET.SubElement(auth_signer_info, "Phone"), "phone")
+    text_slot(ET.SubElement(auth_signer_info, "Email"), "email")
+    return SoapTemplate(auth_signer_info)
+
+
+@functools.lru_cache(maxsize=None)
+def contact_info_template() -> SoapTemplate:
+    contact_info = ET.Element("ContactInfo")
+    text_slot(ET.SubElement(contact_info, "Email"), "email")
+    text_slot(ET.SubElement(contact_info, "FirstName"), "first_name")
+    text_slot(ET.SubElement(contact_info, "LastName"), "last_name")
+    text_slot(ET.SubElement(contact_info, "Phone"), "phone")
+    return SoapTemplate(contact_info)
+
+
+@functools.lru_cache(maxsize=None)
+def second_contact_info_template() -> SoapTemplate:
+    second_contact_info = ET.Element("SecondContactInfo")
+    text_slot(ET.SubElement(second_contact_info, "Email"), "email")
+    text_slot(ET.SubElement(second_contact_info, "FirstName"), "first_name")
+    text_slot(ET.SubElement(second_contact_info, "LastName"), "last_name")
+    return SoapTemplate(second_contact_info)
+
+
+@functools.lru_cache(maxsize=None)
+def jurisdiction_info_template() -> SoapTemplate:
+    jurisdiction_info = ET.Element("JurisdictionInfo")
+    text_slot(ET.SubElement(jurisdiction_info, "JurisdictionCountry"), "country")
+    text_slot(ET.SubElement(jurisdiction_info, "StateOrProvince"), "region")
+    text_slot(ET.SubElement(jurisdiction_info, "Locality"), "city")
+    crn = ET.SubElement(jurisdiction_info, "IncorporationAgencyRegistrationNumber")
+    crn.text = "004655432"
+    return SoapTemplate(jurisdiction_info)
+
+
+@functools.lru_cache(maxsize=None)
+def approver_info_template() -> SoapTemplate:
+    approver_info = ET.Element("ApproverInfo")
+    text_slot(ET.SubElement(approver_info, "Email"), "email")
+    text_slot(ET.SubElement(approver_info, "FirstName"), "first_name")
+    text_slot(ET.SubElement(approver_info, "Function"), "function")
+    text_slot(ET.SubElement(approver_info, "LastName"), "last_name")
+    text_slot(ET.SubElement(approver_info, "OrganizationName"), "org_name")
+    ET.SubElement(approver_info, "OrganizationUnit")
+    text_slot(ET.SubElement(approver_info, "Phone"), "phone")
+    return SoapTemplate(approver_info)
+
+
+@functools.lru_cache(maxsize=None)
+def requestor_info_template() -> SoapTemplate:
+    requestor_info = ET.Element("RequestorInfo")
+    text_slot(ET.SubElement(requestor_info, "Email"), "email")
+    text_slot(ET.SubElement(requestor_info, "FirstName"), "first_name")
+    text_slot(ET.SubElement(requestor_info, "Function"), "function")
+    text_slot(ET.SubElement(requestor_info, "LastName"), "last_name")
+    text_slot(ET.SubElement(requestor_info, "OrganizationName"), "org_name")
+    text_slot(ET.SubElement(requestor_info, "OrganizationUnit"), "unit")
+    text_slot(ET.SubElement(requestor_info, "Phone"), "phone")
+    return SoapTemplate(requestor_info)
+
+
+@functools.lru_cache(maxsize=None)
+def san_entry_template() -> SoapTemplate:
+    san_entry = ET.Element("SANEntry")
+    text_slot(ET.SubElement(san_entry, "SANOptionType"), "option_type")
+    text_slot(ET.SubElement(san_entry, "SubjectAltName"), "alt_name")
+    return SoapTemplate(san_entry)
+
+
+@functools.lru_cache(maxsize=None)
+def dv_approver_list_template() -> SoapTemplate:
+    envelope, request = soap_request(GS_NAMESPACE, "ns1:GetDVApproverList")
+    text_slot(ET.SubElement(request, "FQDN"), "fqdn")
+    raw_slot(request, "header")
+    return SoapTemplate(envelope)
+
+
+@functools.lru_cache(maxsize=None)
+def account_snapshot_template() -> SoapTemplate:
+    envelope, request = soap_request(GS_NAMESPACE, "ns1:AccountSnapshot")
+    raw_slot(request, "header")
+    return SoapTemplate(envelope)
+
+
+@functools.lru_cache(maxsize=None)
+def validate_order_template() -> SoapTemplate:
+    envelope, request = soap_request(GS_NAMESPACE, "ns1:ValidateOrderParameters")
+    raw_slot(request, "header")
+    raw_slot(request, "parameter")
+    return SoapTemplate(envelope)
+
+
+@functools.lru_cache(maxsize=None)
+def gs_validate_order_template() -> SoapTemplate:
+    envelope, request = soap_request(
+        GS_ORDER_NAMESPACE, "ns1:GSValidateOrderParameters", request_tag="ns1:Request"
+    )
+    raw_slot(request, "header")
+    raw_slot(request, "parameter")
+    return SoapTemplate(envelope)
+
+
+@functools.lru_cache(maxsize=None)
+def order_status_template() -> SoapTemplate:
+    envelope, request = soap_request(GS_QUERY_NAMESPACE, "ns1:GetOrderByOrderID")
+    raw_slot(request, "header")
+    text_slot(ET.SubElement(request, "OrderID"), "order_id")
+    options = ET.SubElement(request, "OrderQueryOption")
+    ET.SubElement(options, "OrderStatus").text = "1"
+    ET.SubElement(options, "ReturnCertificateInfo").text = "true"
+    ET.SubElement(options, "ReturnFulfillment").text = "true"
+    return SoapTemplate(envelope)
+
+
+@functools.lru_cache(maxsize=None)
+def decode_csr_template() -> SoapTemplate:
+    envelope, request = soap_request(GS_NAMESPACE, "DecodeCSR")
+    raw_slot(request, "header")
+    text_slot(ET.SubElement(request, "CSR"), "csr")
+    text_slot(ET.SubElement(request, "ProductType"), "product_type")
+    return SoapTemplate(envelope)
+
+
+@functools.lru_cache(maxsize=None)
+def order_template(order_type: str) -> SoapTemplate:
+    envelope, request = soap_request(GS_NAMESPACE, order_type)
+    raw_slot(request, "header")
+    raw_slot(request, "parameter")
+    raw_slot(request, "details")
+    content_slot(ET.SubElement(request, "SANEntries"), "san_entries")
+    return SoapTemplate(envelope)
+
+
+@functools.lru_cache(maxsize=None)
+def modify_order_template() -> SoapTemplate:
+    envelope, request = soap_request(GS_ORDER_NAMESPACE, "ns1:ModifyOrder")
+    raw_slot(request, "header")
+    text_slot(ET.SubElement(request, "OrderID"), "order_id")
+    ET.SubElement(request, "ModifyOrderOperation").text = "CANCEL"
+    return SoapTemplate(envelope)
+
+
+@functools.lru_cache(maxsize=None)
+def reissue_template() -> SoapTemplate:
+    envelope, request = soap_request(GS_NAMESPACE, "ReIssue")
+    raw_slot(request, "header")
+    order_parameter = ET.SubElement(request, "OrderParameter")
+    text_slot(ET.SubElement(order_parameter, "CSR"), "csr")
+    ET.SubElement(order_parameter, "DNSNames")
+    text_slot(ET.SubElement(request, "TargetOrderID"), "order_id")
+    ET.SubElement(request, "HashAlgorithm")
+    return SoapTemplate(envelope)
+
+
+@functools.lru_cache(maxsize=None)
+def dvdns_verification_template() -> SoapTemplate:
+    envelope, request = soap_request(BB_NAMESPACE, "ns2:DVDNSVerificationForIssue", "ns2")
+    raw_slot(request, "header")
+    text_slot(ET.SubElement(request, "OrderID"), "order_id")
+    text_slot(ET.SubElement(request, "ApproverFQDN"), "domain")
+    return SoapTemplate(envelope)
+
+
+@functools.lru_cache(maxsize=None)
+def change_approver_email_template() -> SoapTemplate:
+    envelope, request = soap_request("", "ChangeApproverEmail")
+    raw_slot(request, "header")
+    text_slot(ET.SubElement(request, "OrderID"), "order_id")
+    text_slot(ET.SubElement(request, "ApproverEmail"), "email")
+    text_slot(ET.SubElement(request, "FQDN"), "fqdn")
+    return SoapTemplate(envelope)
+
+
+API_ERROR_TAGS = ("SuccessCode", "ErrorMessage", "ErrorCode")
+
+
+def check_api_error(fields: dict):
+    """
+    fields: {tag: text} of the first SuccessCode, ErrorMessage and ErrorCode in the response
+
+    """
+    success_code = fields.get("SuccessCode", "0")
+    if success_code == "0" or success_code == "1" or "ErrorMessage" not in fields:
+        return
+
+    logger.debug("error_message %s", fields["ErrorMessage"])
+    if fields.get("ErrorCode") != LOGIN_ERR_CODE:
+        raise exc.XmlException(
+            "api_error", err_object="", err_value=fields["ErrorMessage"]
+        )
+
+
+class OrderStatusInfo(NamedTuple):
+    order_status: int
+    certificate_status: int
+    order_date: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    x509_cert: Optional[str] = None
+    pkcs7_cert: Optional[str] = None
+
+
+ORDER_STATUS_FIELDS = {
+    "OrderStatus": "order_status",
+    "CertificateStatus": "certificate_status",
+    "OrderDate": "order_date",
+    "StartDate": "start_date",
+    "EndDate": "end_date",
+    "X509Cert": "x509_cert",
+    "PKCS7Cert": "pkcs7_cert",
+}
+
+
+def parse_order_status(content: bytes) -> OrderStatusInfo:
+    """
+    Extracts GetOrderByOrderID fields in one pass over the parsed tree,
+    same as the first .//Tag match for every field.
+
+    """
+    fields = {}
+    errors = {}
+    for element in ET.fromstring(content).iter():
+        tag = element.tag
+        if tag in ORDER_STATUS_FIELDS:
+            fields.setdefault(ORDER_STATUS_FIELDS[tag], element.text)
+        elif tag in API_ERROR_TAGS:
+            errors.setdefault(tag, element.text)
+
+    check_api_error(errors)
+    fields["order_status"] = int(fields["order_status"])
+    fields["certificate_status"] = int(fields["certificate_status"])
+    return OrderStatusInfo(**fields)
+
+
+def approver_cache_path(module: int, domain: str) -> str:
+    key = hashlib.sha256(domain.strip().lower().encode()).hexdigest()
+    return os.path.join(CACHE_DIR, "approver_{}_{}.json".format(module, key))
+
+
+def load_approver_list(module: int, domain: str, ttl: float = APPROVER_CACHE_TTL) -> Optional[List[str]]:
+    path = approver_cache_path(module, domain)
+    try:
+        with open(path) as cache_file:
+            cached = json.load(cache_file)
+        if time.time() - cached["created"] >= ttl:
+            return None
+        return cached["emails"]
+    except FileNotFoundError:
+        return None
+    except Exception as err:
+        logger.warning("Approver cache %s is broken, ignore it: %s", path, err)
+        return None
+
+
+def save_approver_list(module: int, domain: str, emails: List[str]):
+    path = approver_cache_path(module, domain)
+    tmp_path = "{}.{}.{}.tmp".format(path, os.getpid(), threading.get_ident())
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(tmp_path, "w") as cache_file:
+            json.dump({"domain": domain, "created": time.time(), "emails": emails}, cache_file)
+        os.replace(tmp_path, path)
+    except OSError as err:
+        logger.warning("Failed to save approver cache %s: %s", path, err)
+
+
+class ItemContext(NamedTuple):
+    iteminfo: dict
+    item_params: dict
+    csr: Optional[str]
+
+
+def load_item_contexts(items) -> Dict[int, ItemContext]:
+    """
+    Fetches item info, params and CSR of many items with two queries per chunk.
+    Items which do not exist are missing from the result.
+
+    """
+    ids = sorted({int(item) for item in items})
+    contexts = {}
+    for start in range(0, len(ids), ITEM_CONTEXT_CHUNK):
+        chunk = ids[start:start + ITEM_CONTEXT_CHUNK]
+        placeholders = ", ".join(["%s"] * len(chunk))
+
+        for record in db.db_query(
+            "SELECT i.id, i.processingmodule, i.period, p.intname AS pricelist_intname, c.csr "
+            "FROM item i "
+            "JOIN pricelist p ON p.id = i.pricelist "
+            "LEFT JOIN certificate c ON c.item = i.id "
+            "WHERE i.id IN (" + placeholders + ")",
+            *chunk
+        ):
+            contexts[int(record["id"])] = ItemContext(
+                iteminfo={
+                    "id": record["id"],
+                    "processingmodule": record["processingmodule"],
+                    "period": record["period"],
+                    "pricelist_intname": record["pricelist_intname"],
+                },
+                item_params={},
+                csr=record["csr"],
+            )
+
+        for record in db.db_query(
+            "SELECT item, intname, value FROM itemparam WHERE item IN (" + placeholders + ")",
+            *chunk
+        ):
+            context = contexts.get(int(record["item"]))
+            if context is not None:
+                context.item_params[record["intname"]] = record["value"]
+
+    return contexts
+
+
 class Api:
     class RequestMethod(IntEnum):
         POST = (1,)
@@ -160,82 +773,67 @@ class Api:
         if params:
             self.__module_params = params
         else:
-            self.__module_params = misc.get_module_params(module)
+            self.__module_params = get_module_params(module)
+        self.module = module
         self.order_id = ""
 
-    def request(
+    def request_content(
             self,
             method: str,
             header: dict = None,
             request: str = "",
             r_method: RequestMethod = RequestMethod.GET,
-    ):
+    ) -> bytes:
         logger.debug("Make api call. request:\n%s", request)
 
-        session = requests.Session()
-        if self.__module_params["sourceip"] and check_ip(
-                self.__module_params["sourceip"]
-        ):
-            session = session_for_src_addr(self.__module_params["sourceip"])
-        session.headers.update(header)
+        sourceip = self.__module_params.get("sourceip")
+        session = get_session(sourceip if sourceip and check_ip(sourceip) else None)
         url = TEST_URL if self.__module_params["usedemo"] == "on" else WORKING_URL
         url += method
+        timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
 
         if r_method == self.RequestMethod.GET:
-            response = session.get(url)
+            response = session.get(url, headers=header, timeout=timeout)
         elif r_method == self.RequestMethod.POST:
-            response = session.post(url, data=request)
+            response = session.post(url, data=request, headers=header, timeout=timeout)
         else:
             raise exc.XmlException("response")
 
         logger.debug("response:%s", response.content)
-        response_xml = ET.fromstring(response.content)
-        success_code = response_xml.find(".//SuccessCode")
-        if (
-                success_code != None
-                and success_code.text != "0"
-                and success_code.text != "1"
-        ):
-            err_msg = response_xml.find(".//ErrorMessage")
+        return response.content
 
-            if err_msg != None:
-                logger.debug("error_message %s", err_msg.text)
-                err_code = response_xml.find(".//ErrorCode")
-                if err_code.text != LOGIN_ERR_CODE:
-                    raise exc.XmlException(
-                        "api_error", err_object="", err_value=err_msg.text
-                    )
+    def request(
+            self,
+            method: str,
+            header: dict = None,
+            request: str = "",
+            r_method: RequestMethod = RequestMethod.GET,
+    ):
+        response_xml = ET.fromstring(self.request_content(method, header, request, r_method))
+        fields = {}
+        for tag in API_ERROR_TAGS:
+            node = response_xml.find(".//" + tag)
+            if node != None:
+                fields[tag] = node.text
+        check_api_error(fields)
 
         return response_xml
 
-    def set_request_header(self, type: str = "Order", ns: str = ""):
-        request_header = ET.Element(ns + type + "RequestHeader")
-        auth_token = ET.SubElement(request_header, ns + "AuthToken")
-        username = ET.SubElement(auth_token, ns + "UserName")
-        username.text = self.__module_params["username"]
-        password = ET.SubElement(auth_token, ns + "Password")
-        password.text = self.__module_params["password"]
-
-        return request_header
+    def set_request_header(self, type: str = "Order", ns: str = "") -> bytes:
+        return request_header_template(type, ns).render(
+            username=self.__module_params["username"],
+            password=self.__module_params["password"],
+        )
 
     def get_DV_approverlist(self, domain: str):
         logger.debug("Get DV approverlist")
 
-        envelope = ET.Element("SOAP-ENV:Envelope")
-        register_namespace(envelope, "SOAP-ENV", SOAP_ENW)
-        register_namespace(envelope, "ns1", GS_NAMESPACE)
-        body = ET.SubElement(envelope, "SOAP-ENV:Body")
-        ns1 = ET.SubElement(body, "ns1:GetDVApproverList")
-        request = ET.SubElement(ns1, "Request")
-        fqdn = ET.SubElement(request, "FQDN")
-        fqdn.text = domain
-
-        request.append(self.set_request_header("Query"))
-
         response = self.request(
             "ServerSSLService",
             {"Content-Type": "text/xml"},
-            ET.tostring(envelope),
+            dv_approver_list_template().render(
+                fqdn=domain, header=self.set_request_header("Query")
+            ),
             Api.RequestMethod.POST,
         )
 
@@ -247,17 +845,41 @@ class Api:
         if xpath != None:
             self.order_id = xpath.text
 
+        if result:
+            save_approver_list(self.module, domain, result)
         return result
 
 
 class GlobalSign:
     def __init__(self, iid, module: int = None, renew: bool = False):
         self.__load_item_params(iid, module)
-
+        self.__init_state(iid, renew)
+
+    @classmethod
+    def from_context(cls, iid: int, context: ItemContext, renew: bool = False):
+        """
+        Builds object from context fetched by load_item_contexts without per-item queries
+
+        """
+        gs = cls.__new__(cls)
+        gs.__iteminfo = dict(context.iteminfo)
+        gs.__item_params = dict(context.item_params)
+        gs.__add_csr(context.csr)
+        gs.__init_state(iid, renew)
+        return gs
+
+    def __init_state(self, iid: int, renew: bool):
         self.iid = iid
         self.processingmodule = self.__iteminfo.get("processingmodule")
-        self.__module_params = misc.get_module_params(self.processingmodule)
+        self.__module_params = get_module_params(self.processingmodule)
         self.renew = renew
+        service_status = self.__item_params.get(SERVICE_STATUS)
+        self.__service_status = int(service_status) if service_status else None
+
+    def __add_csr(self, csr: Optional[str]):
+        if csr:
+            self.__item_params.update(get_subjects(crypto.x509decode(csr)))
+            self.__item_params["csr"] = csr
 
     def __load_item_params(self, iid: int, module: int = None):
         self.__iteminfo = misc.iteminfo(iid)
@@ -265,163 +887,92 @@ class GlobalSign:
         csr = db.get_first_record(
             "SELECT csr " "FROM certificate " "WHERE item = %s", iid
         )
-
-        if csr:
-            self.__item_params.update(get_subjects(crypto.x509decode(csr["csr"])))
-            self.__item_params["csr"] = csr["csr"]
+        self.__add_csr(csr["csr"] if csr else None)
 
         if module is not None and self.__iteminfo["processingmodule"] is None:
             self.__iteminfo["processingmodule"] = module
-        self.__module_params = misc.get_module_params(
-            int(self.__iteminfo["processingmodule"])
+
+    def set_org_info(self) -> bytes:
+        return org_info_template().render(
+            name=self.__item_params["org_name"],
+            duns=self.__item_params.get("org_duns"),
+            address=self.__item_params["org_address"],
+            city=self.__item_params["org_city"],
+            region=self.__item_params["org_state"],
+            postalcode=self.__item_params["org_postcode"],
+            country=self.__item_params["C"],
+            phone=self.__item_params["org_phone"],
+        )
+
+    def set_org_info_EV(self) -> bytes:
+        return org_info_ev_template().render(
+            name=self.__item_params["org_name"],
+            duns=self.__item_params.get("org_duns"),
+            address=self.__item_params["org_address"],
+            city=self.__item_params["org_city"],
+            region=self.__item_params["org_state"],
+            postalcode=self.__item_params["org_postcode"],
+            country=self.__item_params["C"],
+            phone=self.__item_params["org_phone"],
+            fax=self.__item_params["org_phone"],
+        )
+
+    def set_authorized_signer_info(self) -> bytes:
+        return authorized_signer_info_template().render(
+            org_name=self.__item_params["org_name"],
+            first_name=self.__item_params["adm_fname"],
+            last_name=self.__item_params["adm_lname"],
+            function=self.__item_params["adm_jtitle"],
+            phone=self.__item_params["adm_phone"],
+            email=self.__item_params["adm_email"],
+        )
+
+    def set_contact_info(self) -> bytes:
+        return contact_info_template().render(
+            email=self.__item_params["adm_email"],
+            first_name=self.__item_params["adm_fname"],
+            last_name=self.__item_params["adm_lname"],
+            phone=self.__item_params["adm_phone"],
+        )
+
+    def set_second_contact_info(self) -> bytes:
+        return second_contact_info_template().render(
+            email=self.__item_params["adm_email"],
+            first_name=self.__item_params["adm_fname"],
+            last_name=self.__item_params["adm_lname"],
+        )
+
+    def set_jurisdiction_info(self) -> bytes:
+        return jurisdiction_info_template().render(
+            country=self.__item_params["C"],
+            region=self.__item_params["org_state"],
+            city=self.__item_params["L"],
         )
 
-    def set_org_info(self):
-        org_info = ET.Element("OrganizationInfo")
-        name = ET.SubElement(org_info, "OrganizationName")
-        name.text = self.__item_params["org_name"]
-        duns = ET.SubElement(org_info, "OrganizationCode")
-        duns.text = self.__item_params.get("org_duns")
-        address = ET.SubElement(org_info, "OrganizationAddress")
-        address1 = ET.SubElement(address, "AddressLine1")
-        address1.text = self.__item_params["org_address"]
-        ET.SubElement(address, "AddressLine2")
-        ET.SubElement(address, "AddressLine3")
-        city = ET.SubElement(address, "City")
-        city.text = self.__item_params["org_city"]
-        retion = ET.SubElement(address, "Region")
-        retion.text = self.__item_params["org_state"]
-        postalcode = ET.SubElement(address, "PostalCode")
-        postalcode.text = self.__item_params["org_postcode"]
-        country = ET.SubElement(address, "Country")
-        country.text = self.__item_params["C"]
-        phone = ET.SubElement(address, "Phone")
-        phone.text = self.__item_params["org_phone"]
-
-        return org_info
-
-    def set_org_info_EV(self):
-        org_info_ev = ET.Element("OrganizationInfoEV")
-        name = ET.SubElement(org_info_ev, "BusinessAssumedName")
-        name.text = self.__item_params["org_name"]
-        duns = ET.SubElement(org_info_ev, "OrganizationCode")
-        duns.text = self.__item_params.get("org_duns")
-        code = ET.SubElement(org_info_ev, "BusinessCategoryCode")
-        code.text = "BE"
-        address = ET.SubElement(org_info_ev, "OrganizationAddress")
-        address1 = ET.SubElement(address, "AddressLine1")
-        address1.text = self.__item_params["org_address"]
-        ET.SubElement(address, "AddressLine2")
-        ET.SubElement(address, "AddressLine3")
-        city = ET.SubElement(address, "City")
-        city.text = self.__item_params["org_city"]
-        region = ET.SubElement(address, "Region")
-        region.text = self.__item_params["org_state"]
-        postalcode = ET.SubElement(address, "PostalCode")
-        postalcode.text = self.__item_params["org_postcode"]
-        country = ET.SubElement(address, "Country")
-        country.text = self.__item_params["C"]
-        phone = ET.SubElement(address, "Phone")
-        phone.text = self.__item_params["org_phone"]
-        fax = ET.SubElement(address, "Fax")
-        fax.text = self.__item_params["org_phone"]
-
-        return org_info_ev
-
-    def set_authorized_signer_info(self):
-        auth_signer_info = ET.Element("AuthorizedSignerInfo")
-        name = ET.SubElement(auth_signer_info, "OrganizationName")
-        name.text = self.__item_params["org_name"]
-        first_name = ET.SubElement(auth_signer_info, "FirstName")
-        first_name.text = self.__item_params["adm_fname"]
-        last_name = ET.SubElement(auth_signer_info, "LastName")
-        last_name.text = self.__item_params["adm_lname"]
-        function = ET.SubElement(auth_signer_info, "Function")
-        function.text = self.__item_params["adm_jtitle"]
-        phone = ET.SubElement(auth_signer_info, "Phone")
-        phone.text = self.__item_params["adm_phone"]
-        email = ET.SubElement(auth_signer_info, "Email")
-        email.text = self.__item_params["adm_email"]
-
-        return auth_signer_info
-
-    def set_contact_info(self):
-        contact_info = ET.Element("ContactInfo")
-        email = ET.SubElement(contact_info, "Email")
-        email.text = self.__item_params["adm_email"]
-        first_name = ET.SubElement(contact_info, "FirstName")
-        first_name.text = self.__item_params["adm_fname"]
-        last_name = ET.SubElement(contact_info, "LastName")
-        last_name.text = self.__item_params["adm_lname"]
-        phone = ET.SubElement(contact_info, "Phone")
-        phone.text = self.__item_params["adm_phone"]
-
-        return contact_info
-
-    def set_second_contact_info(self):
-        second_contact_info = ET.Element("SecondContactInfo")
-        email = ET.SubElement(second_contact_info, "Email")
-        email.text = self.__item_params["adm_email"]
-        first_name = ET.SubElement(second_contact_info, "FirstName")
-        first_name.text = self.__item_params["adm_fname"]
-        last_name = ET.SubElement(second_contact_info, "LastName")
-        last_name.text = self.__item_params["adm_lname"]
-
-        return second_contact_info
-
-    def set_jurisdiction_info(self):
-        jurisdiction_info = ET.Element("JurisdictionInfo")
-        country = ET.SubElement(jurisdiction_info, "JurisdictionCountry")
-        country.text = self.__item_params["C"]
-        region = ET.SubElement(jurisdiction_info, "StateOrProvince")
-        region.text = self.__item_params["org_state"]
-        city = ET.SubElement(jurisdiction_info, "Locality")
-        city.text = self.__item_params["L"]
-        crn = ET.SubElement(jurisdiction_info, "IncorporationAgencyRegistrationNumber")
-        crn.text = "004655432"
-
-        return jurisdiction_info
-
-    def set_approver_info(self):
-        approver_info = ET.Element("ApproverInfo")
-        email = ET.SubElement(approver_info, "Email")
-        email.text = self.__item_params["adm_email"]
-        first_name = ET.SubElement(approver_info, "FirstName")
-        first_name.text = self.__item_params["adm_fname"]
-        function = ET.SubElement(approver_info, "Function")
-        function.text = self.__item_params["adm_jtitle"]
-        last_name = ET.SubElement(approver_info, "LastName")
-        last_name.text = self.__item_params["adm_lname"]
-        name = ET.SubElement(approver_info, "OrganizationName")
-        name.text = self.__item_params["org_name"]
-        ET.SubElement(approver_info, "OrganizationUnit")
-        phone = ET.SubElement(approver_info, "Phone")
-        phone.text = self.__item_params["adm_phone"]
-
-        return approver_info
-
-    def set_requestor_info(self):
-        set_requestor_info = ET.Element("RequestorInfo")
-        email = ET.SubElement(set_requestor_info, "Email")
-        email.text = self.__item_params["adm_email"]
-        first_name = ET.SubElement(set_requestor_info, "FirstName")
-        first_name.text = self.__item_params["adm_fname"]
-        function = ET.SubElement(set_requestor_info, "Function")
-        function.text = self.__item_params["adm_jtitle"]
-        last_name = ET.SubElement(set_requestor_info, "LastName")
-        last_name.text = self.__item_params["adm_lname"]
-        name = ET.SubElement(set_requestor_info, "OrganizationName")
-        name.text = self.__item_params["org_name"]
-        unit = ET.SubElement(set_requestor_info, "OrganizationUnit")
-        unit.text = (
-            self.__item_params["OU"]
-            if self.__item_params.get("OU")
-            else self.__module_params["default_OU"]
+    def set_approver_info(self) -> bytes:
+        return approver_info_template().render(
+            email=self.__item_params["adm_email"],
+            first_name=self.__item_params["adm_fname"],
+            function=self.__item_params["adm_jtitle"],
+            last_name=self.__item_params["adm_lname"],
+            org_name=self.__item_params["org_name"],
+            phone=self.__item_params["adm_phone"],
         )
-        phone = ET.SubElement(set_requestor_info, "Phone")
-        phone.text = self.__item_params["adm_phone"]
 
-        return set_requestor_info
+    def set_requestor_info(self) -> bytes:
+        return requestor_info_template().render(
+            email=self.__item_params["adm_email"],
+            first_name=self.__item_params["adm_fname"],
+            function=self.__item_params["adm_jtitle"],
+            last_name=self.__item_params["adm_lname"],
+            org_name=self.__item_params["org_name"],
+            unit=(
+                self.__item_params["OU"]
+                if self.__item_params.get("OU")
+                else self.__module_params["default_OU"]
+            ),
+            phone=self.__item_params["adm_phone"],
+        )
 
     def set_order_request_parameter(self, order: bool = False, ns: str = ""):
         type = self.__iteminfo["pricelist_intname"]
@@ -438,121 +989,74 @@ class GlobalSign:
         ):
             type = "TEST_" + type
 
-        order_request_param = ET.Element(ns + "OrderRequestParameter")
         type = order_type_dns(type, self.__item_params["approver_method"], wildcard)
-        product_code = ET.SubElement(order_request_param, ns + "ProductCode")
-        product_code.text = get_valid_product_type(type)
-        if wildcard:
-            base_option = ET.SubElement(order_request_param, ns + "BaseOption")
-            base_option.text = "wildcard"
-        order_kind = ET.SubElement(order_request_param, ns + "OrderKind")
-        order_kind.text = "renewal" if self.renew else "new"
-        licenses = ET.SubElement(order_request_param, ns + "Licenses")
-        licenses.text = "1"
-
-        if not ns:
-            san = self.__item_params["altname"].split()
-            if san:
-                options = ET.SubElement(order_request_param, "Options")
-                option = ET.SubElement(options, "Option")
-                option_name = ET.SubElement(option, "OptionName")
-                option_name.text = "SAN"
-                option_value = ET.SubElement(option, "OptionValue")
-                option_value.text = "true"
-
-        validity_period = ET.SubElement(order_request_param, ns + "ValidityPeriod")
-        months = ET.SubElement(validity_period, ns + "Months")
-        months.text = str(self.__iteminfo["period"])
-        csr = ET.SubElement(order_request_param, ns + "CSR")
-        csr.text = self.__item_params["csr"]
-
+        options = b""
+        if not ns and self.__item_params["altname"].split():
+            options = san_option_template().render()
+        renewal = b""
         if self.renew:
-            renewal_target_order_ID = ET.SubElement(
-                order_request_param, ns + "RenewalTargetOrderID"
+            renewal = element_template(ns + "RenewalTargetOrderID").render(
+                text=self.__item_params[SERVICE_ORDER_ID]
             )
-            renewal_target_order_ID.text = self.__item_params[SERVICE_ORDER_ID]
 
-        return order_request_param
+        return order_request_parameter_template(ns).render(
+            product_code=get_valid_product_type(type),
+            base_option=base_option_template(ns).render() if wildcard else b"",
+            order_kind="renewal" if self.renew else "new",
+            options=options,
+            months=str(self.__iteminfo["period"]),
+            csr=self.__item_params["csr"],
+            renewal=renewal,
+        )
 
     def validate_order_parametrs(self):
         logger.debug("Validate Order Parameters")
-        validate_order = ET.Element("SOAP-ENV:Envelope")
-        register_namespace(validate_order, "SOAP-ENV", SOAP_ENW)
-        register_namespace(validate_order, "ns1", GS_NAMESPACE)
-        body = ET.SubElement(validate_order, "SOAP-ENV:Body")
-        validate_order_parameters = ET.SubElement(body, "ns1:ValidateOrderParameters")
-        request = ET.SubElement(validate_order_parameters, "Request")
-        api = Api(self.processingmodule)
-        request.append(api.set_request_header())
-        request.append(self.set_order_request_parameter())
-
+        api = Api(self.processingmodule, self.__module_params)
         response = api.request(
             "GASService",
             {"Content-Type": "text/xml"},
-            ET.tostring(validate_order),
+            validate_order_template().render(
+                header=api.set_request_header(),
+                parameter=self.set_order_request_parameter(),
+            ),
             Api.RequestMethod.POST,
         )
         validate_response(response)
 
     def validate_order_parametrs_old(self, order: bool = False):
         logger.debug("Validate Order Parameters Old")
-        validate_order = ET.Element("SOAP-ENV:Envelope")
-        register_namespace(validate_order, "SOAP-ENV", SOAP_ENW)
-        register_namespace(
-            validate_order, "ns1", "http://stub.order.gasapiserver.esp.globalsign.com"
-        )
-        body = ET.SubElement(validate_order, "SOAP-ENV:Body")
-        validate_order_parameters = ET.SubElement(body, "ns1:GSValidateOrderParameters")
-        request = ET.SubElement(validate_order_parameters, "ns1:Request")
-        api = Api(self.processingmodule)
-        request.append(api.set_request_header(ns="ns1:"))
-        request.append(self.set_order_request_parameter(ns="ns1:"))
-
+        api = Api(self.processingmodule, self.__module_params)
         response = api.request(
             "GasOrder",
             {"SOAPaction": "ValidateOrderParameters"},
-            ET.tostring(validate_order),
+            gs_validate_order_template().render(
+                header=api.set_request_header(ns="ns1:"),
+                parameter=self.set_order_request_parameter(ns="ns1:"),
+            ),
             Api.RequestMethod.POST,
         )
         validate_response(response, GS_NAMESPACE)
 
-    def get_order_status(self):
+    def get_order_status(self) -> OrderStatusInfo:
         logger.debug("Get Order By Order ID")
-        order = ET.Element("SOAP-ENV:Envelope")
-        register_namespace(order, "SOAP-ENV", SOAP_ENW)
-        register_namespace(
-            order, "ns1", "http://stub.query.gasapiserver.esp.globalsign.com"
-        )
-        body = ET.SubElement(order, "SOAP-ENV:Body")
-        order_by_order_id = ET.SubElement(body, "ns1:GetOrderByOrderID")
-        request = ET.SubElement(order_by_order_id, "Request")
-        api = Api(self.processingmodule)
-        request.append(api.set_request_header("Query"))
-        order_id = ET.SubElement(request, "OrderID")
-        order_id.text = self.__item_params[SERVICE_ORDER_ID]
-
-        options = ET.SubElement(request, "OrderQueryOption")
-        status = ET.SubElement(options, "OrderStatus")
-        status.text = "1"
-        return_certificate_info = ET.SubElement(options, "ReturnCertificateInfo")
-        return_certificate_info.text = "true"
-        return_fullfillment = ET.SubElement(options, "ReturnFulfillment")
-        return_fullfillment.text = "true"
-
-        response = api.request(
+        api = Api(self.processingmodule, self.__module_params)
+        content = api.request_content(
             "GASService",
             {"Content-Type": "text/xml"},
-            ET.tostring(order),
+            order_status_template().render(
+                header=api.set_request_header("Query"),
+                order_id=self.__item_params[SERVICE_ORDER_ID],
+            ),
             Api.RequestMethod.POST,
         )
-        validate_response(response)
 
-        return response
+        return parse_order_status(content)
 
-    def validate_status(self):
-        response = self.get_order_status()
-        order_status = int(response.find(".//OrderStatus").text)
-        certificate_status = int(response.find(".//CertificateStatus").text)
+    def validate_status(self, status: OrderStatusInfo = None):
+        if status is None:
+            status = self.get_order_status()
+        order_status = status.order_status
+        certificate_status = status.certificate_status
 
         cancelled = order_status in {
             Status.CANCELLED_NOT_ISSUED,
@@ -579,23 +1083,21 @@ class GlobalSign:
             self.__item_params.pop(SERVICE_STATUS_ADDITION)
 
         if not cancelled and certificate_status == Status.INITIAL:
-            misc.set_service_status(self.iid, CertificateStatus.IS_ENROLLED)
+            if self.__service_status != CertificateStatus.IS_ENROLLED:
+                misc.set_service_status(self.iid, CertificateStatus.IS_ENROLLED)
             if (
                     order_status == Status.WAITING_FOR_PHISHING_CHECK
                     and self.__item_params.get(SERVICE_STATUS_ADDITION) != "check"
             ):
                 misc.save_param(self.iid, SERVICE_STATUS_ADDITION, "check")
         elif not cancelled and certificate_status == Status.ISSUED:
-            end_date = response.find(".//EndDate").text.split("T")[0]
+            end_date = status.end_date.split("T")[0]
 
             misc.set_service_expiredate(self.iid, end_date)
             misc.set_service_status(self.iid, CertificateStatus.IS_ISSUED)
 
-            xpath_crt = response.find(".//X509Cert")
-            crt = xpath_crt.text if xpath_crt != None else ""
-
-            xpath_pkcs7 = response.find(".//PKCS7Cert")
-            pkcs7 = xpath_pkcs7.text if xpath_pkcs7 != None else ""
+            crt = status.x509_cert or ""
+            pkcs7 = status.pkcs7_cert or ""
 
             rm = {"*": "_", ".": "_"}
 
@@ -604,52 +1106,16 @@ class GlobalSign:
                 files[
                     os.path.normpath(replace(self.__item_params["CN"], rm)) + ".p7b"
                     ] = pkcs7
-                certs = get_certificates(
-                    OpenSSL.crypto.load_pkcs7_data(OpenSSL.crypto.FILETYPE_PEM, pkcs7)
-                )
-                for cert in certs:
-                    subjects = get_subjects(cert)
-                    if "CN" in subjects:
-                        name = subjects["CN"]
-                    elif "O" in subjects:
-                        name = subjects["O"]
-                    else:
-                        name = bytes(random.randrange(0, 255) for i in range(8)).hex()
-                    files[
-                        os.path.normpath(replace(name, rm)) + ".crt"
-                        ] = OpenSSL.crypto.dump_certificate(
-                        OpenSSL.crypto.FILETYPE_PEM, cert
-                    ).decode()
+                for name, pem in iter_pkcs7_certificates(pkcs7):
+                    files[os.path.normpath(replace(name, rm)) + ".crt"] = pem
             if files:
-                zip_dir = tempfile.TemporaryDirectory(
-                    prefix="zip_", dir="/usr/local/mgr5/tmp"
-                )
-                archive_file_name = (
-                        os.path.normpath(replace(self.__item_params["CN"], rm)) + ".zip"
-                )
-                archive_name = os.path.normpath(
-                    os.path.join(zip_dir.name, archive_file_name)
+                misc.Mgrctl(
+                    "certificate.save",
+                    elid=self.iid,
+                    crt=crypto.base64encode(build_zip(files)),
+                    crt_type="zip",
+                    sok="ok",
                 )
-                cmd = ["zip", archive_file_name]
-                for file in files:
-                    my_file = open(
-                        os.path.normpath(os.path.join(zip_dir.name, file)), "w"
-                    )
-                    my_file.write(files[file])
-                    my_file.close()
-                    cmd.append(file)
-                process = subprocess.run(cmd, cwd=zip_dir.name)
-                if process.returncode == 0:
-                    my_file = open(archive_name, "rb")
-                    misc.Mgrctl(
-                        "certificate.save",
-                        elid=self.iid,
-                        crt=crypto.base64encode(my_file.read()),
-                        crt_type="zip",
-                        sok="ok",
-                    )
-                else:
-                    files.clear()
 
             if not files and crt:
                 misc.Mgrctl("certificate.save", elid=self.iid, crt=crt, sok="ok")
@@ -659,23 +1125,15 @@ class GlobalSign:
 
     def validate_csr(self):
         logger.debug("Validate CSR")
-        validate_csr = ET.Element("SOAP-ENV:Envelope")
-        register_namespace(validate_csr, "SOAP-ENV", SOAP_ENW)
-        register_namespace(validate_csr, "ns1", GS_NAMESPACE)
-        body = ET.SubElement(validate_csr, "SOAP-ENV:Body")
-        decode_csr = ET.SubElement(body, "DecodeCSR")
-        request = ET.SubElement(decode_csr, "Request")
-        api = Api(self.processingmodule)
-        request.append(api.set_request_header("Query"))
-        csr = ET.SubElement(request, "CSR")
-        csr.text = self.__item_params["csr"]
-        product_type = ET.SubElement(request, "ProductType")
-        product_type.text = get_valid_product_type(self.__iteminfo["pricelist_intname"])
-
+        api = Api(self.processingmodule, self.__module_params)
         api.request(
             "GASService",
             {"Content-Type": "text/xml"},
-            ET.tostring(validate_csr),
+            decode_csr_template().render(
+                header=api.set_request_header("Query"),
+                csr=self.__item_params["csr"],
+                product_type=get_valid_product_type(self.__iteminfo["pricelist_intname"]),
+            ),
             Api.RequestMethod.POST,
         )
 
@@ -693,7 +1151,7 @@ class GlobalSign:
                 not self.__item_params["approver_method"]
                 or self.__item_params["approver_method"] == "auth_email"
         )
-        api = Api(self.processingmodule)
+        api = Api(self.processingmodule, self.__module_params)
         order_type = ""
 
         if dv_cert:
@@ -707,53 +1165,47 @@ class GlobalSign:
         elif self.__iteminfo["pricelist_intname"].find("EV") != -1:
             order_type += "EVOrder"
 
-        order = ET.Element("SOAP-ENV:Envelope")
-        register_namespace(order, "SOAP-ENV", SOAP_ENW)
-        register_namespace(order, "ns1", GS_NAMESPACE)
-        body = ET.SubElement(order, "SOAP-ENV:Body")
-        order_type = ET.SubElement(body, order_type)
-        request = ET.SubElement(order_type, "Request")
-        request.append(api.set_request_header())
-        request.append(self.set_order_request_parameter())
-
+        details = []
         if dv_cert:
-            order_id_node = ET.SubElement(request, "OrderID")
-            order_id_node.text = api.order_id
+            details.append(element_template("OrderID").render(text=api.order_id))
             if approver_method_email:
                 approver = self.__item_params["approver_email"].split(",")
-                approver_email_node = ET.SubElement(request, "ApproverEmail")
-                approver_email_node.text = approver[0]
+                details.append(element_template("ApproverEmail").render(text=approver[0]))
 
         if self.__iteminfo["pricelist_intname"].find("OV") != -1:
-            request.append(self.set_org_info())
+            details.append(self.set_org_info())
         elif self.__iteminfo["pricelist_intname"].find("EV") != -1:
-            request.append(self.set_org_info_EV())
-            request.append(self.set_requestor_info())
-            request.append(self.set_approver_info())
+            details.append(self.set_org_info_EV())
+            details.append(self.set_requestor_info())
+            details.append(self.set_approver_info())
 
         if self.__iteminfo["pricelist_intname"].find("EV") != -1:
-            request.append(self.set_authorized_signer_info())
-            request.append(self.set_jurisdiction_info())
+            details.append(self.set_authorized_signer_info())
+            details.append(self.set_jurisdiction_info())
 
-        request.append(self.set_contact_info())
+        details.append(self.set_contact_info())
 
         if self.__iteminfo["pricelist_intname"].find("DV") != -1:
-            request.append(self.set_second_contact_info())
+            details.append(self.set_second_contact_info())
 
-        san_entries = ET.SubElement(request, "SANEntries")
+        san_entries = []
         if self.__item_params["altname"]:
             san = self.__item_params["altname"].split(" ")
             for s in san:
-                san_entry = ET.SubElement(san_entries, "SANEntry")
-                option_type = ET.SubElement(san_entry, "SANOptionType")
-                option_type.text = get_SAN_option_type(self.__item_params["CN"], s)
-                subject_altname = ET.SubElement(san_entry, "SubjectAltName")
-                subject_altname.text = s
+                san_entries.append(san_entry_template().render(
+                    option_type=get_SAN_option_type(self.__item_params["CN"], s),
+                    alt_name=s,
+                ))
 
         response = api.request(
             "ServerSSLService",
             {"Content-Type": "text/xml"},
-            ET.tostring(order),
+            order_template(order_type).render(
+                header=api.set_request_header(),
+                parameter=self.set_order_request_parameter(),
+                details=b"".join(details),
+                san_entries=b"".join(san_entries),
+            ),
             Api.RequestMethod.POST,
         )
         validate_response(response)
@@ -785,19 +1237,23 @@ class GlobalSign:
         except Exception as err:
             logger.warning("%s", err)
 
-    def close_cert(self):
-        response = self.get_order_status()
-        order_date_str = response.find(".//OrderDate").text.split("T")[0]
+    def close_cert(self) -> bool:
+        """
+        Cancels order which is still in autodelete period, returns True if it was cancelled
+
+        """
+        status = self.get_order_status()
+        order_date_str = status.order_date.split("T")[0]
         order_date = datetime.datetime.strptime(order_date_str, "%Y-%m-%d").date()
-        start_date_str = response.find(".//StartDate").text
+        start_date_str = status.start_date
         if start_date_str:
             start_date = datetime.datetime.strptime(
                 start_date_str.split("T")[0], "%Y-%m-%d"
             ).date()
         else:
             start_date = datetime.date.today()
-        order_status = int(response.find(".//OrderStatus").text)
-        certificate_status = int(response.find(".//CertificateStatus").text)
+        order_status = status.order_status
+        certificate_status = status.certificate_status
         cancelled = order_status in {
             Status.CANCELLED_NOT_ISSUED,
             Status.CANCELLED_ISSUED,
@@ -827,52 +1283,39 @@ class GlobalSign:
                         >= datetime.date.today()
                 )
         ):
-            modify_order = ET.Element("SOAP-ENV:Envelope")
-            register_namespace(modify_order, "SOAP-ENV", SOAP_ENW)
-            register_namespace(
-                modify_order, "ns1", "http://stub.order.gasapiserver.esp.globalsign.com"
-            )
-            body = ET.SubElement(modify_order, "SOAP-ENV:Body")
-            order = ET.SubElement(body, "ns1:ModifyOrder")
-            request = ET.SubElement(order, "Request")
-            api = Api(self.processingmodule)
-            request.append(api.set_request_header())
-
-            order_id = ET.SubElement(request, "OrderID")
-            order_id.text = self.__item_params[SERVICE_ORDER_ID]
-            order_operation = ET.SubElement(request, "ModifyOrderOperation")
-            order_operation.text = "CANCEL"
-
+            api = Api(self.processingmodule, self.__module_params)
             response = api.request(
                 "ServerSSLService",
                 {"Content-Type": "text/xml"},
-                ET.tostring(modify_order),
+                modify_order_template().render(
+                    header=api.set_request_header(),
+                    order_id=self.__item_params[SERVICE_ORDER_ID],
+                ),
                 Api.RequestMethod.POST,
             )
             validate_response(response)
+            return True
 
-    def reopen(self):
-        reopen_order = ET.Element("SOAP-ENV:Envelope")
-        register_namespace(reopen_order, "SOAP-ENV", SOAP_ENW)
-        register_namespace(reopen_order, "ns1", GS_NAMESPACE)
-        body = ET.SubElement(reopen_order, "SOAP-ENV:Body")
-        reissue = ET.SubElement(body, "ReIssue")
-        request = ET.SubElement(reissue, "Request")
-        api = Api(self.processingmodule)
-        request.append(api.set_request_header())
-
-        order_parameter = ET.SubElement(request, "OrderParameter")
-        csr = ET.SubElement(order_parameter, "CSR")
-        csr.text = self.__item_params["csr"]
-        ET.SubElement(order_parameter, "DNSNames")
-        order_id = ET.SubElement(request, "TargetOrderID")
-        order_id.text = self.__item_params[SERVICE_ORDER_ID]
-        ET.SubElement(request, "HashAlgorithm")
+        return False
+
+    def mark_closed(self):
+        """
+        Remembers that the order was cancelled or is out of autodelete period,
+        so close_all does not request it again
+
+        """
+        misc.save_param(self.iid, SERVICE_CLOSED_ORDER_ID, self.__item_params[SERVICE_ORDER_ID])
 
+    def reopen(self):
+        api = Api(self.processingmodule, self.__module_params)
         response = api.request(
             "GASService",
             {"Content-Type": "text/xml"},
-            ET.tostring(reopen_order),
+            reissue_template().render(
+                header=api.set_request_header(),
+                csr=self.__item_params["csr"],
+                order_id=self.__item_params[SERVICE_ORDER_ID],
+            ),
             Api.RequestMethod.POST,
         )
         misc.postreopen(self.iid)
@@ -884,24 +1327,15 @@ class GlobalSign:
         )
 
     def validate_domain_by_DNS(self, domain: str):
-        req = ET.Element("SOAP-ENV:Envelope")
-        register_namespace(req, "SOAP-ENV", SOAP_ENW)
-        register_namespace(req, "ns2", "https://system.globalsign.com/bb/ws/")
-        body = ET.SubElement(req, "SOAP-ENV:Body")
-        dvdns_verify = ET.SubElement(body, "ns2:DVDNSVerificationForIssue")
-        request = ET.SubElement(dvdns_verify, "Request")
-        api = Api(self.processingmodule)
-        request.append(api.set_request_header())
-
-        order_id = ET.SubElement(request, "OrderID")
-        order_id.text = self.__item_params[SERVICE_ORDER_ID]
-        approver = ET.SubElement(request, "ApproverFQDN")
-        approver.text = domain
-
+        api = Api(self.processingmodule, self.__module_params)
         response = api.request(
             "ServerSSLService",
             {"Content-Type": "text/xml"},
-            ET.tostring(req),
+            dvdns_verification_template().render(
+                header=api.set_request_header(),
+                order_id=self.__item_params[SERVICE_ORDER_ID],
+                domain=domain,
+            ),
             Api.RequestMethod.POST,
         )
         validate_response(response)
@@ -921,25 +1355,16 @@ class GlobalSign:
             logger.warning("No action, approver method is not 'auth_email'")
             return
 
-        req = ET.Element("SOAP-ENV:Envelope")
-        register_namespace(req, "SOAP-ENV", SOAP_ENW)
-        body = ET.SubElement(req, "SOAP-ENV:Body")
-        approver = ET.SubElement(body, "ChangeApproverEmail")
-        request = ET.SubElement(approver, "Request")
-        api = Api(self.processingmodule)
-        request.append(api.set_request_header())
-
-        order_id = ET.SubElement(request, "OrderID")
-        order_id.text = self.__item_params[SERVICE_ORDER_ID]
-        approver = ET.SubElement(request, "ApproverEmail")
-        approver.text = emails[0].strip()
-        fqdn = ET.SubElement(request, "FQDN")
-        fqdn.text = self.__item_params["CN"]
-
+        api = Api(self.processingmodule, self.__module_params)
         response = api.request(
             "ServerSSLService",
             {"Content-Type": "text/xml"},
-            ET.tostring(req),
+            change_approver_email_template().render(
+                header=api.set_request_header(),
+                order_id=self.__item_params[SERVICE_ORDER_ID],
+                email=emails[0].strip(),
+                fqdn=self.__item_params["CN"],
+            ),
             Api.RequestMethod.POST,
         )
         validate_response(response)
@@ -1083,13 +1508,6 @@ def check_connection(xml):
     logger.debug("Check connection")
     params = xml.find("processingmodule")
 
-    envelope = ET.Element("SOAP-ENV:Envelope")
-    register_namespace(envelope, "SOAP-ENV", SOAP_ENW)
-    register_namespace(envelope, "ns1", GS_NAMESPACE)
-    body = ET.SubElement(envelope, "SOAP-ENV:Body")
-    ns1 = ET.SubElement(body, "ns1:AccountSnapshot")
-    request = ET.SubElement(ns1, "Request")
-
     param_dict = {
         "usedemo": params.find("usedemo").text,
         "username": params.find("username").text,
@@ -1103,14 +1521,14 @@ def check_connection(xml):
         params.find("id").text,
         param_dict,
     )
-    request.append(api.set_request_header("Query"))
+    envelope = account_snapshot_template().render(header=api.set_request_header("Query"))
 
-    logger.debug("Check connection: %s", ET.tostring(envelope))
+    logger.debug("Check connection: %s", envelope)
 
     response = api.request(
         "AccountService",
         {"Content-Type": "text/xml"},
-        ET.tostring(envelope),
+        envelope,
         Api.RequestMethod.POST,
     )
     error_code = response.find(".//ErrorCode")
@@ -1143,6 +1561,7 @@ def suspend(item):
 def close_item(item):
     gs = GlobalSign(item)
     gs.close_cert()
+    gs.mark_closed()
     misc.postclose(item)
 
 
@@ -1151,6 +1570,166 @@ def sync_item(item):
     gs.validate_status()
 
 
+def status_name(order_status: int) -> str:
+    try:
+        return Status(order_status).name
+    except ValueError:
+        return str(order_status)
+
+
+def pending_sync_items(module: int) -> List[int]:
+    return [
+        int(record["id"])
+        for record in db.db_query(
+            "SELECT i.id "
+            "FROM item i "
+            "JOIN itemparam oid ON oid.item = i.id AND oid.intname = %s "
+            "JOIN itemparam ss ON ss.item = i.id AND ss.intname = %s "
+            "WHERE i.processingmodule = %s AND i.status <> %s "
+            "AND ss.value IN (%s, %s) AND oid.value <> '' "
+            "ORDER BY i.id",
+            SERVICE_ORDER_ID,
+            SERVICE_STATUS,
+            module,
+            ITEM_STATUS_DELETED,
+            int(CertificateStatus.IS_REQUESTED),
+            int(CertificateStatus.IS_ENROLLED),
+        )
+    ]
+
+
+def load_globalsign_items(items, buckets: collections.Counter) -> List["GlobalSign"]:
+    """
+    Builds GlobalSign objects of the items with load_item_contexts.
+    Items which can not be loaded are logged and counted as failed.
+
+    """
+    contexts = load_item_contexts(items)
+    result = []
+    for iid in items:
+        iid = int(iid)
+        context = contexts.get(iid)
+        if context is None:
+            logger.warning("Item %d: not found", iid)
+            buckets["failed"] += 1
+            continue
+        try:
+            result.append(GlobalSign.from_context(iid, context))
+        except Exception as err:
+            logger.warning("Item %d: %s", iid, err)
+            buckets["failed"] += 1
+    return result
+
+
+def completed_calls(executor, call, items, workers: int) -> Iterator[Tuple[object, concurrent.futures.Future]]:
+    """
+    Runs call(item) on the executor with at most `workers` calls in flight,
+    yields (item, future) in completion order
+
+    """
+    pending = iter(items)
+    futures = {executor.submit(call, item): item for item in itertools.islice(pending, workers)}
+    while futures:
+        done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            item = futures.pop(future)
+            for next_item in itertools.islice(pending, 1):
+                futures[executor.submit(call, next_item)] = next_item
+            yield item, future
+
+
+def sync_all(module: int, workers: int = SYNC_ALL_WORKERS):
+    """
+    Syncs every requested or enrolled certificate of the module in one process.
+    Order statuses are fetched concurrently, results are applied in the main thread.
+
+    """
+    buckets = collections.Counter()
+    items = load_globalsign_items(pending_sync_items(module), buckets)
+    logger.info("Pending certificates of module %d: %d", module, len(items))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for gs, future in completed_calls(executor, GlobalSign.get_order_status, items, workers):
+            try:
+                status = future.result()
+                gs.validate_status(status)
+                buckets[status_name(status.order_status)] += 1
+            except Exception as err:
+                logger.warning("Item %d: %s", gs.iid, err)
+                buckets["failed"] += 1
+
+    logger.info("Sync of module %d finished: %s", module, dict(buckets))
+    doc = ET.Element("doc")
+    for name, count in sorted(buckets.items()):
+        bucket = ET.SubElement(doc, "status")
+        bucket.set("name", name)
+        bucket.set("count", str(count))
+    ET.dump(doc)
+
+
+def pending_close_items(module: int) -> List[int]:
+    """
+    Returns deleted items of the module with an order which close has not been processed for yet
+
+    """
+    return [
+        int(record["id"])
+        for record in db.db_query(
+            "SELECT i.id "
+            "FROM item i "
+            "JOIN itemparam oid ON oid.item = i.id AND oid.intname = %s "
+            "LEFT JOIN itemparam done ON done.item = i.id AND done.intname = %s "
+            "WHERE i.processingmodule = %s AND i.status = %s AND oid.value <> '' "
+            "AND (done.value IS NULL OR done.value <> oid.value) "
+            "ORDER BY i.id",
+            SERVICE_ORDER_ID,
+            SERVICE_CLOSED_ORDER_ID,
+            module,
+            ITEM_STATUS_DELETED,
+        )
+    ]
+
+
+def close_all(module: int = None, items: List[int] = None, workers: int = SYNC_ALL_WORKERS):
+    """
+    Cancels orders of the items which are still in autodelete period, like close does for one item.
+    Without items every deleted service of the module with an order not processed before is taken.
+    Cancelled and kept orders are marked, failed ones are retried on the next run.
+    Status and cancel requests run concurrently, BILLmanager services are not touched.
+
+    """
+    if not items:
+        if module is None:
+            raise exc.XmlException("missing", "", "module")
+        items = pending_close_items(module)
+
+    buckets = collections.Counter()
+    gs_items = load_globalsign_items(items, buckets)
+    logger.info("Orders to close: %d", len(gs_items))
+
+    doc = ET.Element("doc")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for gs, future in completed_calls(executor, GlobalSign.close_cert, gs_items, workers):
+            order = ET.SubElement(doc, "order")
+            order.set("item", str(gs.iid))
+            try:
+                result = "cancelled" if future.result() else "kept"
+                gs.mark_closed()
+            except Exception as err:
+                logger.warning("Item %d: %s", gs.iid, err)
+                result = "failed"
+                order.set("error", str(err))
+            order.set("result", result)
+            buckets[result] += 1
+
+    logger.info("Close finished: %s", dict(buckets))
+    for name in ("cancelled", "kept", "failed"):
+        bucket = ET.SubElement(doc, "result")
+        bucket.set("name", name)
+        bucket.set("count", str(buckets[name]))
+    ET.dump(doc)
+
+
 def reopen(item):
     gs = GlobalSign(item)
     gs.reopen()
@@ -1160,11 +1739,27 @@ def approver(module, domain: str):
     domains = domain.split(",")
     approver = ET.Element("doc")
     api = Api(module)
+
+    approver_lists = {}
+    missed = []
+    for dom in domains:
+        cached = load_approver_list(module, dom)
+        if cached is None:
+            missed.append(dom)
+        else:
+            approver_lists[dom] = cached
+
+    if missed:
+        logger.debug("Approver lists to request: %s", missed)
+        workers = min(APPROVER_WORKERS, len(missed))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            for dom, approver_list in zip(missed, executor.map(api.get_DV_approverlist, missed)):
+                approver_lists[dom] = approver_list
+
     for dom in domains:
         dom_node = ET.SubElement(approver, "domain")
         dom_node.set("name", dom)
-        approver_list = api.get_DV_approverlist(dom)
-        for email in approver_list:
+        for email in approver_lists[dom]:
             approver_node = ET.SubElement(dom_node, "approver")
             approver_node.text = email
 
@@ -1224,6 +1819,9 @@ def get_args():
         "--domain", type=str, help="domain name for ssl certificate", dest="domain"
     )
     parser.add_argument("--emails", type=str, help="emails for approve", dest="emails")
+    parser.add_argument(
+        "--items", type=str, help="comma separated items for bulk commands", dest="items"
+    )
     args, _ = parser.parse_known_args()
     logger.info("Args: %s", args)
 
@@ -1254,14 +1852,21 @@ def process_command():
         elif args.command == "close":
             close_item(args.item)
 
+        elif args.command == "close_all":
+            items = [int(item) for item in args.items.split(",")] if args.items else None
+            close_all(args.module, items)
+
         elif args.command == "sync_item":
             sync_item(args.item)
 
+        elif args.command == "sync_all":
+            sync_all(args.module)
+
         elif args.command == "reopen":
             reopen(args.item)
 
         elif args.command == "approver":
-            approver(args.module, args.domain)
+            ET.dump(approver(args.module, args.domain))
 
         elif args.command == "send_dv_dns":
             send_dv_dns(args.item, args.domain)
@@ -2,11 +2,16 @@
     Модуль реализует функцию add_ip .
     https://www.ispsystem.ru/docs/bc/razrabotchiku/sozdanie-modulej/sozdanie-modulej-obrabotki#id-Созданиемодулейобработки-addip
 '''
+from pydactyl.exceptions import PterodactylApiError
+
 import billmgr.db as db
 import billmgr.misc as misc
 
 from utils.misc import order_params
 from utils.misc import pter_api_key
+from utils.misc import take_free_allocation
+from utils.misc import release_allocation
+from utils.misc import drop_allocation_index
 from utils.logger import logger
 import utils.consts as Params
 
@@ -31,25 +36,9 @@ def syncronous_add_ip(item, ip_id):
     ip = allocs[-1]['attributes']['ip']
     port = allocs[-1]['attributes']['port']
     address = f'{ip}:{port}' 
-    if db.db_query(f'SELECT * FROM ip WHERE name = %s', address):
-        allocations = pterapi.nodes.list_node_allocations(node_id=server['node'])
-        new_address = None
-        alloc_id = None
-        
-        for page in allocations:
-            for alloc in page:
-                if not alloc['attributes']['assigned']:
-                    new_address = f"{alloc['attributes']['ip']}:{alloc['attributes']['port']}"
-                    logger.extinfo(f"new_address: {new_address}")
-                    alloc_id = alloc['attributes']['id']
-                    break
-            if new_address:
-                if not db.db_query(f'SELECT * FROM ip WHERE name = %s', new_address):
-                    break
-        if not new_address:
-            raise Exception('Not enough allocations')
-        logger.debug(f"order params: {order_params(item)}")
-        allocations_limit = int(order_params(item)['ip'])
+    alloc_id = None
+
+    def update_build(allocations_limit, **allocations):
         pterapi.servers.update_server_build(server_id=server['id'],
                                             allocation_id=server['allocation'],
                                             memory_limit=limits['memory'],
@@ -60,7 +49,37 @@ def syncronous_add_ip(item, ip_id):
                                             database_limit=limits2['databases'],
                                             allocation_limit=allocations_limit,
                                             backup_limit=limits2['backups'],
-                                            add_allocations=[alloc_id])
+                                            **allocations)
+
+    if db.db_query(f'SELECT * FROM ip WHERE name = %s', address):
+        order_param = order_params(item)
+        logger.debug(f"order params: {order_param}")
+        allocations_limit = int(order_param['ip'])
+        new_address, alloc_id = take_free_allocation(item, server['node'])
+        if not new_address:
+            raise Exception('Not enough allocations')
+        logger.extinfo(f"new_address: {new_address}")
+        try:
+            update_build(allocations_limit, add_allocations=[alloc_id])
+        except PterodactylApiError as err:
+            if not any(error in str(err.args) for error in Params.ALLOCATION_TAKEN_ERRORS):
+                release_allocation(item, server['node'], new_address)
+                raise
+            # allocation назначили в панели после построения индекса, строим индекс заново
+            logger.warning(f"allocation {new_address} is not available: {err}")
+            drop_allocation_index(item, server['node'])
+            new_address, alloc_id = take_free_allocation(item, server['node'])
+            if not new_address:
+                raise Exception('Not enough allocations')
+            try:
+                update_build(allocations_limit, add_allocations=[alloc_id])
+            except Exception:
+                release_allocation(item, server['node'], new_address)
+                raise
+        except Exception:
+            # Ошибка не связана с самим allocation, возвращаем его в свободные и сохраняем индекс
+            release_allocation(item, server['node'], new_address)
+            raise
         logger.info("server updated")
         address = new_address
     logger.info(ip)    
@@ -68,16 +87,8 @@ def syncronous_add_ip(item, ip_id):
     try:
         misc.commit_ip(ip_id=misc.save_ip(ip_id=elid, ip=address, domain=''))
     except Exception as ex:
-        pterapi.servers.update_server_build(server_id=server['id'],
-                                    allocation_id=server['allocation'],
-                                    memory_limit=limits['memory'],
-                                    swap_limit=limits['swap'],
-                                    disk_limit=limits['disk'],
-                                    cpu_limit=limits['cpu'],
-                                    io_limit=limits['io'],
-                                    database_limit=limits2['databases'],
-                                    allocation_limit=allocations_limit,
-                                    backup_limit=limits2['backups'],
-                                    remove_allocations=[alloc_id])
+        if alloc_id is not None:
+            update_build(allocations_limit, remove_allocations=[alloc_id])
+            release_allocation(item, server['node'], address)
         logger.info(f"ip: {address}")
         raise ex
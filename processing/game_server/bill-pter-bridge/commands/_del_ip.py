@@ -10,6 +10,7 @@ import billmgr.misc as misc
 from utils.misc import order_params
 from utils.misc import pter_api_key
 from utils.misc import get_allocation_id
+from utils.misc import release_allocation
 from utils.logger import logger
 
 
@@ -27,7 +28,7 @@ def del_ip(item, ip_id):
     logger.debug(f'server_id: {server_id}')
     limits = server['limits']
     limits2 = server['feature_limits']
-    alloc_id = get_allocation_id(item, old_ip, old_port)
+    alloc_id = get_allocation_id(item, old_ip, old_port, server)
     allocations_limit = order_params(item)['ip']
     try:
         pterapi.servers.update_server_build(server_id=server['id'],
@@ -42,6 +43,7 @@ def del_ip(item, ip_id):
                                             backup_limit=limits2['backups'],
                                             remove_allocations=[int(alloc_id)])
         misc.del_ip(ip_id=ip_id)
+        release_allocation(item, server['node'], old_address)
     except PterodactylApiError as err:
         if "You are attempting to delete the default allocation" in str(err.args):
             for i in server['relationships']['allocations']['data']:
@@ -3,7 +3,6 @@
     https://www.ispsystem.ru/docs/bc/razrabotchiku/sozdanie-modulej/sozdanie-modulej-obrabotki#id-Созданиемодулейобработки-open
 '''
 import billmgr.misc as misc
-import time
 import secrets
 import string
 
@@ -16,7 +15,9 @@ from utils.misc import get_pteruser_by_item
 from utils.misc import check_pteruser_exists
 from utils.misc import get_base_pter_domain
 from utils.misc import get_account_id
-from utils.misc import control_server_state
+from utils.misc import start_server_when_installed
+from utils.misc import get_item_processingmodule
+from utils.misc import get_module_params
 
 def open_comm(item: int) -> None:
     '''
@@ -71,15 +72,10 @@ def open_comm(item: int) -> None:
     if ips:
         misc.commit_ip(ip_id=misc.save_ip(ip_id=ips[0]["id"], ip=f"{ip}:{port}", domain=''))
 
-    #4.Ожидание старта сервера
-    for i in range(Params.START_RETRY_COUNT):
-        try:
-            logger.info(f"Trying start server {item} ... {i}")
-            control_server_state(item, 'start')
-            break
-        except Exception as e:
-            logger.warning(f"Can't start server {e}. Restart")
-        time.sleep(Params.TIME_WAIT_BETWEEN_START_TRY)
+    #4.Ожидание установки и старт сервера, при start_after_postopen=on сервер запускается после postopen
+    start_after_postopen = get_module_params(get_item_processingmodule(item)).get('start_after_postopen') == 'on'
+    if not start_after_postopen:
+        start_server(item, server_info['uuid'])
 
     #5.postopen
     try:    
@@ -87,3 +83,13 @@ def open_comm(item: int) -> None:
     except:
         misc.postopen(item)
 
+    if start_after_postopen:
+        start_server(item, server_info['uuid'])
+
+
+def start_server(item, server_id):
+    try:
+        logger.info(f"Starting server {item}")
+        start_server_when_installed(item, server_id)
+    except Exception as e:
+        logger.warning(f"Can't start server {item}: {e}")
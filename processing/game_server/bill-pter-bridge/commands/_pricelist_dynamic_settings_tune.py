@@ -1,17 +1,12 @@
 import xml.etree.ElementTree as ET
-from pydactyl import PterodactylClient
-
 import billmgr.session as session
-import billmgr.misc as misc
 
 from utils.logger import logger
+from utils.misc import pter_client
 
 def pricelist_dynamic_settings_tune(module, itemtype):
     xml = session.get_input_xml()
-    proccesingparam = misc.get_module_params(module)
-    api_key = proccesingparam['api_key']
-    base_url = proccesingparam['base_url']
-    pterapi = PterodactylClient(base_url, api_key)
+    pterapi = pter_client(module)
     pages = pterapi.nests.list_nests(includes={'eggs'})
     nests = []
     eggs = []
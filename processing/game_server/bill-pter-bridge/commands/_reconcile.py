@@ -0,0 +1,133 @@
+'''
+    Модуль реализует функцию reconcile .
+    Сверяет серверы pterodactyl с активными услугами обработчика и исправляет расхождения в ограничениях
+'''
+import concurrent.futures
+import xml.etree.ElementTree as ET
+
+import billmgr.db as db
+
+from utils.logger import logger
+import utils.consts as Params
+from utils.misc import pter_client
+from utils.misc import server_build_drift
+from utils.misc import server_build_limits
+
+# Услуги в статусах "активна" и "остановлена", у них должен быть сервер в панели
+ITEM_STATUSES = (2, 3)
+
+# Дополнения услуги, из которых server_build_limits строит ограничения сервера
+LIMIT_ADDONS = (
+    Params.RAM_LIMIT, Params.SWAP_LIMIT, Params.CPU_LIMIT, *Params.DISK_MEMORY_LIMIT,
+    Params.IO_LIMIT, Params.BACKUP_LIMIT, Params.ALLOCATION_LIMIT, Params.DB_LIMIT,
+)
+
+
+def list_panel_servers(pterapi):
+    '''
+        Функция за один проход по страницам servers.list_servers возвращает словарь external_id -> сервер
+        и список серверов без external_id
+    '''
+    servers = {}
+    unbound = []
+    for page in pterapi.servers.list_servers():
+        for server in page:
+            attributes = server['attributes']
+            if attributes.get('external_id'):
+                servers[str(attributes['external_id'])] = attributes
+            else:
+                unbound.append(attributes)
+    return servers, unbound
+
+
+def active_items(module):
+    '''
+        Функция одним запросом возвращает словарь id услуги -> значения дополнений из LIMIT_ADDONS.
+        Параметры заказа по каждой услуге не загружаются, поэтому сверка не обращается к панели за egg
+        и ничего не сохраняет в услугах
+    '''
+    itemtypes = ', '.join(['%s'] * len(Params.ITEMTYPE))
+    statuses = ', '.join(['%s'] * len(ITEM_STATUSES))
+    addons = ', '.join(['%s'] * len(LIMIT_ADDONS))
+    items = {}
+    for row in db.db_query(
+            'SELECT i.id, a.addon, a.value FROM item i '
+            'JOIN pricelist p ON p.id = i.pricelist '
+            'JOIN itemtype it ON it.id = p.itemtype '
+            'LEFT JOIN (SELECT ai.parent, ait.intname AS addon, ai.intvalue AS value FROM item ai '
+            'JOIN pricelist ap ON ap.id = ai.pricelist '
+            'JOIN itemtype ait ON ait.id = ap.itemtype '
+            f'WHERE ait.intname IN ({addons})) a ON a.parent = i.id '
+            f'WHERE i.processingmodule = %s AND i.status IN ({statuses}) AND it.intname IN ({itemtypes}) '
+            'ORDER BY i.id',
+            *LIMIT_ADDONS, module, *ITEM_STATUSES, *Params.ITEMTYPE):
+        addon_values = items.setdefault(str(row['id']), {})
+        if row['addon'] is not None and row['value'] is not None:
+            addon_values[row['addon']] = row['value']
+    return items
+
+
+def reconcile(module):
+    '''
+        Точка входа для импорта, именуется так же как модуль
+    '''
+    logger.info("reconcile command started")
+    pterapi = pter_client(module)
+    servers, unbound = list_panel_servers(pterapi)
+    items = active_items(module)
+    logger.info(f"panel servers: {len(servers) + len(unbound)}, active items: {len(items)}")
+
+    xml_out = ET.Element('doc')
+    summary = {'missing': 0, 'orphaned': 0, 'drifted': 0, 'updated': 0, 'failed': 0}
+
+    updates = {}
+    for item, addon_values in items.items():
+        server = servers.pop(item, None)
+        if server is None:
+            ET.SubElement(xml_out, 'missing', item=item)
+            summary['missing'] += 1
+            continue
+        try:
+            limits = server_build_limits(addon_values)
+        except Exception as ex:
+            logger.warning(f"item {item}: {ex}")
+            ET.SubElement(xml_out, 'failed', item=item, server=str(server['id']), error=str(ex))
+            summary['failed'] += 1
+            continue
+        drift = server_build_drift(server, limits)
+        if drift:
+            updates[item] = (server, limits, drift)
+
+    for server in list(servers.values()) + unbound:
+        ET.SubElement(xml_out, 'orphaned', server=str(server['id']),
+                      external_id=str(server.get('external_id') or ''), name=str(server.get('name', '')))
+        summary['orphaned'] += 1
+
+    def update_build(server, limits):
+        pterapi.servers.update_server_build(server_id=server['id'],
+                                            allocation_id=server['allocation'],
+                                            **limits)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=Params.RECONCILE_WORKERS) as executor:
+        futures = {
+            executor.submit(update_build, server, limits): item
+            for item, (server, limits, drift) in updates.items()
+        }
+        for future in concurrent.futures.as_completed(futures):
+            item = futures[future]
+            server, limits, drift = updates[item]
+            node = ET.SubElement(xml_out, 'drifted', item=item, server=str(server['id']), fields=','.join(drift))
+            summary['drifted'] += 1
+            try:
+                future.result()
+                node.set('result', 'updated')
+                summary['updated'] += 1
+            except Exception as ex:
+                logger.warning(f"item {item}: {ex}")
+                node.set('result', 'failed')
+                node.set('error', str(ex))
+                summary['failed'] += 1
+
+    logger.info(f"reconcile finished: {summary}")
+    ET.SubElement(xml_out, 'summary', **{name: str(count) for name, count in summary.items()})
+    ET.dump(xml_out)
@@ -5,16 +5,13 @@ import billmgr.misc as misc
 
 from utils.logger import logger
 import utils.consts as Params
-from pydactyl import PterodactylClient
+from utils.misc import pter_client
 
 def sync_server(module):
     '''
         Точка входа для импорта, именуется так же как модуль
     '''
-    proccesingparam = misc.get_module_params(module)
-    api_key = proccesingparam['api_key']
-    base_url = proccesingparam['base_url']
-    pterapi = PterodactylClient(base_url, api_key)
+    pterapi = pter_client(module)
     pages = pterapi.nests.list_nests(includes={'eggs'})
     param_values = {}
     for page in pages:
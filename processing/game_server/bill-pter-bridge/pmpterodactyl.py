@@ -22,6 +22,7 @@ class ExFeature(Enum):
     CHECK_PARAM = 'check_param'
     CHECK_ADDON = 'check_addon'
     REBOOT = 'reboot'
+    RECONCILE = 'reconcile'
 
 
 class PydactylModule(ProcessingModule):
@@ -60,6 +61,7 @@ class PydactylModule(ProcessingModule):
 
 
         self._add_feature(ExFeature.DATACENTER)
+        self._add_callable_feature(ExFeature.RECONCILE, cmd.import_func('reconcile'))
         #self._add_callable_feature(ExFeature.SYNC_SERVER, cmd.import_func('sync_server'))
 
     def get_module_param(self) -> Dict[str, Dict[str, str]]:
@@ -24,5 +24,14 @@ DISK_MEMORY_LIMIT_DEFAULT=0
 ALLOCATION_LIMIT_DEFAULT=0
 DB_LIMIT_DEFAULT=0
 BACKUP_LIMIT_DEFAULT=0
-START_RETRY_COUNT=10
-TIME_WAIT_BETWEEN_START_TRY=1.5 #in seconds
\ No newline at end of file
+START_WAIT_TIMEOUT=120 #in seconds, параметр обработчика start_wait_timeout
+START_WAIT_INITIAL_DELAY=1 #in seconds
+START_WAIT_MAX_DELAY=15 #in seconds
+EGG_CACHE_DIR='tmp/.tmp/pter_eggs'
+EGG_CACHE_TTL=3600 #in seconds
+ALLOCATION_CACHE_DIR='tmp/.tmp/pter_allocations'
+ALLOCATION_CACHE_TTL=60 #in seconds
+# Фрагменты ошибок панели о том, что allocation уже назначен другому серверу
+ALLOCATION_TAKEN_ERRORS=('already assigned', 'currently assigned', 'add_allocations')
+USED_IPS_QUERY_CHUNK=500
+RECONCILE_WORKERS=8
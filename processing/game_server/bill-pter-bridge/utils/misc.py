@@ -4,15 +4,21 @@ import billmgr.misc as misc
 import billmgr.crypto as crypto
 
 from pydactyl import PterodactylClient
+from pydactyl.api_client import http_adapter
 from pydactyl.exceptions import PterodactylApiError
+import requests
 from requests.exceptions import HTTPError
 from urllib.parse import urlparse
 
 from utils.logger import logger
 import utils.consts as Params
+import copy
+import json
+import os
 import secrets
 import string
 import random
+import time
 
 def is_server_exist(item):
     '''
@@ -26,25 +32,61 @@ def is_server_exist(item):
         return False
 
 
+# Параметр update_server_build -> поле сервера в ответе панели
+SERVER_BUILD_FIELDS = {
+    'memory_limit': ('limits', 'memory'),
+    'swap_limit': ('limits', 'swap'),
+    'cpu_limit': ('limits', 'cpu'),
+    'disk_limit': ('limits', 'disk'),
+    'io_limit': ('limits', 'io'),
+    'database_limit': ('feature_limits', 'databases'),
+    'allocation_limit': ('feature_limits', 'allocations'),
+    'backup_limit': ('feature_limits', 'backups'),
+}
+
+def to_int(value):
+    '''
+        Значения содержаний приходят из биллинга строками, в том числе вида "1024.00"
+    '''
+    return int(float(value))
+
+def server_build_limits(order_param):
+    '''
+        Функция возвращает ограничения сервера для update_server_build по параметрам заказа
+    '''
+    return {
+        'memory_limit': to_int(order_param.get(Params.RAM_LIMIT, Params.RAM_LIMIT_DEFAULT)),
+        'swap_limit': to_int(order_param.get(Params.SWAP_LIMIT, Params.SWAP_LIMIT_DEFAULT)),
+        'cpu_limit': to_int(order_param.get(Params.CPU_LIMIT, Params.CPU_LIMIT_DEFAULT))*100,
+        'disk_limit': to_int(get_param_from_muliple_keys(order_param,Params.DISK_MEMORY_LIMIT,Params.DISK_MEMORY_LIMIT_DEFAULT)),
+        'io_limit': to_int(order_param.get(Params.IO_LIMIT, Params.IO_LIMIT_DEFAULT)),
+        'backup_limit': to_int(order_param.get(Params.BACKUP_LIMIT, Params.BACKUP_LIMIT_DEFAULT)),
+        'allocation_limit': to_int(order_param.get(Params.ALLOCATION_LIMIT, Params.ALLOCATION_LIMIT_DEFAULT)),
+        'database_limit': to_int(order_param.get(Params.DB_LIMIT, Params.DB_LIMIT_DEFAULT)),
+    }
+
+def server_build_drift(server_info, limits):
+    '''
+        Функция возвращает параметры update_server_build, значения которых на сервере отличаются от limits
+    '''
+    drift = []
+    for param, (group, field) in SERVER_BUILD_FIELDS.items():
+        if server_info[group][field] != limits[param]:
+            drift.append(param)
+    return drift
+
 def sync_params(item):
     '''
         Функция синхронизирует параметры услуги из billmgr в pterodactyl
     '''
     pterapi = pter_api_key(item)
     server_info = pterapi.servers.get_server_info(external_id=str(item))
-    allocation_id = server_info['allocation']
     order_param = order_params(item)
     logger.info(order_param)
+    limits = server_build_limits(order_param)
     pterapi.servers.update_server_build(server_id=server_info['id'],
     allocation_id=server_info['allocation'],
-    memory_limit=str(order_param.get(Params.RAM_LIMIT, Params.RAM_LIMIT_DEFAULT)),
-    swap_limit=str(order_param.get(Params.SWAP_LIMIT, Params.SWAP_LIMIT_DEFAULT)),
-    cpu_limit=str(int(order_param.get(Params.CPU_LIMIT, Params.CPU_LIMIT_DEFAULT))*100),
-    disk_limit=str(get_param_from_muliple_keys(order_param,Params.DISK_MEMORY_LIMIT,Params.DISK_MEMORY_LIMIT_DEFAULT)),
-    io_limit=str(order_param.get(Params.IO_LIMIT, Params.IO_LIMIT_DEFAULT)),
-    backup_limit=str(order_param.get(Params.BACKUP_LIMIT, Params.BACKUP_LIMIT_DEFAULT)),
-    allocation_limit=str(order_param.get(Params.ALLOCATION_LIMIT, Params.ALLOCATION_LIMIT_DEFAULT)),
-    database_limit=str(order_param.get(Params.DB_LIMIT, Params.DB_LIMIT_DEFAULT)))
+    **{param: str(value) for param, value in limits.items()})
     #pterapi.servers.update_server_details(server_id=server_info['id'],name=order_param[Params.SERVER_NAME],user_id=pterapi.servers.get_server_info(external_id=str(item),includes={'user'})['relationships']['user']['attributes']['id'],external_id=str(item))
     #pterapi.servers.update_server_startup(server_id=server_info['id'],environment=order_param[Params.ENV_DICT])
 
@@ -61,9 +103,78 @@ def get_env_var(item_params, egg_vars):
             env_params[env_name] = str(item_params[env_name])
     return env_params
 
+API_KEY = 'api_key'
+ADMIN_API_KEY = 'admin_api_key'
+
+# Кеши живут в пределах одного процесса обработчика
+_item_processingmodules = {}
+_module_params = {}
+_clients = {}
+_session = None
+_order_params = {}
+
+
+class SharedSessionClient(PterodactylClient):
+    '''
+        PterodactylClient, который ходит в панель через общую для процесса сессию requests
+    '''
+    def __init__(self, url, api_key, session):
+        super().__init__(url, api_key)
+        self._session = session
+
+
+def get_session():
+    '''
+        Функция возвращает общую сессию с пулом соединений и повторами как у PterodactylClient
+    '''
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = http_adapter(backoff_factor=1, retries=3, extra_retry_codes=[])
+        _session.mount('https://', adapter)
+        _session.mount('http://', adapter)
+    return _session
+
+
+def get_item_processingmodule(item):
+    '''
+        Функция возвращает обработчик услуги, запрашивается из базы один раз за процесс
+    '''
+    item = int(item)
+    if item not in _item_processingmodules:
+        _item_processingmodules[item] = misc.get_item_processingmodule(item)
+    return _item_processingmodules[item]
+
+
+def get_module_params(processingmodule):
+    '''
+        Функция возвращает параметры обработчика, запрашиваются из базы один раз за процесс
+    '''
+    processingmodule = int(processingmodule)
+    if processingmodule not in _module_params:
+        _module_params[processingmodule] = misc.get_module_params(processingmodule)
+    return _module_params[processingmodule]
+
+
+def pter_client(processingmodule, key_type=API_KEY):
+    '''
+        Функция возвращает PterodactylClient обработчика для ключа key_type (api_key или admin_api_key),
+        клиенты создаются один раз за процесс и используют общую сессию
+    '''
+    key = (int(processingmodule), key_type)
+    if key not in _clients:
+        proccesingparam = get_module_params(processingmodule)
+        try:
+            _clients[key] = SharedSessionClient(proccesingparam['base_url'], proccesingparam[key_type], get_session())
+            logger.info("panel inited")
+        except Exception as e:
+            logger.error(repr(e))
+            raise billmgr.exception.XmlException('wrong_panel_info')
+    return _clients[key]
+
+
 def get_base_pter_domain(item):
-    processingmodule_id = misc.get_item_processingmodule(item)
-    proccesingparam = misc.get_module_params(processingmodule_id)
+    proccesingparam = get_module_params(get_item_processingmodule(item))
     base_url =  proccesingparam['base_url']
     return urlparse(base_url).netloc
 
@@ -71,42 +182,13 @@ def pter_api_key(item):
     '''
         Функция возвращает объект типа PterodactylClient, который инициализирует по параметрам обработчика
     '''
-    logger.info("db requests started")
-    processingmodule_id = misc.get_item_processingmodule(item)
-    proccesingparam = misc.get_module_params(processingmodule_id)
-    logger.info("db requests complete")
-    api_key = proccesingparam['api_key']
-    logger.info("api_key got")
-    base_url =  proccesingparam['base_url']
-    logger.info("base_url got")
-    try:
-        pterapi = PterodactylClient(base_url, api_key)
-        logger.info("panel inited")
-    except Exception as e:
-        logger.error(repr(e))
-        raise billmgr.exception.XmlException('wrong_panel_info')
-    return pterapi
+    return pter_client(get_item_processingmodule(item), API_KEY)
 
 def pter_admin_api_key(item):
     '''
         Функция возвращает объект типа PterodactylClient, который инициализирует по параметрам обработчика
     '''
-    logger.info("db requests started")
-    processingmodule_id = misc.get_item_processingmodule(item)
-    proccesingparam = misc.get_module_params(processingmodule_id)
-    logger.info("db requests complete")
-    api_key = proccesingparam['admin_api_key']
-    logger.info("api_key got")
-    base_url =  proccesingparam['base_url']
-    logger.info("base_url got")
-    try:
-        pterapi = PterodactylClient(base_url, api_key)
-        logger.info("panel inited")
-    except Exception as e:
-        logger.error(repr(e))
-        raise billmgr.exception.XmlException('wrong_panel_info')
-
-    return pterapi
+    return pter_client(get_item_processingmodule(item), ADMIN_API_KEY)
 
 def user_create(item):
     '''
@@ -145,12 +227,53 @@ def get_pteruser_by_item(item):
     acc_id = get_account_id(item)
     return pterapi.user.get_user_info(external_id=acc_id)['attributes']['id']
 
-def control_server_state(item, state):
-    pterapi = pter_api_key(item)
-    server_id = pterapi.servers.get_server_info(external_id=item)['uuid']
+def control_server_state(item, state, server_id=None):
+    if server_id is None:
+        server_id = pter_api_key(item).servers.get_server_info(external_id=item)['uuid']
     pterapi = pter_admin_api_key(item)
     pterapi.client.servers.send_power_action(server_id=server_id, signal=state)
 
+def get_start_wait_timeout(item):
+    proccesingparam = get_module_params(get_item_processingmodule(item))
+    try:
+        return float(proccesingparam.get('start_wait_timeout') or Params.START_WAIT_TIMEOUT)
+    except ValueError:
+        return Params.START_WAIT_TIMEOUT
+
+def wait_server_installed(item, server_id, timeout):
+    '''
+        Функция опрашивает состояние установки сервера через client API с экспоненциально растущей
+        паузой со случайным разбросом. Возвращает True, как только установка завершена,
+        и False, если за timeout секунд она не завершилась
+    '''
+    pterapi = pter_admin_api_key(item)
+    deadline = time.monotonic() + timeout
+    delay = Params.START_WAIT_INITIAL_DELAY
+    while True:
+        try:
+            server = pterapi.client.servers.get_server(server_id)
+            if server.get('status') == 'install_failed':
+                raise Exception(f'installation of server {server_id} failed')
+            if not server.get('is_installing') and server.get('status') != 'installing':
+                return True
+            logger.info(f"server {item} is installing")
+        except (requests.exceptions.RequestException, PterodactylApiError) as ex:
+            logger.warning(f"can't get state of server {item}: {ex}")
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(remaining, random.uniform(delay / 2, delay)))
+        delay = min(delay * 2, Params.START_WAIT_MAX_DELAY)
+
+def start_server_when_installed(item, server_id):
+    '''
+        Функция дожидается окончания установки сервера и запускает его
+    '''
+    timeout = get_start_wait_timeout(item)
+    if not wait_server_installed(item, server_id, timeout):
+        logger.warning(f"server {item} is not installed in {timeout} seconds, trying to start anyway")
+    control_server_state(item, 'start', server_id)
+
 def check_pteruser_exists(item):
     pterapi = pter_api_key(item)
     item_info = misc.iteminfo(item)
@@ -170,7 +293,6 @@ def check_pteruser_exists(item):
     return None
 
 def get_items_id_from_pter(acc_id, item):
-    proc_module=misc.get_item_processingmodule(item)
     pter_domain = get_base_pter_domain(item)
     ids=db.db_query_dict('SELECT item FROM itemparam icp JOIN item i ON i.id=icp.item WHERE icp.intname=%(check_field)s AND i.account=%(acc_id)s AND icp.value LIKE %(value)s', check_field='username_pter', acc_id=acc_id, value=f'{pter_domain}%')
     logger.debug(f'request results: {ids}')
@@ -240,14 +362,54 @@ def get_param_from_muliple_keys(params, keys, default):
             return params[key]
     return default
 
+def egg_cache_path(item, nest_id, egg_id):
+    pter_domain = get_base_pter_domain(item).replace('/', '_')
+    return os.path.join(Params.EGG_CACHE_DIR, f'{pter_domain}_{nest_id}_{egg_id}.json')
+
+def get_egg_variables(item, nest_id, egg_id):
+    '''
+        Функция возвращает описание env variable egg'а. Egg меняется только при правке администратором панели,
+        поэтому ответ панели кешируется на диске на EGG_CACHE_TTL секунд по ключу (панель, nest, egg)
+    '''
+    path = egg_cache_path(item, nest_id, egg_id)
+    try:
+        if time.time() - os.path.getmtime(path) < Params.EGG_CACHE_TTL:
+            with open(path) as cache_file:
+                return json.load(cache_file)
+    except (OSError, ValueError) as ex:
+        logger.debug(f'egg cache miss {path}: {ex}')
+
+    pterapi = pter_api_key(item)
+    egg_vars = pterapi.nests.get_egg_info(
+     egg_id=egg_id,
+     nest_id=nest_id,
+     includes={'variables'})['attributes']['relationships']['variables']['data']
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(Params.EGG_CACHE_DIR, exist_ok=True)
+        with open(tmp_path, 'w') as cache_file:
+            json.dump(egg_vars, cache_file)
+        os.replace(tmp_path, path)
+    except OSError as ex:
+        logger.warning(f'failed to save egg cache {path}: {ex}')
+    return egg_vars
+
 def order_params(item):
     '''
-        Функция собирает содержания, параметры и env var в один словарь order_params
+        Функция собирает содержания, параметры и env var в один словарь order_params,
+        результат вычисляется один раз за процесс для каждой услуги.
+        Возвращается глубокая копия, чтобы изменения env_dict у вызывающего не попадали в кеш
     '''
+    item = int(item)
+    if item not in _order_params:
+        _order_params[item] = load_order_params(item)
+    return copy.deepcopy(_order_params[item])
+
+def load_order_params(item):
     item_info = misc.iteminfo(item)
     item_params = misc.itemparams(item)
     addon_params = misc.itemaddons(item)
-    pterapi = pter_api_key(item)
     order_param= {}
     # try:
     #     template = item_info['pricelist_intname'].split(';')
@@ -273,16 +435,12 @@ def order_params(item):
         logger.info('server_type field exception')
     
     order_param[Params.ENV_DICT] = get_env_var(
-     item_params, 
-     pterapi.nests.get_egg_info(
-      egg_id=order_param[Params.EGG_ID],
-      nest_id=order_param[Params.NEST_ID], 
-      includes={'variables'})['attributes']['relationships']['variables']['data']
+     item_params,
+     get_egg_variables(item, order_param[Params.NEST_ID], order_param[Params.EGG_ID])
     )
 
     logger.debug(f'env_dict = {order_param[Params.ENV_DICT]}')
-    processingmodule_id = misc.get_item_processingmodule(item)
-    proccesingparam = misc.get_module_params(processingmodule_id)
+    proccesingparam = get_module_params(get_item_processingmodule(item))
     logger.info(proccesingparam)
     if 'pter_location_id' in proccesingparam and proccesingparam['pter_location_id'] != '':
         order_param[Params.LOCATION_ID] = proccesingparam['pter_location_id']
@@ -296,22 +454,134 @@ def order_params(item):
         
     return order_param
 
-def get_allocation_id(item,ip,port):
+def allocation_index_path(item, node_id):
+    pter_domain = get_base_pter_domain(item).replace('/', '_')
+    return os.path.join(Params.ALLOCATION_CACHE_DIR, f'{pter_domain}_{node_id}.json')
+
+def allocation_lock(item, node_id):
+    '''
+        Блокировка индекса allocation ноды, берётся на время выбора и изменения allocation в индексе.
+        Вызов update_server_build в панели выполняется вне блокировки: выбранный allocation
+        убирается из свободных ещё под блокировкой, а если панель его не приняла,
+        индекс ноды строится заново
+    '''
+    pter_domain = get_base_pter_domain(item).replace('/', '_')
+    return misc.FileLock(f'tmp/.tmp/pter_alloc_{pter_domain}_{node_id}',
+                         lock_mode=misc.FileLock.LockMode.WAIT)
+
+def build_allocation_index(item, node_id):
+    '''
+        Функция за один проход по страницам allocation ноды строит индекс:
+        ids - адрес ip:port -> id allocation, free - адреса неназначенных allocation
+    '''
+    pterapi = pter_api_key(item)
+    index = {'ids': {}, 'free': []}
+    for page in pterapi.nodes.list_node_allocations(node_id=node_id):
+        for alloc in page:
+            address = f"{alloc['attributes']['ip']}:{alloc['attributes']['port']}"
+            index['ids'][address] = alloc['attributes']['id']
+            if not alloc['attributes']['assigned']:
+                index['free'].append(address)
+    logger.info(f"allocation index of node {node_id}: {len(index['ids'])} allocations, {len(index['free'])} free")
+    return index
+
+def save_allocation_index(item, node_id, index):
+    path = allocation_index_path(item, node_id)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(Params.ALLOCATION_CACHE_DIR, exist_ok=True)
+        with open(tmp_path, 'w') as cache_file:
+            json.dump(index, cache_file)
+        os.replace(tmp_path, path)
+    except OSError as ex:
+        logger.warning(f'failed to save allocation index {path}: {ex}')
+
+def load_allocation_index(item, node_id):
+    '''
+        Функция возвращает индекс allocation ноды из кеша или None, если кеш устарел
+    '''
+    path = allocation_index_path(item, node_id)
+    try:
+        if time.time() - os.path.getmtime(path) < Params.ALLOCATION_CACHE_TTL:
+            with open(path) as cache_file:
+                return json.load(cache_file)
+    except (OSError, ValueError) as ex:
+        logger.debug(f'allocation index miss {path}: {ex}')
+    return None
+
+def get_allocation_index(item, node_id, refresh=False):
+    '''
+        Функция возвращает индекс allocation ноды, индекс кешируется на диске на ALLOCATION_CACHE_TTL секунд.
+        Изменяющие индекс вызовы выполняются под allocation_lock
+    '''
+    index = None if refresh else load_allocation_index(item, node_id)
+    if index is None:
+        index = build_allocation_index(item, node_id)
+        save_allocation_index(item, node_id, index)
+    return index
+
+def drop_allocation_index(item, node_id):
+    try:
+        os.remove(allocation_index_path(item, node_id))
+    except OSError:
+        pass
+
+def used_addresses(addresses):
+    '''
+        Функция возвращает те адреса из addresses, которые уже заведены в таблице ip биллинга
+    '''
+    used = set()
+    for start in range(0, len(addresses), Params.USED_IPS_QUERY_CHUNK):
+        chunk = addresses[start:start + Params.USED_IPS_QUERY_CHUNK]
+        placeholders = ', '.join(['%s'] * len(chunk))
+        used.update(row['name'] for row in db.db_query(f'SELECT name FROM ip WHERE name IN ({placeholders})', *chunk))
+    return used
+
+def take_free_allocation(item, node_id):
+    '''
+        Функция выбирает неназначенную allocation ноды, адрес которой не занят в биллинге,
+        и убирает её из свободных в индексе. Возвращает (адрес, id) или (None, None)
+    '''
+    with allocation_lock(item, node_id):
+        index = get_allocation_index(item, node_id)
+        free = index['free']
+        for start in range(0, len(free), Params.USED_IPS_QUERY_CHUNK):
+            chunk = free[start:start + Params.USED_IPS_QUERY_CHUNK]
+            used = used_addresses(chunk)
+            for address in chunk:
+                if address not in used:
+                    free.remove(address)
+                    save_allocation_index(item, node_id, index)
+                    return address, index['ids'][address]
+    return None, None
+
+def release_allocation(item, node_id, address):
+    '''
+        Функция возвращает allocation в список свободных закешированного индекса
+    '''
+    with allocation_lock(item, node_id):
+        index = load_allocation_index(item, node_id)
+        if index and address in index['ids'] and address not in index['free']:
+            index['free'].append(address)
+            save_allocation_index(item, node_id, index)
+
+def get_allocation_id(item,ip,port,server=None):
         '''
-            Функция возвращает id allocation в pterodactyl
+            Функция возвращает id allocation в pterodactyl.
+            Сначала ищет среди allocation сервера, затем в индексе allocation ноды
          '''
-        pterapi = pter_api_key(item) 
-        server = pterapi.servers.get_server_info(external_id=item,includes={'allocations'}) 
-        allocations = pterapi.nodes.list_node_allocations(node_id=server['node'])
-        alloc_id = None
-        for page in allocations:
-            for alloc in page:
-                if alloc['attributes']['port'] == int(port) and  alloc['attributes']['ip'] == ip:
-                    alloc_id = alloc['attributes']['id']
-                    break
-            if alloc_id:
-                break
-        
+        if server is None:
+            pterapi = pter_api_key(item)
+            server = pterapi.servers.get_server_info(external_id=item,includes={'allocations'})
+        for alloc in server['relationships']['allocations']['data']:
+            if alloc['attributes']['port'] == int(port) and alloc['attributes']['ip'] == ip:
+                return alloc['attributes']['id']
+
+        address = f'{ip}:{port}'
+        with allocation_lock(item, server['node']):
+            alloc_id = get_allocation_index(item, server['node'])['ids'].get(address)
+            if alloc_id is None:
+                alloc_id = get_allocation_index(item, server['node'], refresh=True)['ids'].get(address)
         return alloc_id
 
 def used_ips():